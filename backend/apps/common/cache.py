@@ -0,0 +1,220 @@
+import pickle
+import threading
+import time
+import zlib
+from collections import namedtuple
+
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+
+
+INDEX_PREFIX = 'cache_index:'
+GENERATION_PREFIX = 'cache_gen:'
+INDEX_SHARDS = 16             # 键索引分片数，写入/删除只读写其中一片
+INDEX_SHARD_MAX_KEYS = 512    # 每片最多记录的键数，超出时先丢最早过期的条目
+
+
+# 缓存值与写入时的命名空间代数一起存放
+_Entry = namedtuple('_Entry', ['generation', 'value'])
+
+
+class NamespacedCache:
+    """
+    按命名空间划分的缓存：键为 "<name>:<key>"，底层仍是 Django 缓存后端。
+
+    - 命中/未命中/写入/删除/过期 按命名空间计数（进程内），由 monitor 的指标汇总到全部 worker
+    - 命名空间带一个代数（cache_gen:<name>），值与写入时的代数一起存放；clear 只更换代数，旧代数的值读取时视为未命中、
+      按 TTL 过期，不需要逐键删除。读取时代数与值用一次 get_many 取回
+    - 键索引按键哈希分为 INDEX_SHARDS 片（cache_index:<name>:<代数>:<片号>），记录 键 -> (过期时间, 序列化大小)，
+      每片最多 INDEX_SHARD_MAX_KEYS 条；写入/删除只读写一片，枚举键不需要扫描整个缓存
+    - 索引为尽力维护：多个 worker 同时写同一片时可能丢失个别条目，该条目仍会按 TTL 过期，读写不受影响
+    - index=False 的命名空间（如按用户的高频缓存）不维护索引，写入路径只有一次 set；监控页只显示计数，不列出键
+    """
+
+    def __init__(self, name, remark='', timeout=3600, alias=DEFAULT_CACHE_ALIAS, index=True):
+        self.name = name
+        self.prefix = f'{name}:'
+        self.remark = remark
+        self.timeout = timeout
+        self.alias = alias
+        self.indexed = bool(index)
+        self._generation_key = GENERATION_PREFIX + name
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.sets = 0
+        self.evictions = 0
+        self.expired = 0
+
+    @property
+    def backend(self):
+        return caches[self.alias]
+
+    def make_key(self, key):
+        return self.prefix + str(key)
+
+    def owns(self, full_key):
+        return full_key.startswith(self.prefix)
+
+    # ----- 代数 -----
+    def _generation(self):
+        generation = self.backend.get(self._generation_key)
+        if generation is None:
+            # 首次使用或代数键被后端淘汰：取新的代数，已有的值随之失效
+            self.backend.add(self._generation_key, time.time_ns(), timeout=None)
+            generation = self.backend.get(self._generation_key)
+        return generation
+
+    def _lookup(self, full_key):
+        found = self.backend.get_many([self._generation_key, full_key])
+        entry = found.get(full_key)
+        generation = found.get(self._generation_key)
+        if not isinstance(entry, _Entry) or generation is None or entry.generation != generation:
+            return _MISSING
+        return entry.value
+
+    # ----- 读写 -----
+    def get(self, key, default=None):
+        value = self._lookup(self.make_key(key))
+        if value is _MISSING:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return value
+
+    def set(self, key, value, timeout=None):
+        timeout = self.timeout if timeout is None else timeout
+        full_key = self.make_key(key)
+        generation = self._generation()
+        self.backend.set(full_key, _Entry(generation, value), timeout=timeout)
+        self.sets += 1
+        if not self.indexed:
+            return
+        try:
+            size = len(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+        except Exception:
+            size = 0
+        expires = time.time() + timeout if timeout else None
+        self._update_index(generation, full_key, (expires, size))
+
+    def delete(self, key):
+        return self.delete_full_key(self.make_key(key))
+
+    def delete_full_key(self, full_key):
+        removed = bool(self.backend.delete(full_key))
+        if self.indexed:
+            generation = self.backend.get(self._generation_key)
+            if generation is not None:
+                removed = self._update_index(generation, full_key, None) or removed
+        if removed:
+            self.evictions += 1
+        return removed
+
+    def clear(self):
+        """只清理本命名空间：更换代数使已有的值全部失效，并删除旧代数的索引；返回索引中记录的键数。"""
+        with self._lock:
+            generation = self.backend.get(self._generation_key)
+            count = len(self._index_entries(generation)) if generation is not None else 0
+            self.backend.set(self._generation_key, time.time_ns(), timeout=None)
+            if generation is not None and self.indexed:
+                self.backend.delete_many([self._shard_key(generation, n) for n in range(INDEX_SHARDS)])
+        self.evictions += count
+        return count
+
+    # ----- 索引 -----
+    def _shard_key(self, generation, shard):
+        return f'{INDEX_PREFIX}{self.name}:{generation}:{shard}'
+
+    def _update_index(self, generation, full_key, entry):
+        """写入（entry 为 (过期时间, 大小)）或删除（entry 为 None）一个键的索引，只读写该键所在的分片。"""
+        shard_key = self._shard_key(generation, zlib.crc32(full_key.encode()) % INDEX_SHARDS)
+        with self._lock:
+            shard = self.backend.get(shard_key) or {}
+            now = time.time()
+            stale = [k for k, (expires, _) in shard.items() if expires is not None and expires <= now]
+            for k in stale:
+                del shard[k]
+            self.expired += len(stale)
+            removed = False
+            if entry is None:
+                removed = shard.pop(full_key, None) is not None
+                if not removed and not stale:
+                    return False
+            else:
+                shard[full_key] = entry
+                if len(shard) > INDEX_SHARD_MAX_KEYS:
+                    del shard[min(shard, key=lambda k: shard[k][0] or float('inf'))]
+            if shard:
+                # 分片不过期，条目过期时间单独记录、写入时剔除；clear 时随旧代数删除
+                self.backend.set(shard_key, shard, timeout=None)
+            else:
+                self.backend.delete(shard_key)
+        return removed
+
+    def _index_entries(self, generation=None):
+        if not self.indexed:
+            return {}
+        if generation is None:
+            generation = self.backend.get(self._generation_key)
+            if generation is None:
+                return {}
+        now = time.time()
+        entries = {}
+        for shard in self.backend.get_many([self._shard_key(generation, n) for n in range(INDEX_SHARDS)]).values():
+            entries.update((k, v) for k, v in shard.items() if v[0] is None or v[0] > now)
+        return entries
+
+    def keys(self):
+        return sorted(self._index_entries())
+
+    def value(self, full_key):
+        value = self._lookup(full_key)
+        return None if value is _MISSING else value
+
+    def stats(self):
+        index = self._index_entries()
+        return {
+            'cacheName': self.name,
+            'remark': self.remark,
+            'indexed': self.indexed,
+            'keys': len(index),
+            'bytes': sum(size for _, size in index.values()),
+            'hits': self.hits,
+            'misses': self.misses,
+            'sets': self.sets,
+            'evictions': self.evictions,
+            'expired': self.expired,
+        }
+
+
+_MISSING = object()
+_namespaces = {}
+
+
+def register_namespace(name, remark='', timeout=3600, alias=DEFAULT_CACHE_ALIAS, index=True):
+    ns = _namespaces.get(name)
+    if ns is None:
+        ns = _namespaces[name] = NamespacedCache(name, remark=remark, timeout=timeout, alias=alias, index=index)
+    return ns
+
+
+def get_namespace(name):
+    """按名称查找命名空间，兼容带结尾冒号的写法（"config:"）。"""
+    return _namespaces.get(name.rstrip(':'))
+
+
+def namespace_for_key(full_key):
+    for ns in _namespaces.values():
+        if ns.owns(full_key):
+            return ns
+    return None
+
+
+def all_namespaces():
+    return list(_namespaces.values())
+
+
+# 业务缓存命名空间
+config_cache = register_namespace('config', remark='参数配置', timeout=3600)
+dict_data_cache = register_namespace('dict_data_by_type', remark='字典数据', timeout=3600)
+dict_option_cache = register_namespace('dict_optionselect', remark='字典类型选项', timeout=300)
@@ -0,0 +1,72 @@
+import ipaddress
+from functools import lru_cache
+
+from django.conf import settings
+
+
+DEFAULT_CLIENT_IP_CONFIG = {
+    # 可信反向代理的地址或网段，如 ['127.0.0.1', '10.0.0.0/8']；直连地址属于其中时才读取 X-Forwarded-For，
+    # 从右向左跳过可信代理，第一个不可信的地址即客户端
+    'TRUSTED_PROXIES': [],
+    # 或者：前面固定有 N 层代理，取 X-Forwarded-For + 直连地址 从右数第 N+1 个（优先于 TRUSTED_PROXIES）
+    'TRUSTED_PROXY_COUNT': 0,
+}
+
+
+def get_client_ip_config():
+    conf = dict(DEFAULT_CLIENT_IP_CONFIG)
+    conf.update(getattr(settings, 'CLIENT_IP', None) or {})
+    return conf
+
+
+def _valid(value):
+    try:
+        ipaddress.ip_address(value)
+        return True
+    except ValueError:
+        return False
+
+
+class ClientIpResolver:
+    """
+    客户端 IP：默认只认直连地址 REMOTE_ADDR，X-Forwarded-For 由客户端任意填写，只有经过配置的可信代理时才采信。
+    登录失败锁定、登录日志、在线会话与操作日志共用这一处判断。
+    """
+
+    def __init__(self, trusted_proxies=(), trusted_proxy_count=0):
+        self.networks = [ipaddress.ip_network(str(p).strip(), strict=False) for p in trusted_proxies or ()]
+        self.proxy_count = max(0, int(trusted_proxy_count or 0))
+        self.is_trusted = lru_cache(maxsize=1024)(self._is_trusted)
+
+    def _is_trusted(self, value):
+        try:
+            addr = ipaddress.ip_address(value)
+        except ValueError:
+            return False
+        return any(addr in net for net in self.networks)
+
+    def resolve(self, meta):
+        remote = meta.get('REMOTE_ADDR', '') or ''
+        xff = meta.get('HTTP_X_FORWARDED_FOR')
+        if not xff or not (self.proxy_count or self.networks):
+            return remote
+        chain = [hop.strip() for hop in xff.split(',') if hop.strip()] + [remote]
+        if self.proxy_count:
+            candidate = chain[max(0, len(chain) - 1 - self.proxy_count)]
+        else:
+            if not self.is_trusted(remote):
+                return remote
+            candidate = chain[0]
+            for hop in reversed(chain[:-1]):
+                if not self.is_trusted(hop):
+                    candidate = hop
+                    break
+        return candidate if _valid(candidate) else remote
+
+
+_conf = get_client_ip_config()
+client_ip_resolver = ClientIpResolver(_conf['TRUSTED_PROXIES'], _conf['TRUSTED_PROXY_COUNT'])
+
+
+def get_client_ip(request):
+    return client_ip_resolver.resolve(request.META)
@@ -0,0 +1,155 @@
+import bisect
+import ipaddress
+import logging
+import os
+import socket
+import threading
+import time
+from array import array
+
+from django.conf import settings
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_IP_LOCATION_CONFIG = {
+    'FILE': '',                  # IP 段文件，未配置时只识别内网地址
+    'INTERNAL_LABEL': '内网IP',
+    'UNKNOWN_LABEL': '未知',
+}
+
+
+def get_ip_location_config():
+    conf = dict(DEFAULT_IP_LOCATION_CONFIG)
+    conf.update(getattr(settings, 'IP_LOCATION', None) or {})
+    return conf
+
+
+def _parse_ip(value):
+    """返回 (版本, 整数值)。"""
+    value = value.strip()
+    if value.isdigit():
+        n = int(value)
+        return (4 if n <= 0xFFFFFFFF else 6), n
+    addr = ipaddress.ip_address(value)
+    return addr.version, int(addr)
+
+
+class IpLocator:
+    """
+    离线 IP 归属地查询。
+
+    IP 段文件每行 "起始IP,结束IP,归属地"（IP 可写点分或整数，# 开头为注释），加载后按起始地址排序，
+    IPv4 存入 array('L')，地点字符串去重后按下标引用；查询为一次 bisect，不访问网络。
+    每 CHECK_INTERVAL_S 检查一次文件修改时间，变化后重新加载。
+    """
+
+    CHECK_INTERVAL_S = 60
+
+    def __init__(self, path='', internal_label='内网IP', unknown_label='未知'):
+        self.path = str(path or '')
+        self.internal_label = internal_label
+        self.unknown_label = unknown_label
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._checked_at = None
+        # (IPv4 起始/结束/地点下标, IPv6 同上, 地点列表)，重新加载时整体替换
+        self._table = ((array('L'), array('L'), array('L')), ([], [], []), [])
+
+    # ----- 加载 -----
+    def _maybe_load(self):
+        if not self.path:
+            return
+        now = time.monotonic()
+        if self._checked_at is not None and now - self._checked_at < self.CHECK_INTERVAL_S:
+            return
+        self._checked_at = now
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return
+        if mtime == self._mtime:
+            return
+        with self._lock:
+            if mtime != self._mtime:
+                self._load(mtime)
+
+    def _load(self, mtime):
+        rows4, rows6, labels, index = [], [], [], {}
+        with open(self.path, encoding='utf-8') as fh:
+            for lineno, line in enumerate(fh, 1):
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                try:
+                    start, end, label = line.split(',', 2)
+                    version, start = _parse_ip(start)
+                    _, end = _parse_ip(end)
+                except ValueError:
+                    logger.warning('IP 段文件第 %s 行格式错误：%s', lineno, line[:100])
+                    continue
+                label = label.strip()
+                idx = index.get(label)
+                if idx is None:
+                    idx = index[label] = len(labels)
+                    labels.append(label)
+                (rows4 if version == 4 else rows6).append((start, end, idx))
+        rows4.sort()
+        rows6.sort()
+        v4 = tuple(array('L', col) for col in zip(*rows4)) if rows4 else (array('L'), array('L'), array('L'))
+        v6 = tuple(list(col) for col in zip(*rows6)) if rows6 else ([], [], [])
+        self._table = (v4, v6, labels)
+        self._mtime = mtime
+        logger.info('已加载 IP 段 %s 条（IPv4 %s，IPv6 %s）', len(rows4) + len(rows6), len(rows4), len(rows6))
+
+    # ----- 查询 -----
+    def lookup(self, ip):
+        """返回归属地；内网/保留地址返回 INTERNAL_LABEL，查不到返回 UNKNOWN_LABEL，空地址返回空串。"""
+        if not ip:
+            return ''
+        self._maybe_load()
+        v4, v6, labels = self._table
+        try:
+            # IPv4 走 inet_aton，比 ipaddress 解析快一个数量级
+            value = int.from_bytes(socket.inet_aton(ip), 'big') if '.' in ip and ':' not in ip else None
+        except OSError:
+            value = None
+        if value is not None:
+            if _is_private_v4(value):
+                return self.internal_label
+            starts, ends, idxs = v4
+        else:
+            try:
+                addr = ipaddress.ip_address(ip)
+            except ValueError:
+                return self.unknown_label
+            if addr.is_private or addr.is_loopback or addr.is_link_local or addr.is_reserved:
+                return self.internal_label
+            value = int(addr)
+            starts, ends, idxs = v6
+        i = bisect.bisect_right(starts, value) - 1
+        if i >= 0 and value <= ends[i]:
+            return labels[idxs[i]]
+        return self.unknown_label
+
+
+# 10/8、172.16/12、192.168/16、127/8、169.254/16、100.64/10、0/8
+_PRIVATE_V4 = [
+    (0x0A000000, 0xFF000000), (0xAC100000, 0xFFF00000), (0xC0A80000, 0xFFFF0000),
+    (0x7F000000, 0xFF000000), (0xA9FE0000, 0xFFFF0000), (0x64400000, 0xFFC00000), (0x00000000, 0xFF000000),
+]
+
+
+def _is_private_v4(value):
+    for net, mask in _PRIVATE_V4:
+        if value & mask == net:
+            return True
+    return False
+
+
+_conf = get_ip_location_config()
+ip_locator = IpLocator(
+    path=_conf['FILE'],
+    internal_label=_conf['INTERNAL_LABEL'],
+    unknown_label=_conf['UNKNOWN_LABEL'],
+)
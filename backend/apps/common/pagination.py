@@ -1,3 +1,9 @@
+import base64
+import json
+from datetime import datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
 
@@ -17,3 +23,88 @@ class StandardPagination(PageNumberPagination):
 
     def get_paginated_response(self, data):
         return Response({'code': 200, 'msg': '操作成功', 'total': self.page.paginator.count, 'pageNum': self.page.number, 'pageSize': self.page.paginator.per_page, 'rows': data})
+
+
+class KeysetPagination(StandardPagination):
+    """
+    在 StandardPagination 基础上增加可选的游标（keyset）分页，适合百万级日志表：
+
+    - 请求带 cursor 参数时启用（首页传空值），否则仍按 pageNum/pageSize 分页
+    - 按视图的 cursor_ordering（如 ('-oper_time', '-oper_id')）排序，用上一页末行的键值
+      作为条件定位下一页，不使用 OFFSET，任意一页与首页代价相同；需要配套的联合索引
+    - 返回不透明的 next / prev 游标；默认不做 COUNT(*)，传 withTotal=true 时才返回 total
+    """
+    cursor_query_param = 'cursor'
+    total_query_param = 'withTotal'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_mode = self.cursor_query_param in request.query_params
+        if not self.cursor_mode:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        try:
+            self.page_size = min(int(request.query_params.get(self.page_size_query_param, self.page_size)), self.max_page_size)
+        except (TypeError, ValueError):
+            pass
+        fields = [f.lstrip('-') for f in view.cursor_ordering]
+        descending = view.cursor_ordering[0].startswith('-')
+        token = request.query_params.get(self.cursor_query_param)
+        values, backwards = self._decode_cursor(token) if token else (None, False)
+
+        self.total = queryset.count() if request.query_params.get(self.total_query_param) in ('1', 'true', 'True') else None
+        # 向前翻页时反向排序取数，再把结果翻转回来
+        forward_desc = descending != backwards
+        qs = queryset.order_by(*[('-' if forward_desc else '') + f for f in fields])
+        if values is not None:
+            qs = qs.filter(self._after(fields, values, forward_desc))
+        rows = list(qs[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if backwards:
+            rows.reverse()
+
+        self.next_cursor = self.prev_cursor = None
+        if rows:
+            first = [getattr(rows[0], f) for f in fields]
+            last = [getattr(rows[-1], f) for f in fields]
+            if backwards:
+                self.next_cursor = self._encode_cursor(last, False)
+                self.prev_cursor = self._encode_cursor(first, True) if has_more else None
+            else:
+                self.next_cursor = self._encode_cursor(last, False) if has_more else None
+                self.prev_cursor = self._encode_cursor(first, True) if values is not None else None
+        return rows
+
+    @staticmethod
+    def _after(fields, values, descending):
+        # (a, b) 严格位于游标之后：a 先用 <=/>= 给出索引区间，再排除 a 相等且 b 未越过的行
+        (a, b), (va, vb) = fields, values
+        op = 'lt' if descending else 'gt'
+        return Q(**{f'{a}__{op}e': va}) & (Q(**{f'{a}__{op}': va}) | Q(**{f'{b}__{op}': vb}))
+
+    @staticmethod
+    def _encode_cursor(values, backwards):
+        payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+        raw = json.dumps({'v': payload, 'b': 1 if backwards else 0}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    @staticmethod
+    def _decode_cursor(token):
+        try:
+            raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+            data = json.loads(raw)
+            # 游标列约定为 (时间, 整数主键)
+            first, second = data['v']
+            return [datetime.fromisoformat(first), int(second)], bool(data.get('b'))
+        except Exception:
+            raise NotFound('无效的分页游标')
+
+    def get_paginated_response(self, data):
+        if not getattr(self, 'cursor_mode', False):
+            return super().get_paginated_response(data)
+        body = {'code': 200, 'msg': '操作成功', 'pageSize': self.page_size, 'rows': data,
+                'next': self.next_cursor, 'prev': self.prev_cursor}
+        if self.total is not None:
+            body['total'] = self.total
+        return Response(body)
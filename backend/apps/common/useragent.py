@@ -0,0 +1,69 @@
+import re
+from functools import lru_cache
+
+
+# 按顺序匹配，越具体的写在前面（Edge/Opera/国内浏览器的 UA 同时包含 Chrome 与 Safari）
+_BROWSERS = [
+    ('Edge', re.compile(r'Edg(?:e|A|iOS)?/(\d+)')),
+    ('Opera', re.compile(r'(?:OPR|Opera)/(\d+)')),
+    ('WeChat', re.compile(r'MicroMessenger/(\d+)')),
+    ('DingTalk', re.compile(r'DingTalk/(\d+)')),
+    ('QQBrowser', re.compile(r'QQBrowser/(\d+)')),
+    ('UCBrowser', re.compile(r'UCBrowser/(\d+)')),
+    ('Sogou', re.compile(r'(?:SE |MetaSr )(\d+)')),
+    ('360', re.compile(r'QIHU 360(?:SE|EE)()')),
+    ('Samsung Internet', re.compile(r'SamsungBrowser/(\d+)')),
+    ('Firefox', re.compile(r'(?:Firefox|FxiOS)/(\d+)')),
+    ('Chrome', re.compile(r'(?:Chrome|CriOS)/(\d+)')),
+    ('Safari', re.compile(r'Version/(\d+)[\d.]* (?:Mobile/\w+ )?Safari/')),
+    ('Internet Explorer', re.compile(r'(?:MSIE |Trident/.*rv:)(\d+)')),
+    ('curl', re.compile(r'^curl/(\d+)')),
+    ('Python Requests', re.compile(r'^python-requests/(\d+)')),
+    ('PostmanRuntime', re.compile(r'^PostmanRuntime/(\d+)')),
+]
+
+_WINDOWS_NT = {'10.0': 'Windows 10', '6.3': 'Windows 8.1', '6.2': 'Windows 8', '6.1': 'Windows 7',
+               '6.0': 'Windows Vista', '5.1': 'Windows XP', '5.2': 'Windows XP'}
+
+_OS = [
+    ('HarmonyOS', re.compile(r'HarmonyOS(?:[ /](\d+))?')),
+    ('iPadOS', re.compile(r'iPad.*OS (\d+)')),
+    ('iOS', re.compile(r'(?:iPhone|CPU) OS (\d+)')),
+    ('Android', re.compile(r'Android[ /]?(\d+)?')),
+    ('Windows', re.compile(r'Windows NT (\d+\.\d+)')),
+    ('Mac OS X', re.compile(r'Mac OS X(?: (\d+)[_.]\d+)?')),
+    ('Chrome OS', re.compile(r'CrOS()')),
+    ('Linux', re.compile(r'Linux()')),
+]
+
+UNKNOWN = 'Unknown'
+
+
+def _match(table, ua):
+    for name, pattern in table:
+        m = pattern.search(ua)
+        if m:
+            return name, m.group(1) or ''
+    return None, ''
+
+
+@lru_cache(maxsize=2048)
+def parse_user_agent(ua):
+    """
+    从 User-Agent 解析 (浏览器, 操作系统)，如 ('Chrome 120', 'Windows 10')；无法识别时为 Unknown。
+    同一客户端的 UA 高度重复，结果按字符串缓存，命中时不再执行正则。
+    """
+    ua = (ua or '')[:512]
+    if not ua:
+        return UNKNOWN, UNKNOWN
+    name, version = _match(_BROWSERS, ua)
+    browser = f'{name} {version}'.strip() if name else UNKNOWN
+
+    name, version = _match(_OS, ua)
+    if name == 'Windows':
+        os_name = _WINDOWS_NT.get(version, 'Windows')
+    elif name:
+        os_name = f'{name} {version}'.strip()
+    else:
+        os_name = UNKNOWN
+    return browser[:50], os_name[:50]
@@ -3,3 +3,33 @@ from django.apps import AppConfig
 class MonitorConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.monitor'
+
+    def ready(self):
+        from django.core.signals import request_started
+        from .metrics import get_metrics_config, metrics
+        from .profiler import get_profiler_config, request_profiler
+        from .rollup import apply_batch, get_rollup_config
+        from .runtime import runtime_stats
+        from .sampler import system_sampler
+        from .sqlprofile import get_sql_profile_config, sql_profile_stats
+        from .writer import get_oper_log_writer
+        if get_rollup_config()['ENABLED']:
+            # 每批操作日志写入成功后增量累加到分钟/小时统计表
+            get_oper_log_writer().add_listener(apply_batch)
+        # GC 停顿统计；每个 worker 的运行时快照随系统采样定期发布，供服务监控汇总
+        runtime_stats.install()
+        system_sampler.add_task(runtime_stats.publish)
+        if get_metrics_config()['ENABLED']:
+            # 各 worker 的指标同样随采样写入共享目录，/api/monitor/metrics 汇总导出
+            system_sampler.add_task(metrics.publish)
+        if get_sql_profile_config()['ENABLED']:
+            system_sampler.add_task(sql_profile_stats.publish)
+        if get_profiler_config()['ENABLED']:
+            system_sampler.add_task(request_profiler.publish)
+        request_started.connect(_start_sampler, dispatch_uid='monitor-start-sampler')
+
+
+def _start_sampler(sender, **kwargs):
+    # worker 处理首个请求时启动采样线程（fork 后也会在子进程内重建）
+    from .sampler import system_sampler
+    system_sampler.ensure_started()
@@ -0,0 +1,330 @@
+import json
+from urllib.parse import parse_qsl
+
+from django.conf import settings
+
+
+SENSITIVE_KEYS = {"password", "pwd", "pass", "secret", "token", "accesstoken", "oldpassword", "newpassword"}
+
+MASK = "****"
+TRUNCATED_MARK = "...[truncated]"
+
+DEFAULT_CAPTURE_CONFIG = {
+    'PARAM_MAX_BYTES': 4000,   # 请求参数最多读取/记录的字节数
+    'RESULT_MAX_BYTES': 4000,  # 响应结果最多记录的字节数
+}
+
+# 可按文本截取的响应类型；其余（Excel、图片、压缩包等）只记录类型与大小
+TEXT_CONTENT_TYPES = ('application/json', 'application/xml', 'application/javascript')
+
+
+def get_capture_config():
+    conf = dict(DEFAULT_CAPTURE_CONFIG)
+    conf.update(getattr(settings, 'OPER_LOG_CAPTURE', None) or {})
+    return conf
+
+
+def is_sensitive_key(key):
+    return bool(key) and str(key).lower() in SENSITIVE_KEYS
+
+
+def mask_value(key, value):
+    if is_sensitive_key(key):
+        return MASK
+    return value
+
+
+class BodyCaptureStream:
+    """
+    包装 request._stream：视图（DRF 解析器）读取请求体时顺带保留前 budget 字节，
+    避免日志记录再次读取/缓冲整个请求体。
+    """
+
+    def __init__(self, stream, budget):
+        self._stream = stream
+        self.budget = budget
+        self.captured = bytearray()
+
+    def _keep(self, data):
+        room = self.budget - len(self.captured)
+        if room > 0 and data:
+            self.captured += data[:room]
+        return data
+
+    def read(self, *args, **kwargs):
+        return self._keep(self._stream.read(*args, **kwargs))
+
+    def readline(self, *args, **kwargs):
+        return self._keep(self._stream.readline(*args, **kwargs))
+
+    def close(self):
+        close = getattr(self._stream, 'close', None)
+        if close:
+            close()
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+def _content_type(request):
+    return (request.META.get('CONTENT_TYPE') or '').split(';', 1)[0].strip().lower()
+
+
+def _content_length(request):
+    try:
+        return int(request.META.get('CONTENT_LENGTH') or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def install_body_capture(request, budget):
+    """
+    在视图执行前调用。multipart 请求（文件上传）不做任何包装，
+    其余带请求体的请求包装输入流，最多保留 budget 字节。
+    """
+    if request.method in ('GET', 'HEAD', 'OPTIONS'):
+        return None
+    if _content_type(request).startswith('multipart/'):
+        return None
+    if _content_length(request) <= 0:
+        return None
+    stream = getattr(request, '_stream', None)
+    if stream is None or getattr(request, '_read_started', False):
+        return None
+    capture = BodyCaptureStream(stream, budget)
+    request._stream = capture
+    return capture
+
+
+def _skip_ws(text, i, n):
+    while i < n and text[i] in ' \t\r\n':
+        i += 1
+    return i
+
+
+def _scan_string(text, i, n):
+    """text[i] 为起始引号，返回收尾引号之后的位置（截断时返回 n）。"""
+    j = i + 1
+    while j < n:
+        c = text[j]
+        if c == '\\':
+            j += 2
+            continue
+        if c == '"':
+            return j + 1
+        j += 1
+    return n
+
+
+def _skip_value(text, i, n):
+    """跳过一个完整的 JSON 值（字符串/对象/数组/标量），返回其后的位置。"""
+    i = _skip_ws(text, i, n)
+    if i >= n:
+        return n
+    c = text[i]
+    if c == '"':
+        return _scan_string(text, i, n)
+    if c in '{[':
+        depth = 0
+        while i < n:
+            c = text[i]
+            if c == '"':
+                i = _scan_string(text, i, n)
+                continue
+            if c in '{[':
+                depth += 1
+            elif c in '}]':
+                depth -= 1
+                if depth == 0:
+                    return i + 1
+            i += 1
+        return n
+    while i < n and text[i] not in ',}] \t\r\n':
+        i += 1
+    return i
+
+
+def mask_json_text(text):
+    """
+    对（可能被截断的）JSON 文本做单遍扫描，将任意层级敏感键的值替换为 ****。
+    不构建对象树，耗时与文本长度线性相关；截断处原样保留已扫描部分。
+    """
+    out = []
+    stack = []
+    expect_key = False
+    pending_key = None
+    i = 0
+    n = len(text)
+    while i < n:
+        c = text[i]
+        if c == '"':
+            j = _scan_string(text, i, n)
+            token = text[i:j]
+            if expect_key and stack and stack[-1] == '{':
+                try:
+                    pending_key = json.loads(token)
+                except ValueError:
+                    pending_key = token.strip('"')
+                expect_key = False
+            out.append(token)
+            i = j
+            continue
+        if c == ':' and stack and stack[-1] == '{':
+            out.append(c)
+            i += 1
+            if is_sensitive_key(pending_key):
+                i = _skip_value(text, i, n)
+                out.append('"' + MASK + '"')
+            pending_key = None
+            continue
+        if c == '{':
+            stack.append('{')
+            expect_key = True
+        elif c == '[':
+            stack.append('[')
+            expect_key = False
+        elif c in '}]':
+            if stack:
+                stack.pop()
+            expect_key = False
+        elif c == ',':
+            expect_key = bool(stack) and stack[-1] == '{'
+        out.append(c)
+        i += 1
+    return ''.join(out)
+
+
+def _mask_form_text(text):
+    pairs = parse_qsl(text, keep_blank_values=True)
+    return json.dumps({k: mask_value(k, v) for k, v in pairs}, ensure_ascii=False)
+
+
+def _multipart_snapshot(request):
+    # 仅使用视图已解析好的文本字段；文件部分只记录文件名，不读取内容
+    data = {}
+    post = getattr(request, '_post', None)
+    if post is not None:
+        for k in post.keys():
+            data[k] = mask_value(k, post.get(k))
+    files = getattr(request, '_files', None)
+    if files is not None:
+        for k in files.keys():
+            f = files.get(k)
+            data[k] = f"<file:{getattr(f, 'name', '')}>"
+    return json.dumps(data, ensure_ascii=False)
+
+
+def build_params_snapshot(request, capture=None, budget=None):
+    """
+    生成操作日志的请求参数快照，读取量不超过 budget 字节：
+    - GET：查询参数
+    - multipart：已解析的文本字段 + 文件名
+    - JSON / 表单：截取前 budget 字节后脱敏
+    """
+    if budget is None:
+        budget = get_capture_config()['PARAM_MAX_BYTES']
+    try:
+        if request.method == 'GET':
+            params = {}
+            for k, v in request.GET.items():
+                params[k] = mask_value(k, v)
+            return json.dumps(params, ensure_ascii=False)[:budget]
+
+        ctype = _content_type(request)
+        if ctype.startswith('multipart/'):
+            return _multipart_snapshot(request)[:budget]
+
+        if hasattr(request, '_body'):
+            raw = request._body[:budget]
+        elif capture is not None and capture.captured:
+            raw = bytes(capture.captured)
+        elif not getattr(request, '_read_started', False) and _content_length(request) > 0:
+            # 视图未读取请求体：此时读取前 budget 字节不影响业务
+            raw = request.read(budget)
+        else:
+            raw = b''
+        if not raw:
+            return ''
+        truncated = _content_length(request) > len(raw)
+        text = raw.decode('utf-8', errors='ignore')
+
+        if ctype == 'application/x-www-form-urlencoded':
+            result = _mask_form_text(text)
+        elif ctype.endswith('json') or text.lstrip()[:1] in ('{', '['):
+            result = mask_json_text(text)
+        elif ctype.startswith('text/') or not ctype:
+            result = text
+        else:
+            return f'<{ctype} {_content_length(request)} bytes>'
+        if truncated:
+            result += TRUNCATED_MARK
+        return result
+    except Exception:
+        return ''
+
+
+def _response_content_type(response):
+    try:
+        return (response.get('Content-Type') or '').split(';', 1)[0].strip().lower()
+    except Exception:
+        return ''
+
+
+def _is_text_type(ctype):
+    return ctype.startswith('text/') or ctype in TEXT_CONTENT_TYPES or ctype.endswith('+json')
+
+
+def _cut_utf8(data, limit):
+    # 按字节截取，丢弃被截断的半个多字节字符
+    return data[:limit].decode('utf-8', errors='ignore')
+
+
+def capped_json_dumps(data, limit):
+    """
+    增量编码 data，累计到 limit 字节即停止，返回 (文本, 是否截断)。
+    编码耗时与 limit 相关，与数据总量无关（单个超长字符串除外）。
+    """
+    from rest_framework.utils.encoders import JSONEncoder
+
+    parts = []
+    size = 0
+    for chunk in JSONEncoder(ensure_ascii=False).iterencode(data):
+        parts.append(chunk)
+        size += len(chunk.encode('utf-8'))
+        if size >= limit:
+            return _cut_utf8(''.join(parts).encode('utf-8'), limit), True
+    return ''.join(parts), False
+
+
+def build_result_snapshot(response, limit=None):
+    """
+    生成操作日志的响应结果快照，处理量不超过 limit 字节：
+    - 流式响应（文件下载等）、附件（Excel / CSV 导出）、二进制类型：只记录类型与大小
+    - 已渲染的响应：直接截取渲染后的字节，不再重新序列化
+    - 未渲染的 DRF 响应：增量编码 response.data，到达上限即停止
+    """
+    if response is None:
+        return ''
+    if limit is None:
+        limit = get_capture_config()['RESULT_MAX_BYTES']
+    try:
+        ctype = _response_content_type(response)
+        if getattr(response, 'streaming', False):
+            return f'<streaming {ctype}>'
+        if 'attachment' in (response.get('Content-Disposition') or '').lower():
+            return f'<attachment {ctype}>'
+        if ctype and not _is_text_type(ctype):
+            size = response.get('Content-Length') or len(getattr(response, 'content', b''))
+            return f'<{ctype} {size} bytes>'
+
+        if hasattr(response, 'data') and not getattr(response, 'is_rendered', True):
+            text, truncated = capped_json_dumps(response.data, limit)
+        else:
+            content = response.content
+            truncated = len(content) > limit
+            text = _cut_utf8(content, limit)
+        if truncated:
+            text += TRUNCATED_MARK
+        return text
+    except Exception:
+        return ''
@@ -0,0 +1,37 @@
+import logging
+
+from django.utils import timezone
+
+from apps.common.clientip import get_client_ip
+from apps.common.iplocation import ip_locator
+from apps.common.useragent import parse_user_agent
+from .models import Logininfor
+from .writer import get_login_log_writer
+
+
+logger = logging.getLogger(__name__)
+
+STATUS_SUCCESS = '0'
+STATUS_FAIL = '1'
+
+
+def record_login_event(request, username, success, msg):
+    """
+    登录/退出事件写入 sys_logininfor：浏览器、操作系统取自 UA（带缓存的解析），归属地取自离线 IP 段表，
+    记录交给登录日志写入器异步批量写入。记录失败不影响登录流程。
+    """
+    try:
+        ip = get_client_ip(request)
+        browser, os_name = parse_user_agent(request.META.get('HTTP_USER_AGENT', ''))
+        get_login_log_writer().submit(Logininfor(
+            user_name=(username or '')[:50],
+            ipaddr=ip[:128],
+            login_location=ip_locator.lookup(ip),
+            browser=browser,
+            os=os_name,
+            status=STATUS_SUCCESS if success else STATUS_FAIL,
+            msg=(msg or '')[:255],
+            login_time=timezone.now(),
+        ))
+    except Exception:
+        logger.exception('登录日志记录失败：%s', username)
@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from apps.monitor.writer import get_login_log_writer, get_oper_log_writer
+
+
+WRITERS = {
+    'operlog': get_oper_log_writer,
+    'logininfor': get_login_log_writer,
+}
+
+
+class Command(BaseCommand):
+    help = "把本地 spool 中已封存的操作/登录日志分段批量导入数据库（按检查点续传，导入完成的分段会被删除）"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--name', choices=sorted(WRITERS), action='append', help='只导入指定日志（可重复），默认全部')
+        parser.add_argument('--follow', action='store_true', help='常驻运行，按 --interval 轮询（OPER_LOG_SPOOL MODE=spool 时使用）')
+        parser.add_argument('--interval', type=float, default=2.0, help='--follow 模式下的轮询间隔（秒）')
+
+    def handle(self, *args, **options):
+        writers = [WRITERS[name]() for name in (options['name'] or sorted(WRITERS))]
+        while True:
+            for writer in writers:
+                try:
+                    close_old_connections()
+                    count = writer.ingest_spool()
+                except Exception as e:
+                    if not options['follow']:
+                        raise
+                    self.stderr.write(f"{writer.name} 导入失败，稍后重试：{e}")
+                    continue
+                if count or not options['follow']:
+                    self.stdout.write(self.style.SUCCESS(f"{writer.name}：导入 {count} 条"))
+            if not options['follow']:
+                return
+            time.sleep(options['interval'])
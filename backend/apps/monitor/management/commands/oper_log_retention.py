@@ -0,0 +1,42 @@
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from apps.monitor.partitions import get_partition_config, get_partition_manager, retention_cutoff
+from apps.monitor.rollup import get_rollup_config, purge_stats
+
+
+class Command(BaseCommand):
+    help = "操作日志保留期维护：预建未来分区、整分区删除过期数据、分批删除剩余过期行（建议每日定时执行）"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--retention-months', type=int, default=None, help='保留最近 N 个自然月（默认取 OPER_LOG_PARTITION）')
+        parser.add_argument('--dry-run', action='store_true', help='仅输出将要删除的分区')
+
+    def handle(self, *args, **options):
+        conf = get_partition_config()
+        months = options['retention_months'] or conf['RETENTION_MONTHS']
+        cutoff = retention_cutoff(months)
+        manager = get_partition_manager()
+
+        if options['dry_run']:
+            expired = [name for name, start in manager.partitions() if start is not None and start < cutoff]
+            self.stdout.write(f"截止时间：{cutoff:%Y-%m-%d}；待删除分区：{', '.join(expired) or '无'}")
+            return
+
+        if manager.native and not manager.is_partitioned():
+            # 迁移时未开启 NATIVE，首次开启后在这里把已有表转为分区表
+            with connection.schema_editor() as schema_editor:
+                manager.setup(schema_editor)
+            self.stdout.write('已将 sys_oper_log 转为按月分区表')
+        created = manager.ensure()
+        dropped = manager.drop_before(cutoff)
+        deleted = manager.purge_before(cutoff)
+        # 分钟级统计只保留最近几天，小时级与原始日志保留期一致
+        minute_cutoff = datetime.now() - timedelta(days=get_rollup_config()['MINUTE_RETENTION_DAYS'])
+        stats_deleted = purge_stats(minute_cutoff, cutoff)
+        self.stdout.write(self.style.SUCCESS(
+            f"截止时间：{cutoff:%Y-%m-%d}；新建分区 {len(created)} 个；删除分区 {len(dropped)} 个；分批删除 {deleted} 行；"
+            f"清理统计 {stats_deleted} 行"
+        ))
@@ -0,0 +1,303 @@
+import bisect
+import json
+import os
+import threading
+import weakref
+
+from django.conf import settings
+
+from . import workerfiles
+
+
+DEFAULT_METRICS_CONFIG = {
+    'ENABLED': True,
+    'DIR': None,                 # 多进程汇总目录，默认 <BASE_DIR>/logs/metrics
+    'TOKEN': '',                 # 设置后抓取需携带 Authorization: Bearer <TOKEN>
+    'ALLOWED_IPS': ['127.0.0.1', '::1'],   # 未设置 TOKEN 时允许抓取的来源地址
+    'DEAD_WORKER_TTL_S': 3600,   # 已退出 worker 的计数保留时长
+}
+
+# 请求耗时直方图桶（秒）
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+HELP = {
+    'http_requests_total': ('counter', '按视图统计的请求数'),
+    'http_request_duration_seconds': ('histogram', '按视图统计的请求耗时'),
+    'db_queries_total': ('counter', '按视图统计的 SQL 执行次数'),
+    'db_query_duration_seconds_total': ('counter', '按视图统计的 SQL 执行耗时'),
+    'cache_hits_total': ('counter', '缓存命中次数'),
+    'cache_misses_total': ('counter', '缓存未命中次数'),
+    'cache_sets_total': ('counter', '缓存写入次数'),
+    'cache_evictions_total': ('counter', '缓存主动清理的键数'),
+    'cache_expired_total': ('counter', '缓存过期的键数'),
+    'cache_keys': ('gauge', '缓存当前键数'),
+    'cache_bytes': ('gauge', '缓存当前占用（序列化大小）'),
+    'log_writer_queue_depth': ('gauge', '日志写入队列当前长度'),
+    'log_writer_records_total': ('counter', '日志写入器处理的记录数'),
+    'process_resident_memory_bytes': ('gauge', 'worker 常驻内存'),
+}
+
+
+def get_metrics_config():
+    conf = dict(DEFAULT_METRICS_CONFIG)
+    conf.update(getattr(settings, 'MONITOR_METRICS', None) or {})
+    if not conf['DIR']:
+        conf['DIR'] = os.path.join(str(settings.BASE_DIR), 'logs', 'metrics')
+    return conf
+
+
+class _Shard:
+    """单个线程的累加区：只有所属线程写入，热路径无需加锁。"""
+    __slots__ = ('counters', 'histograms')
+
+    def __init__(self):
+        self.counters = {}
+        self.histograms = {}
+
+    def merge(self, other):
+        for key, value in other.counters.items():
+            self.counters[key] = self.counters.get(key, 0) + value
+        for key, (counts, total, buckets) in other.histograms.items():
+            h = self.histograms.get(key)
+            if h is None:
+                self.histograms[key] = [list(counts), total, buckets]
+            else:
+                h[0] = [a + b for a, b in zip(h[0], counts)]
+                h[1] += total
+
+
+class _ShardOwner:
+    """放在线程局部变量中的哨兵：线程退出时随之回收，触发分片归并。"""
+    __slots__ = ('__weakref__',)
+
+
+class MetricsRegistry:
+    """
+    进程内指标：计数器与直方图按线程分片累加，导出时合并。
+    线程退出后其分片归并到进程级的基础累加区，分片数只与存活线程数有关（runserver 等每请求一个线程时不会增长）。
+    各 worker 随系统采样把合并结果写到 DIR/<pid>.json，抓取时汇总所有 worker；
+    计数器保留已退出 worker 的最终值（DEAD_WORKER_TTL_S 内），gauge 只统计存活 worker。
+    """
+
+    def __init__(self, directory=None, dead_worker_ttl_s=3600):
+        self.directory = directory
+        self.dead_worker_ttl = float(dead_worker_ttl_s)
+        self._local = threading.local()
+        self._shards = set()
+        self._base = _Shard()
+        self._lock = threading.Lock()
+        self._collectors = []
+        self._pid = os.getpid()
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None or self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    # fork 后子进程从零开始
+                    self._pid = os.getpid()
+                    self._shards = set()
+                    self._base = _Shard()
+                shard = _Shard()
+                self._shards.add(shard)
+            owner = _ShardOwner()
+            weakref.finalize(owner, self._retire, shard, os.getpid())
+            self._local.shard = shard
+            self._local.owner = owner
+        return shard
+
+    def _retire(self, shard, pid):
+        # 所属线程已退出，不会再写入该分片
+        with self._lock:
+            if pid != self._pid or shard not in self._shards:
+                return
+            self._shards.discard(shard)
+            self._base.merge(shard)
+
+    # ----- 记录 -----
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        counters = self._shard().counters
+        counters[key] = counters.get(key, 0) + value
+
+    def observe(self, name, value, buckets=LATENCY_BUCKETS, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        histograms = self._shard().histograms
+        h = histograms.get(key)
+        if h is None:
+            h = histograms[key] = [[0] * (len(buckets) + 1), 0.0, buckets]
+        h[0][bisect.bisect_left(buckets, value)] += 1
+        h[1] += value
+
+    def add_collector(self, func):
+        """注册抓取时执行的回调：func() -> [(type, name, labels_dict, value)]，type 为 counter/gauge。"""
+        if func not in self._collectors:
+            self._collectors.append(func)
+
+    # ----- 合并与多进程 -----
+    def collect_local(self):
+        """当前进程的合并结果：{'counters': {...}, 'gauges': {...}, 'histograms': {...}}，键为 name|json(labels)。"""
+        counters, gauges, histograms = {}, {}, {}
+        with self._lock:
+            shards = list(self._shards)
+            base = _Shard()
+            base.merge(self._base)
+        for shard in [base] + shards:
+            for (name, labels), value in list(shard.counters.items()):
+                k = _key(name, labels)
+                counters[k] = counters.get(k, 0) + value
+            for (name, labels), (counts, total, buckets) in list(shard.histograms.items()):
+                k = _key(name, labels)
+                h = histograms.get(k)
+                if h is None:
+                    h = histograms[k] = {'buckets': list(buckets), 'counts': [0] * len(counts), 'sum': 0.0}
+                h['counts'] = [a + b for a, b in zip(h['counts'], counts)]
+                h['sum'] += total
+        for func in list(self._collectors):
+            try:
+                samples = func()
+            except Exception:
+                continue
+            for kind, name, labels, value in samples:
+                k = _key(name, tuple(sorted(labels.items())))
+                target = counters if kind == 'counter' else gauges
+                target[k] = target.get(k, 0) + value
+        return {'pid': os.getpid(), 'counters': counters, 'gauges': gauges, 'histograms': histograms}
+
+    def publish(self):
+        data = self.collect_local()
+        workerfiles.publish(self.directory, data['pid'], data)
+
+    def collect_all(self, live_max_age_s=30):
+        """汇总所有 worker：本进程取实时值，其余取各自最近一次发布的快照。"""
+        snapshots = [(self.collect_local(), True)]
+        for data, age in workerfiles.read_all(self.directory, self.dead_worker_ttl, exclude_pid=os.getpid()):
+            snapshots.append((data, age <= live_max_age_s))
+
+        counters, gauges, histograms = {}, {}, {}
+        for data, live in snapshots:
+            for k, v in data['counters'].items():
+                counters[k] = counters.get(k, 0) + v
+            if live:
+                for k, v in data['gauges'].items():
+                    gauges[k] = gauges.get(k, 0) + v
+            for k, h in data['histograms'].items():
+                agg = histograms.get(k)
+                if agg is None:
+                    histograms[k] = {'buckets': h['buckets'], 'counts': list(h['counts']), 'sum': h['sum']}
+                else:
+                    agg['counts'] = [a + b for a, b in zip(agg['counts'], h['counts'])]
+                    agg['sum'] += h['sum']
+        return counters, gauges, histograms
+
+    def totals(self, name, live_max_age_s=30):
+        """某个指标在全部 worker 上的汇总：{labels 元组: 值}（计数器与 gauge）。"""
+        counters, gauges, _ = self.collect_all(live_max_age_s)
+        result = {}
+        for store in (counters, gauges):
+            for k, v in store.items():
+                metric, labels = _split_key(k)
+                if metric == name:
+                    labels = tuple(labels)
+                    result[labels] = result.get(labels, 0) + v
+        return result
+
+    # ----- 导出 -----
+    def render(self, live_max_age_s=30):
+        """Prometheus 文本格式（0.0.4）。"""
+        counters, gauges, histograms = self.collect_all(live_max_age_s)
+        families = {}
+        for store, kind in ((counters, 'counter'), (gauges, 'gauge'), (histograms, 'histogram')):
+            for k, v in store.items():
+                name, labels = _split_key(k)
+                families.setdefault(name, (kind, []))[1].append((labels, v))
+
+        lines = []
+        for name in sorted(families):
+            kind, samples = families[name]
+            help_text = HELP.get(name, (kind, name))[1]
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            for labels, value in sorted(samples, key=lambda s: s[0]):
+                if kind != 'histogram':
+                    lines.append(f'{name}{_fmt_labels(labels)} {_fmt_value(value)}')
+                    continue
+                cumulative = 0
+                for bound, count in zip(list(value['buckets']) + ['+Inf'], value['counts']):
+                    cumulative += count
+                    le = bound if bound == '+Inf' else _fmt_value(bound)
+                    lines.append(f'{name}_bucket{_fmt_labels(labels + [("le", le)])} {cumulative}')
+                lines.append(f'{name}_sum{_fmt_labels(labels)} {_fmt_value(value["sum"])}')
+                lines.append(f'{name}_count{_fmt_labels(labels)} {cumulative}')
+        return '\n'.join(lines) + '\n'
+
+
+def _key(name, labels):
+    return name + '|' + json.dumps(labels, ensure_ascii=False, separators=(',', ':'))
+
+
+def _split_key(key):
+    name, _, labels = key.partition('|')
+    return name, [tuple(pair) for pair in json.loads(labels)]
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _fmt_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in labels) + '}'
+
+
+def _fmt_value(value):
+    if isinstance(value, float):
+        return repr(round(value, 6))
+    return str(value)
+
+
+_conf = get_metrics_config()
+metrics = MetricsRegistry(directory=_conf['DIR'], dead_worker_ttl_s=_conf['DEAD_WORKER_TTL_S'])
+
+
+def _builtin_collector():
+    """抓取时读取已有的进程内统计：日志写入器、缓存命名空间、组织目录、认证用户、授权与路由树缓存、进程内存。"""
+    from apps.common.cache import all_namespaces
+    from apps.system.authentication import auth_user_cache
+    from apps.system.authz import authz_cache
+    from apps.system.directory import org_directory
+    from apps.system.menutree import router_cache
+    from .runtime import _read_memory
+    from .writer import all_writer_stats
+
+    samples = []
+    for s in all_writer_stats():
+        writer = {'writer': s['name']}
+        samples.append(('gauge', 'log_writer_queue_depth', writer, s['queueSize']))
+        for outcome in ('written', 'dropped', 'failed', 'spooled'):
+            samples.append(('counter', 'log_writer_records_total', {**writer, 'outcome': outcome}, s.get(outcome, 0)))
+    for ns in all_namespaces():
+        st = ns.stats()
+        cache = {'cache': ns.name}
+        for field in ('hits', 'misses', 'sets', 'evictions', 'expired'):
+            samples.append(('counter', f'cache_{field}_total', cache, st[field]))
+        samples.append(('gauge', 'cache_keys', cache, st['keys']))
+        samples.append(('gauge', 'cache_bytes', cache, st['bytes']))
+    stats = org_directory.stats()
+    samples.append(('counter', 'cache_hits_total', {'cache': 'org_directory'}, stats['hits']))
+    samples.append(('counter', 'cache_misses_total', {'cache': 'org_directory'}, stats['misses']))
+    stats = authz_cache.stats()
+    samples.append(('counter', 'cache_hits_total', {'cache': 'authz'}, stats['hits']))
+    samples.append(('counter', 'cache_misses_total', {'cache': 'authz'}, stats['misses']))
+    stats = auth_user_cache.stats()
+    samples.append(('counter', 'cache_hits_total', {'cache': 'auth_user'}, stats['hits']))
+    samples.append(('counter', 'cache_misses_total', {'cache': 'auth_user'}, stats['misses']))
+    stats = router_cache.stats()
+    samples.append(('counter', 'cache_hits_total', {'cache': 'routers'}, stats['hits']))
+    samples.append(('counter', 'cache_misses_total', {'cache': 'routers'}, stats['misses']))
+    samples.append(('gauge', 'process_resident_memory_bytes', {}, _read_memory()[0]))
+    return samples
+
+
+metrics.add_collector(_builtin_collector)
@@ -1,70 +1,84 @@
-import json
+import logging
+import sys
 import time
-from datetime import datetime
 
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
 from django.utils import timezone
+from django.utils.functional import SimpleLazyObject, empty
 
+from apps.common.clientip import get_client_ip
+from apps.common.iplocation import ip_locator
+from apps.system.directory import org_directory
+from .capture import get_capture_config, install_body_capture, build_params_snapshot, build_result_snapshot
+from .metrics import get_metrics_config, metrics
 from .models import OperLog
+from .policy import load_policy
+from .profiler import get_profiler_config, request_profiler
+from .sqlprofile import SqlProfiler, get_sql_profile_config
+from .writer import get_oper_log_writer
 
 
-SENSITIVE_KEYS = {"password", "pwd", "pass", "secret", "token", "accessToken"}
+logger = logging.getLogger(__name__)
 
+# OPER_LOG_MIDDLEWARE['ASYNC']：本模块的中间件在 ASGI 下是否以异步方式参与中间件链
+ASYNC_MIDDLEWARE = bool((getattr(settings, 'OPER_LOG_MIDDLEWARE', None) or {}).get('ASYNC', False))
 
-def _mask_value(key, value):
-    if key and key.lower() in SENSITIVE_KEYS:
-        return "****"
-    return value
 
-
-def _build_params_snapshot(request):
+def _get_dept_name(user, load=True):
     try:
-        if request.method == 'GET':
-            # Query params
-            params = {}
-            for k, v in request.GET.items():
-                params[k] = _mask_value(k, v)
-            return json.dumps(params, ensure_ascii=False)
-        else:
-            # Body params
-            try:
-                body = request.body.decode('utf-8') if request.body else ''
-                # Try json
-                try:
-                    data = json.loads(body)
-                    if isinstance(data, dict):
-                        for k in list(data.keys()):
-                            data[k] = _mask_value(k, data[k])
-                        return json.dumps(data, ensure_ascii=False)
-                    return body[:4000]
-                except Exception:
-                    return body[:4000]
-            except Exception:
-                return ''
+        if user and getattr(user, 'dept_id', None):
+            return org_directory.dept_name(user.dept_id, load=load)
     except Exception:
-        return ''
+        pass
+    return ''
 
 
-def _get_client_ip(request):
-    xff = request.META.get('HTTP_X_FORWARDED_FOR')
-    if xff:
-        # First IP in XFF
-        ip = xff.split(',')[0].strip()
-        if ip:
-            return ip
-    return request.META.get('REMOTE_ADDR', '')
+async def _aget_user(request):
+    # DRF 认证后会把用户写回 request.user；仍是未求值的惰性对象时走 auser()，避免在事件循环中同步查库
+    user = request.__dict__.get('user')
+    if isinstance(user, SimpleLazyObject) and user._wrapped is empty:
+        auser = getattr(request, 'auser', None)
+        return await auser() if auser else None
+    return user
 
 
-def _get_dept_name(user):
+def _resolve_view_name(request):
+    # 解析路由匹配信息
     try:
-        from apps.system.models import Dept
-        if user and getattr(user, 'dept_id', None):
-            d = Dept.objects.filter(dept_id=user.dept_id).first()
-            return d.dept_name if d else ''
+        rm = getattr(request, 'resolver_match', None)
+        if rm:
+            if rm.view_name:
+                return rm.view_name
+            if rm.func:
+                return getattr(rm.func, '__name__', '')
     except Exception:
         pass
     return ''
 
 
+def _response_status(response, error_msg):
+    """0 成功 / 1 失败：DRF 响应需 HTTP 200 且 data.code == 200。"""
+    if error_msg:
+        return 1
+    status_code = getattr(response, 'status_code', 500)
+    try:
+        if hasattr(response, 'data'):
+            code_in_data = None
+            try:
+                code_in_data = int(response.data.get('code'))
+            except Exception:
+                pass
+            return 0 if status_code == 200 and code_in_data == 200 else 1
+        if hasattr(response, 'content'):
+            return 0 if status_code == 200 else 1
+    except Exception:
+        pass
+    return 0
+
+
 def _business_type_from_method(method: str) -> int:
     m = (method or '').upper()
     if m == 'GET':
@@ -78,16 +92,202 @@ def _business_type_from_method(method: str) -> int:
     return 0      # 其他
 
 
+class _QueryCounter:
+    """connection.execute_wrapper 回调：累计本次请求的 SQL 次数与耗时。"""
+    __slots__ = ('count', 'seconds')
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - start
+            self.count += 1
+
+
+class RequestMetricsMiddleware:
+    """
+    /api/ 请求指标：按路由名（view_name）统计请求数、耗时直方图、SQL 次数与耗时，
+    由 /api/monitor/metrics 以 Prometheus 文本格式导出（metrics.py）。
+    放在中间件链最前面，耗时包含其余中间件；未匹配路由的请求记为 view="unmatched"。
+    与 OperLogMiddleware 一样随 OPER_LOG_MIDDLEWARE['ASYNC'] 支持异步，异步链路中不统计 SQL
+    （同步视图运行在另一个线程，execute_wrapper 包不到）。
+    """
+    sync_capable = True
+    async_capable = ASYNC_MIDDLEWARE
+
+    def __init__(self, get_response):
+        if not get_metrics_config()['ENABLED']:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        path = request.path or ''
+        if not path.startswith('/api/'):
+            return self.get_response(request)
+
+        start = time.perf_counter()
+        queries = _QueryCounter()
+        status = 500
+        try:
+            with connection.execute_wrapper(queries):
+                response = self.get_response(request)
+            status = response.status_code
+            return response
+        finally:
+            self._record(request, status, time.perf_counter() - start, queries)
+
+    async def __acall__(self, request):
+        path = request.path or ''
+        if not path.startswith('/api/'):
+            return await self.get_response(request)
+
+        start = time.perf_counter()
+        status = 500
+        try:
+            response = await self.get_response(request)
+            status = response.status_code
+            return response
+        finally:
+            self._record(request, status, time.perf_counter() - start, None)
+
+    def _record(self, request, status, elapsed, queries):
+        view = _resolve_view_name(request) or 'unmatched'
+        metrics.inc('http_requests_total', view=view, method=request.method, status=str(status))
+        metrics.observe('http_request_duration_seconds', elapsed, view=view)
+        if queries is not None and queries.count:
+            metrics.inc('db_queries_total', queries.count, view=view)
+            metrics.inc('db_query_duration_seconds_total', queries.seconds, view=view)
+
+
+class SlowRequestProfilerMiddleware:
+    """
+    慢请求采样剖析（profiler.py）：/api/ 请求进行中由后台线程抓取调用栈，耗时超过 THRESHOLD_MS 的
+    结果按 view_name 保存为折叠栈，在 /api/monitor/profile 查看。
+    流式响应（如日志导出）在内容生成完成后才结束采样，耗时包含生成过程。
+    采样按请求所在线程进行，只支持同步链路：OPER_LOG_MIDDLEWARE['ASYNC'] 开启时不启用，
+    避免这一层把 ASGI 下的中间件链退回同步。
+    """
+    sync_capable = True
+    async_capable = False
+
+    def __init__(self, get_response):
+        if not get_profiler_config()['ENABLED']:
+            raise MiddlewareNotUsed()
+        if ASYNC_MIDDLEWARE:
+            logger.warning("REQUEST_PROFILER 只支持同步中间件链，OPER_LOG_MIDDLEWARE['ASYNC'] 开启时不启用")
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        path = request.path or ''
+        if not path.startswith('/api/'):
+            return self.get_response(request)
+
+        start = time.perf_counter()
+        entry = request_profiler.begin(sys._getframe())
+        response = None
+        try:
+            response = self.get_response(request)
+        finally:
+            if response is not None and getattr(response, 'streaming', False):
+                request_profiler.suspend()
+                response.streaming_content = self._stream(response.streaming_content, entry, request, start)
+            else:
+                self._finish(entry, request, start)
+        return response
+
+    def _stream(self, content, entry, request, start):
+        request_profiler.resume(entry, sys._getframe())
+        try:
+            yield from content
+        finally:
+            self._finish(entry, request, start)
+
+    def _finish(self, entry, request, start):
+        try:
+            request_profiler.end(
+                entry, _resolve_view_name(request) or 'unmatched', request.path, request.method,
+                time.perf_counter() - start,
+            )
+        except Exception:
+            logger.exception('慢请求采样记录失败：%s', request.path)
+
+
 class OperLogMiddleware:
     """
     记录后端接口的操作日志：请求方法、路径、用户、参数、响应结果等。
     仅记录以 /api/ 开头的接口，避免前端静态资源噪音。
+    是否记录由 OPER_LOG_POLICY 按 view_name / 路径决定（policy.py）。
+
+    OPER_LOG_MIDDLEWARE['ASYNC'] 开启后同时支持异步：ASGI 下走 __acall__，不在事件循环中访问数据库，
+    日志记录通过 writer.asubmit 非阻塞入队。默认关闭：Django 自带的 MiddlewareMixin 中间件
+    在异步链路中每个钩子都会切换一次线程，视图仍为同步的 DRF 视图时反而比整条同步链路更慢。
+
+    SQL_PROFILE['ENABLED'] 开启后按采样对请求做 SQL 画像（sqlprofile.py），结果写入日志的
+    sql_count / sql_time / sql_detail 并按视图汇总。只在同步链路生效：execute_wrapper 挂在当前线程的连接上，
+    异步链路中同步视图运行在另一个线程，包不到视图内的查询。
     """
+    sync_capable = True
+    async_capable = ASYNC_MIDDLEWARE
 
     def __init__(self, get_response):
         self.get_response = get_response
+        capture_conf = get_capture_config()
+        self.param_budget = capture_conf['PARAM_MAX_BYTES']
+        self.result_budget = capture_conf['RESULT_MAX_BYTES']
+        # 策略在启动时编译一次
+        self.policy = load_policy()
+        self.sql_profiler = SqlProfiler(get_sql_profile_config())
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+            # Django 按 process_view 是否为协程决定是否包一层 sync_to_async，异步模式下换成协程版本
+            self.process_view = self._aprocess_view
+
+    def _prepare(self, request):
+        # 路由已解析、视图尚未执行：确定记录策略，需要记录时才包装请求体
+        path = request.path or ''
+        if not path.startswith('/api/'):
+            return
+        rule = self.policy.match(path, _resolve_view_name(request))
+        request._oper_log_rule = rule
+        if rule.enabled:
+            request._oper_log_capture = install_body_capture(request, self.param_budget)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        self._prepare(request)
+        return None
+
+    async def _aprocess_view(self, request, view_func, view_args, view_kwargs):
+        self._prepare(request)
+        return None
+
+    def _decide(self, request, response, path, error_msg, cost_time):
+        """返回需要记录时的 status 值，不记录返回 None。"""
+        rule = getattr(request, '_oper_log_rule', None)
+        if rule is None:
+            # 未进入 process_view（如 404），按路径匹配
+            rule = self.policy.match(path)
+        if not rule.enabled:
+            return None
+        status_val = _response_status(response, error_msg)
+        if rule.should_log(status_val != 0, cost_time):
+            return status_val
+        return None
 
     def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
         # 仅记录 API 路径
         path = request.path or ''
         if not path.startswith('/api/'):
@@ -96,8 +296,13 @@ class OperLogMiddleware:
         start_ts = time.time()
         error_msg = ''
         response = None
+        profile = self.sql_profiler.start()
         try:
-            response = self.get_response(request)
+            if profile is None:
+                response = self.get_response(request)
+            else:
+                with connection.execute_wrapper(profile):
+                    response = self.get_response(request)
             return response
         except Exception as e:
             error_msg = str(e)[:2000]
@@ -106,81 +311,85 @@ class OperLogMiddleware:
         finally:
             try:
                 cost_time = int((time.time() - start_ts) * 1000)
-                user = getattr(request, 'user', None)
-
-                # 解析路由匹配信息
-                view_name = ''
-                try:
-                    rm = getattr(request, 'resolver_match', None)
-                    if rm:
-                        if rm.view_name:
-                            view_name = rm.view_name
-                        elif rm.func:
-                            view_name = getattr(rm.func, '__name__', '')
-                except Exception:
-                    pass
-
-                # 构造 title：取 /api/ 后第一段作为模块名
-                try:
-                    # /api/<module>/...
-                    segs = path[len('/api/'):].split('/')
-                    title = segs[0] if segs and segs[0] else 'api'
-                except Exception:
-                    title = 'api'
-
-                # 请求参数快照
-                oper_param = _build_params_snapshot(request)
-
-                # 响应结果（尽量提取成功/失败与部分内容）
-                status_code = getattr(response, 'status_code', 500)
-                status_val = 0
-                json_result = ''
-                try:
-                    if hasattr(response, 'data'):
-                        # DRF Response
-                        data = response.data
-                        # 简化判断成功
-                        code_in_data = None
-                        try:
-                            code_in_data = int(data.get('code'))
-                        except Exception:
-                            pass
-                        status_val = 0 if status_code == 200 and code_in_data == 200 and not error_msg else 1
-                        json_result = json.dumps(data, ensure_ascii=False)[:4000]
-                    elif hasattr(response, 'content'):
-                        content = ''
-                        try:
-                            content = response.content.decode('utf-8', errors='ignore')
-                        except Exception:
-                            pass
-                        status_val = 0 if status_code == 200 and not error_msg else 1
-                        json_result = content[:2000]
-                    else:
-                        status_val = 1 if error_msg else 0
-                except Exception:
-                    status_val = 1 if error_msg else 0
-
-                # 保存操作日志
-                OperLog.objects.create(
-                    title=title,
-                    business_type=_business_type_from_method(request.method),
-                    method=view_name or request.method,
-                    request_method=request.method,
-                    operator_type=0,
-                    oper_name=(getattr(user, 'username', '') or ''),
-                    dept_name=_get_dept_name(user),
-                    oper_url=path,
-                    oper_ip=_get_client_ip(request),
-                    oper_location='',
-                    oper_param=oper_param,
-                    json_result=json_result,
-                    status=status_val,
-                    error_msg=error_msg,
-                    oper_time=timezone.now(),
-                    cost_time=cost_time,
-                    create_by=(getattr(user, 'username', '') or ''),
-                    update_by=(getattr(user, 'username', '') or ''),
-                )
+                sql_info = None
+                if profile is not None:
+                    sql_info = self.sql_profiler.finish(_resolve_view_name(request), profile)
+                status_val = self._decide(request, response, path, error_msg, cost_time)
+                if status_val is not None:
+                    user = getattr(request, 'user', None)
+                    record = self._build_record(
+                        request, response, path, status_val, error_msg, cost_time, user, _get_dept_name(user),
+                    )
+                    if sql_info is not None:
+                        record.sql_count, record.sql_time, record.sql_detail = sql_info
+                    get_oper_log_writer().submit(record)
+            except Exception:
+                # 避免日志写入影响主流程；写库失败由写入器落盘，这里只会是构造记录出错
+                logger.exception('操作日志记录失败：%s', path)
+
+    async def __acall__(self, request):
+        path = request.path or ''
+        if not path.startswith('/api/'):
+            return await self.get_response(request)
+
+        start_ts = time.time()
+        error_msg = ''
+        response = None
+        try:
+            response = await self.get_response(request)
+            return response
+        except Exception as e:
+            error_msg = str(e)[:2000]
+            raise
+        finally:
+            try:
+                cost_time = int((time.time() - start_ts) * 1000)
+                status_val = self._decide(request, response, path, error_msg, cost_time)
+                if status_val is not None:
+                    user = await _aget_user(request)
+                    # 部门名只读内存映射，不在事件循环中触发重新加载
+                    await get_oper_log_writer().asubmit(self._build_record(
+                        request, response, path, status_val, error_msg, cost_time, user, _get_dept_name(user, load=False),
+                    ))
             except Exception:
-                # 避免日志写入影响主流程
-                pass
\ No newline at end of file
+                logger.exception('操作日志记录失败：%s', path)
+
+    def _build_record(self, request, response, path, status_val, error_msg, cost_time, user, dept_name):
+        view_name = _resolve_view_name(request)
+
+        # 构造 title：取 /api/ 后第一段作为模块名
+        try:
+            # /api/<module>/...
+            segs = path[len('/api/'):].split('/')
+            title = segs[0] if segs and segs[0] else 'api'
+        except Exception:
+            title = 'api'
+
+        # 请求参数快照
+        oper_param = build_params_snapshot(request, getattr(request, '_oper_log_capture', None), self.param_budget)
+
+        # 响应结果（截取部分内容，二进制/流式响应只记录类型）
+        json_result = build_result_snapshot(response, self.result_budget)
+        ip = get_client_ip(request)
+
+        # 操作日志记录：由调用方入队，后台线程批量写入，不阻塞请求
+        return OperLog(
+            title=title,
+            business_type=_business_type_from_method(request.method),
+            method=view_name or request.method,
+            request_method=request.method,
+            operator_type=0,
+            oper_name=(getattr(user, 'username', '') or ''),
+            dept_name=dept_name,
+            oper_url=path,
+            oper_ip=ip,
+            oper_location=ip_locator.lookup(ip),
+            oper_param=oper_param,
+            json_result=json_result,
+            status=status_val,
+            error_msg=error_msg,
+            oper_time=timezone.now(),
+            cost_time=cost_time,
+            create_by=(getattr(user, 'username', '') or ''),
+            update_by=(getattr(user, 'username', '') or ''),
+        )
@@ -0,0 +1,19 @@
+from django.db import migrations
+
+
+def partition_oper_log(apps, schema_editor):
+    # Postgres / MySQL 转为按月 RANGE 分区；SQLite 无原生分区，保持原表
+    from apps.monitor.partitions import get_partition_manager
+    OperLog = apps.get_model('monitor', 'OperLog')
+    get_partition_manager(schema_editor.connection, OperLog).setup(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitor', '0002_logininfor'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_oper_log, migrations.RunPython.noop),
+    ]
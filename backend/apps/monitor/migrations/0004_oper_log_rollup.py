@@ -0,0 +1,61 @@
+# Generated by Django 5.2.8 on 2026-10-17 18:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitor', '0003_partition_oper_log'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OperLogHourStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.DateTimeField(verbose_name='时间桶')),
+                ('title', models.CharField(blank=True, default='', max_length=100, verbose_name='系统模块')),
+                ('oper_url', models.CharField(blank=True, default='', max_length=255, verbose_name='请求URL')),
+                ('request_method', models.CharField(blank=True, default='', max_length=10, verbose_name='请求方式')),
+                ('status', models.IntegerField(default=0, verbose_name='操作状态')),
+                ('count', models.BigIntegerField(default=0, verbose_name='请求数')),
+                ('error_count', models.BigIntegerField(default=0, verbose_name='失败数')),
+                ('cost_sum', models.BigIntegerField(default=0, verbose_name='耗时合计(毫秒)')),
+                ('cost_min', models.IntegerField(default=0, verbose_name='最小耗时(毫秒)')),
+                ('cost_max', models.IntegerField(default=0, verbose_name='最大耗时(毫秒)')),
+                ('sketch', models.TextField(blank=True, default='', verbose_name='耗时分布')),
+            ],
+            options={
+                'verbose_name': '操作日志小时统计',
+                'verbose_name_plural': '操作日志小时统计',
+                'db_table': 'sys_oper_log_stat_hour',
+                'indexes': [models.Index(fields=['bucket'], name='sys_oper_lo_bucket_01b51a_idx')],
+                'unique_together': {('bucket', 'title', 'oper_url', 'request_method', 'status')},
+            },
+        ),
+        migrations.CreateModel(
+            name='OperLogMinuteStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.DateTimeField(verbose_name='时间桶')),
+                ('title', models.CharField(blank=True, default='', max_length=100, verbose_name='系统模块')),
+                ('oper_url', models.CharField(blank=True, default='', max_length=255, verbose_name='请求URL')),
+                ('request_method', models.CharField(blank=True, default='', max_length=10, verbose_name='请求方式')),
+                ('status', models.IntegerField(default=0, verbose_name='操作状态')),
+                ('count', models.BigIntegerField(default=0, verbose_name='请求数')),
+                ('error_count', models.BigIntegerField(default=0, verbose_name='失败数')),
+                ('cost_sum', models.BigIntegerField(default=0, verbose_name='耗时合计(毫秒)')),
+                ('cost_min', models.IntegerField(default=0, verbose_name='最小耗时(毫秒)')),
+                ('cost_max', models.IntegerField(default=0, verbose_name='最大耗时(毫秒)')),
+                ('sketch', models.TextField(blank=True, default='', verbose_name='耗时分布')),
+            ],
+            options={
+                'verbose_name': '操作日志分钟统计',
+                'verbose_name_plural': '操作日志分钟统计',
+                'db_table': 'sys_oper_log_stat_minute',
+                'indexes': [models.Index(fields=['bucket'], name='sys_oper_lo_bucket_d797a6_idx')],
+                'unique_together': {('bucket', 'title', 'oper_url', 'request_method', 'status')},
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.8 on 2026-10-17 18:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitor', '0004_oper_log_rollup'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='logininfor',
+            index=models.Index(fields=['login_time', 'info_id'], name='sys_logininfor_time_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='operlog',
+            index=models.Index(fields=['oper_time', 'oper_id'], name='sys_oper_log_time_id_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-17 19:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitor', '0005_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='operlog',
+            name='sql_count',
+            field=models.IntegerField(default=0, verbose_name='SQL次数'),
+        ),
+        migrations.AddField(
+            model_name='operlog',
+            name='sql_detail',
+            field=models.TextField(blank=True, default='', verbose_name='重复SQL'),
+        ),
+        migrations.AddField(
+            model_name='operlog',
+            name='sql_time',
+            field=models.IntegerField(default=0, verbose_name='SQL耗时(毫秒)'),
+        ),
+    ]
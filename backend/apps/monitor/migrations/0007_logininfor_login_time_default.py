@@ -0,0 +1,19 @@
+# Generated by Django 5.2.8 on 2026-10-17 19:38
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitor', '0006_oper_log_sql_profile'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='logininfor',
+            name='login_time',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='访问时间'),
+        ),
+    ]
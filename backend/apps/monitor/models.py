@@ -22,6 +22,9 @@ class OperLog(BaseModel):
     error_msg = models.TextField(blank=True, default='', verbose_name='错误消息')
     oper_time = models.DateTimeField(default=timezone.now, verbose_name='操作时间')
     cost_time = models.IntegerField(default=0, verbose_name='消耗时间(毫秒)')
+    sql_count = models.IntegerField(default=0, verbose_name='SQL次数')
+    sql_time = models.IntegerField(default=0, verbose_name='SQL耗时(毫秒)')
+    sql_detail = models.TextField(blank=True, default='', verbose_name='重复SQL')
 
     class Meta:
         db_table = 'sys_oper_log'
@@ -31,6 +34,8 @@ class OperLog(BaseModel):
             models.Index(fields=['del_flag']),
             models.Index(fields=['status']),
             models.Index(fields=['oper_time']),
+            # 游标分页：(oper_time, oper_id)
+            models.Index(fields=['oper_time', 'oper_id'], name='sys_oper_log_time_id_idx'),
             models.Index(fields=['oper_name']),
             models.Index(fields=['title']),
             models.Index(fields=['business_type']),
@@ -49,11 +54,57 @@ class Logininfor(models.Model):
     os = models.CharField(max_length=50, verbose_name='操作系统', blank=True, null=True)
     status = models.CharField(max_length=1, default='0', verbose_name='登录状态')
     msg = models.CharField(max_length=255, verbose_name='提示消息', blank=True, null=True)
-    login_time = models.DateTimeField(verbose_name='访问时间', auto_now_add=True)
+    login_time = models.DateTimeField(verbose_name='访问时间', default=timezone.now)
 
     class Meta:
         db_table = 'sys_logininfor'
         verbose_name = '系统登录日志'
         verbose_name_plural = '系统登录日志'
         ordering = ['-login_time']
+        indexes = [
+            models.Index(fields=['login_time', 'info_id'], name='sys_logininfor_time_id_idx'),
+        ]
+
+
+
+class OperLogRollupBase(models.Model):
+    """
+    操作日志聚合（由 rollup.py 在日志批量写入后增量更新）。
+    oper_url 中的纯数字路径段归一为 {id}，避免按主键膨胀。
+    """
+    bucket = models.DateTimeField(verbose_name='时间桶')
+    title = models.CharField(max_length=100, blank=True, default='', verbose_name='系统模块')
+    oper_url = models.CharField(max_length=255, blank=True, default='', verbose_name='请求URL')
+    request_method = models.CharField(max_length=10, blank=True, default='', verbose_name='请求方式')
+    status = models.IntegerField(default=0, verbose_name='操作状态')
+    count = models.BigIntegerField(default=0, verbose_name='请求数')
+    error_count = models.BigIntegerField(default=0, verbose_name='失败数')
+    cost_sum = models.BigIntegerField(default=0, verbose_name='耗时合计(毫秒)')
+    cost_min = models.IntegerField(default=0, verbose_name='最小耗时(毫秒)')
+    cost_max = models.IntegerField(default=0, verbose_name='最大耗时(毫秒)')
+    sketch = models.TextField(blank=True, default='', verbose_name='耗时分布')
+
+    class Meta:
+        abstract = True
+
+
+class OperLogMinuteStat(OperLogRollupBase):
+    class Meta:
+        db_table = 'sys_oper_log_stat_minute'
+        verbose_name = '操作日志分钟统计'
+        verbose_name_plural = '操作日志分钟统计'
+        unique_together = ('bucket', 'title', 'oper_url', 'request_method', 'status')
+        indexes = [
+            models.Index(fields=['bucket']),
+        ]
+
 
+class OperLogHourStat(OperLogRollupBase):
+    class Meta:
+        db_table = 'sys_oper_log_stat_hour'
+        verbose_name = '操作日志小时统计'
+        verbose_name_plural = '操作日志小时统计'
+        unique_together = ('bucket', 'title', 'oper_url', 'request_method', 'status')
+        indexes = [
+            models.Index(fields=['bucket']),
+        ]
@@ -0,0 +1,320 @@
+import logging
+import re
+import time
+from datetime import datetime
+
+from django.conf import settings
+from django.db import connections, transaction, DEFAULT_DB_ALIAS
+
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_PARTITION_CONFIG = {
+    'NATIVE': False,           # PostgreSQL / MySQL 上使用原生按月分区；关闭时所有数据库都按主键分批删除
+    'RETENTION_MONTHS': 6,     # 保留最近 N 个自然月（含当月）
+    'PRECREATE_MONTHS': 2,     # 提前创建的分区月数
+    'DELETE_CHUNK_SIZE': 5000, # 分批删除时每批行数
+    'DELETE_PAUSE_MS': 20,     # 分批删除的批间停顿，让出写锁
+}
+
+
+def get_partition_config():
+    conf = dict(DEFAULT_PARTITION_CONFIG)
+    conf.update(getattr(settings, 'OPER_LOG_PARTITION', None) or {})
+    return conf
+
+
+def month_start(dt):
+    return datetime(dt.year, dt.month, 1)
+
+
+def add_months(dt, n):
+    idx = dt.year * 12 + (dt.month - 1) + n
+    return datetime(idx // 12, idx % 12 + 1, 1)
+
+
+def retention_cutoff(months, now=None):
+    """保留 months 个自然月时的截止时间（早于该时间的数据可删除）。"""
+    now = now or datetime.now()
+    return add_months(month_start(now), -(max(1, int(months)) - 1))
+
+
+class PartitionManager:
+    """
+    按月范围分区的通用接口，不支持原生分区的数据库退化为按主键分批删除。
+
+    setup()        将已有表转换为分区表（迁移中调用，一次性）
+    ensure()       预建未来若干月的分区
+    partitions()   [(分区名, 起始月)]
+    drop_before()  整分区删除早于截止时间的数据
+    purge_before() 分批删除早于截止时间的剩余行
+    truncate()     清空全部数据
+    """
+
+    table = 'sys_oper_log'
+    column = 'oper_time'
+    pk = 'oper_id'
+    native = False
+
+    def __init__(self, connection, model=None):
+        self.connection = connection
+        self._model = model
+
+    @property
+    def model(self):
+        if self._model is None:
+            from .models import OperLog
+            self._model = OperLog
+        return self._model
+
+    def q(self, name):
+        return self.connection.ops.quote_name(name)
+
+    def is_partitioned(self):
+        return False
+
+    def setup(self, schema_editor=None, months_ahead=None):
+        return None
+
+    def ensure(self, months_ahead=None, start=None):
+        return []
+
+    def partitions(self):
+        return []
+
+    def drop_before(self, cutoff):
+        dropped = []
+        for name, start in self.partitions():
+            if start is not None and add_months(start, 1) <= cutoff:
+                self._drop_partition(name)
+                dropped.append(name)
+        return dropped
+
+    def _drop_partition(self, name):
+        raise NotImplementedError
+
+    def purge_before(self, cutoff, chunk_size=None, pause_ms=None):
+        conf = get_partition_config()
+        return self._chunked_delete(
+            {f'{self.column}__lt': cutoff},
+            chunk_size or conf['DELETE_CHUNK_SIZE'],
+            conf['DELETE_PAUSE_MS'] if pause_ms is None else pause_ms,
+        )
+
+    def truncate(self):
+        conf = get_partition_config()
+        return self._chunked_delete({}, conf['DELETE_CHUNK_SIZE'], conf['DELETE_PAUSE_MS'])
+
+    def _chunked_delete(self, filters, chunk_size, pause_ms):
+        # 每批单独提交，避免一条 DELETE 长时间持有表锁
+        manager = self.model._base_manager.using(self.connection.alias)
+        total = 0
+        while True:
+            ids = list(manager.filter(**filters).order_by(self.pk).values_list(self.pk, flat=True)[:chunk_size])
+            if not ids:
+                break
+            deleted, _ = manager.filter(**{f'{self.pk}__in': ids}).delete()
+            total += deleted
+            if len(ids) < chunk_size:
+                break
+            if pause_ms:
+                time.sleep(pause_ms / 1000.0)
+        return total
+
+    def _months_to_create(self, start, months_ahead):
+        if months_ahead is None:
+            months_ahead = get_partition_config()['PRECREATE_MONTHS']
+        end = add_months(month_start(datetime.now()), int(months_ahead))
+        cur = month_start(start)
+        months = []
+        while cur <= end:
+            months.append(cur)
+            cur = add_months(cur, 1)
+        return months
+
+    def _execute(self, sql, params=None):
+        with self.connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            if cursor.description:
+                return cursor.fetchall()
+            return None
+
+
+class PostgresPartitionManager(PartitionManager):
+    """原生声明式分区：PARTITION BY RANGE (oper_time)，按月一个子表，另有 default 分区兜底。"""
+
+    native = True
+    name_re = re.compile(r'_p(\d{4})(\d{2})$')
+
+    def partition_name(self, month):
+        return f'{self.table}_p{month:%Y%m}'
+
+    def is_partitioned(self):
+        rows = self._execute(
+            "SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid "
+            "WHERE c.relname = %s AND pg_table_is_visible(c.oid)",
+            [self.table],
+        )
+        return bool(rows)
+
+    def setup(self, schema_editor=None, months_ahead=None):
+        if self.is_partitioned():
+            return None
+        legacy = f'{self.table}_legacy'
+        seq = f'{self.table}_{self.pk}_seq_p'
+        t, lg, pk, col = self.q(self.table), self.q(legacy), self.q(self.pk), self.q(self.column)
+
+        # 1. 旧表改名并移除其主键与索引（索引名在 schema 内唯一，需要在新表上复用）
+        self._execute(f'ALTER TABLE {t} RENAME TO {lg}')
+        self._execute(f'ALTER TABLE {lg} DROP CONSTRAINT IF EXISTS {self.q(self.table + "_pkey")}')
+        for index in self.model._meta.indexes:
+            self._execute(f'DROP INDEX IF EXISTS {self.q(index.name)}')
+
+        # 2. 建分区父表：主键必须包含分区键；自增改用独立序列
+        self._execute(f'CREATE TABLE {t} (LIKE {lg} INCLUDING DEFAULTS) PARTITION BY RANGE ({col})')
+        self._execute(f'CREATE SEQUENCE IF NOT EXISTS {self.q(seq)}')
+        self._execute(f"SELECT setval('{seq}', COALESCE((SELECT MAX({pk}) FROM {lg}), 0) + 1, false)")
+        self._execute(f"ALTER TABLE {t} ALTER COLUMN {pk} SET DEFAULT nextval('{seq}')")
+        self._execute(f'ALTER SEQUENCE {self.q(seq)} OWNED BY {t}.{pk}')
+        self._execute(f'ALTER TABLE {t} ADD PRIMARY KEY ({pk}, {col})')
+        for index in self.model._meta.indexes:
+            if schema_editor is not None:
+                schema_editor.add_index(self.model, index)
+
+        # 3. 建分区并迁移数据
+        rows = self._execute(f'SELECT MIN({col}) FROM {lg}')
+        first = rows[0][0] if rows and rows[0][0] else datetime.now()
+        self.ensure(months_ahead, start=first)
+        self._execute(f'CREATE TABLE IF NOT EXISTS {self.q(self.table + "_default")} PARTITION OF {t} DEFAULT')
+        self._execute(f'INSERT INTO {t} SELECT * FROM {lg}')
+        self._execute(f'DROP TABLE {lg}')
+        return None
+
+    def ensure(self, months_ahead=None, start=None):
+        created = []
+        existing = {name for name, _ in self.partitions()}
+        for month in self._months_to_create(start or datetime.now(), months_ahead):
+            name = self.partition_name(month)
+            if name in existing:
+                continue
+            try:
+                # 保存点：单个分区创建失败不影响外层事务
+                with transaction.atomic(using=self.connection.alias):
+                    self._execute(
+                        f'CREATE TABLE IF NOT EXISTS {self.q(name)} PARTITION OF {self.q(self.table)} '
+                        f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{add_months(month, 1):%Y-%m-%d}')"
+                    )
+                created.append(name)
+            except Exception:
+                # default 分区中已有该月数据时无法直接建分区，留待人工处理
+                logger.exception('创建分区失败：%s', name)
+        return created
+
+    def partitions(self):
+        rows = self._execute(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = %s AND pg_table_is_visible(p.oid) ORDER BY c.relname",
+            [self.table],
+        ) or []
+        result = []
+        for (name,) in rows:
+            m = self.name_re.search(name)
+            result.append((name, datetime(int(m.group(1)), int(m.group(2)), 1) if m else None))
+        return result
+
+    def _drop_partition(self, name):
+        self._execute(f'ALTER TABLE {self.q(self.table)} DETACH PARTITION {self.q(name)}')
+        self._execute(f'DROP TABLE {self.q(name)}')
+
+    def truncate(self):
+        self._execute(f'TRUNCATE TABLE {self.q(self.table)}')
+        return None
+
+
+class MySQLPartitionManager(PartitionManager):
+    """原生 RANGE COLUMNS(oper_time) 分区，按月一个分区，pmax 兜底。"""
+
+    native = True
+    name_re = re.compile(r'^p(\d{4})(\d{2})$')
+
+    def partition_name(self, month):
+        return f'p{month:%Y%m}'
+
+    def is_partitioned(self):
+        rows = self._execute(
+            "SELECT COUNT(*) FROM information_schema.PARTITIONS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL",
+            [self.table],
+        )
+        return bool(rows and rows[0][0])
+
+    def setup(self, schema_editor=None, months_ahead=None):
+        if self.is_partitioned():
+            return None
+        t, pk, col = self.q(self.table), self.q(self.pk), self.q(self.column)
+        rows = self._execute(f'SELECT MIN({col}) FROM {t}')
+        first = rows[0][0] if rows and rows[0][0] else datetime.now()
+        # 分区表的每个唯一键都必须包含分区列
+        self._execute(f'ALTER TABLE {t} DROP PRIMARY KEY, ADD PRIMARY KEY ({pk}, {col})')
+        parts = [
+            f"PARTITION {self.partition_name(m)} VALUES LESS THAN ('{add_months(m, 1):%Y-%m-%d}')"
+            for m in self._months_to_create(first, months_ahead)
+        ]
+        parts.append('PARTITION pmax VALUES LESS THAN (MAXVALUE)')
+        self._execute(f'ALTER TABLE {t} PARTITION BY RANGE COLUMNS({col}) ({", ".join(parts)})')
+        return None
+
+    def ensure(self, months_ahead=None, start=None):
+        # REORGANIZE pmax 只能在末尾追加，跳过已有的最后一个月及之前的月份
+        last = max((s for _, s in self.partitions() if s is not None), default=None)
+        months = [
+            m for m in self._months_to_create(start or datetime.now(), months_ahead)
+            if last is None or m > last
+        ]
+        if not months:
+            return []
+        parts = [
+            f"PARTITION {self.partition_name(m)} VALUES LESS THAN ('{add_months(m, 1):%Y-%m-%d}')"
+            for m in months
+        ]
+        parts.append('PARTITION pmax VALUES LESS THAN (MAXVALUE)')
+        self._execute(f'ALTER TABLE {self.q(self.table)} REORGANIZE PARTITION pmax INTO ({", ".join(parts)})')
+        return [self.partition_name(m) for m in months]
+
+    def partitions(self):
+        rows = self._execute(
+            "SELECT PARTITION_NAME FROM information_schema.PARTITIONS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL "
+            "ORDER BY PARTITION_ORDINAL_POSITION",
+            [self.table],
+        ) or []
+        result = []
+        for (name,) in rows:
+            m = self.name_re.match(name)
+            result.append((name, datetime(int(m.group(1)), int(m.group(2)), 1) if m else None))
+        return result
+
+    def _drop_partition(self, name):
+        self._execute(f'ALTER TABLE {self.q(self.table)} DROP PARTITION {self.q(name)}')
+
+    def truncate(self):
+        self._execute(f'TRUNCATE TABLE {self.q(self.table)}')
+        return None
+
+
+class ChunkedPartitionManager(PartitionManager):
+    """不使用原生分区（SQLite，或未开启 NATIVE）：保留期清理与清空都按主键分批删除，时间过滤依赖 oper_time 索引。"""
+
+
+def get_partition_manager(connection=None, model=None):
+    """OPER_LOG_PARTITION['NATIVE'] 开启且为 PostgreSQL / MySQL 时返回原生分区管理器，否则按主键分批删除。"""
+    connection = connection or connections[DEFAULT_DB_ALIAS]
+    if get_partition_config()['NATIVE']:
+        vendor = connection.vendor
+        if vendor == 'postgresql':
+            return PostgresPartitionManager(connection, model)
+        if vendor == 'mysql':
+            return MySQLPartitionManager(connection, model)
+    return ChunkedPartitionManager(connection, model)
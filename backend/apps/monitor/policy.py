@@ -0,0 +1,107 @@
+import random
+import re
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+
+MODES = ('always', 'never', 'sample', 'on_error')
+
+
+class PolicyRule:
+    """
+    单条记录策略：
+    - always：始终记录
+    - never：不记录（也不截取参数）
+    - sample：按 rate（0~1）抽样记录，失败请求始终记录
+    - on_error：仅在失败或耗时 >= slow_ms 时记录
+    """
+    __slots__ = ('mode', 'rate', 'slow_ms', 'source')
+
+    def __init__(self, mode='always', rate=1.0, slow_ms=None, source=None):
+        if mode not in MODES:
+            raise ImproperlyConfigured(f'OPER_LOG_POLICY: 未知的 mode "{mode}"，可选 {MODES}')
+        self.mode = mode
+        self.rate = float(rate)
+        self.slow_ms = int(slow_ms) if slow_ms is not None else None
+        self.source = source
+
+    @property
+    def enabled(self):
+        return self.mode != 'never'
+
+    def should_log(self, is_error, cost_time):
+        mode = self.mode
+        if mode == 'always':
+            return True
+        if mode == 'never':
+            return False
+        if is_error:
+            return True
+        if self.slow_ms is not None and cost_time >= self.slow_ms:
+            return True
+        if mode == 'sample':
+            return random.random() < self.rate
+        return False
+
+    def __repr__(self):
+        return f'PolicyRule({self.mode!r}, rate={self.rate}, slow_ms={self.slow_ms}, source={self.source!r})'
+
+
+class RoutePolicy:
+    """
+    启动时把规则编译为：view_name -> 规则 的字典 + 一条合并的路径正则。
+    匹配时取声明顺序最靠前的命中规则，未命中使用默认规则。
+    """
+
+    def __init__(self, rules=None, default=None):
+        self.default = self._make_rule(default or {}, 'DEFAULT')
+        self.rules = []
+        self._by_view = {}
+        path_parts = []
+        self._path_groups = []
+        for idx, conf in enumerate(rules or []):
+            view_names = conf.get('view_name')
+            path = conf.get('path')
+            if bool(view_names) == bool(path):
+                raise ImproperlyConfigured(f'OPER_LOG_POLICY.RULES[{idx}]: view_name 与 path 必须且只能指定其一')
+            rule = self._make_rule(conf, view_names or path)
+            self.rules.append(rule)
+            if view_names:
+                if isinstance(view_names, str):
+                    view_names = [view_names]
+                for name in view_names:
+                    # 同名 view 以先声明的为准
+                    self._by_view.setdefault(name, (idx, rule))
+            else:
+                group = f'_r{idx}'
+                path_parts.append(f'(?P<{group}>{path})')
+                self._path_groups.append((group, idx, rule))
+        self._path_re = re.compile('|'.join(path_parts)) if path_parts else None
+
+    @staticmethod
+    def _make_rule(conf, source):
+        return PolicyRule(
+            mode=conf.get('mode', 'always'),
+            rate=conf.get('rate', 1.0),
+            slow_ms=conf.get('slow_ms'),
+            source=source,
+        )
+
+    def match(self, path, view_name=''):
+        hit = self._by_view.get(view_name) if view_name else None
+        if self._path_re is not None and path:
+            m = self._path_re.match(path)
+            if m is not None:
+                for group, idx, rule in self._path_groups:
+                    if hit is not None and idx > hit[0]:
+                        break
+                    if m.group(group) is not None:
+                        hit = (idx, rule)
+                        break
+        return hit[1] if hit is not None else self.default
+
+
+def load_policy():
+    conf = getattr(settings, 'OPER_LOG_POLICY', None) or {}
+    return RoutePolicy(conf.get('RULES'), conf.get('DEFAULT'))
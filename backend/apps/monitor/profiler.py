@@ -0,0 +1,278 @@
+import os
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from django.conf import settings
+
+from . import workerfiles
+
+
+DEFAULT_PROFILER_CONFIG = {
+    'ENABLED': False,            # 按需开启：请求进行中由后台线程定时抓取调用栈
+    'THRESHOLD_MS': 1000,        # 耗时超过该值的请求才保留采样结果
+    'INTERVAL_MS': 10,           # 采样间隔
+    'MAX_DEPTH': 64,             # 单个调用栈保留的最大帧数（超出时保留靠近叶子的帧）
+    'MAX_STACKS': 200,           # 每个视图/每条明细保留的不同调用栈数，其余并入 [其他]
+    'RECENT_SIZE': 20,           # 保留最近的慢请求明细条数
+    'DIR': None,                 # 多进程汇总目录，默认 <BASE_DIR>/logs/profiles
+    'DEAD_WORKER_TTL_S': 86400,  # 已退出 worker 的采样保留时长
+}
+
+OTHER_STACK = '[其他]'
+
+
+def get_profiler_config():
+    conf = dict(DEFAULT_PROFILER_CONFIG)
+    conf.update(getattr(settings, 'REQUEST_PROFILER', None) or {})
+    if not conf['DIR']:
+        conf['DIR'] = os.path.join(str(settings.BASE_DIR), 'logs', 'profiles')
+    return conf
+
+
+def _trim(stacks, limit):
+    """超过 limit 个调用栈时只保留采样数最多的，其余计入 [其他]，总采样数不变。"""
+    if len(stacks) <= limit:
+        return stacks
+    items = sorted(stacks.items(), key=lambda kv: -kv[1])
+    kept = dict(items[:max(1, limit - 1)])
+    rest = sum(count for _, count in items[max(1, limit - 1):])
+    kept[OTHER_STACK] = kept.get(OTHER_STACK, 0) + rest
+    return kept
+
+
+def collapse(stacks):
+    """折叠栈文本（flamegraph.pl / speedscope 可直接读取）：每行 "帧;帧;帧 次数"，根帧在前。"""
+    lines = [f'{stack} {count}' for stack, count in sorted(stacks.items(), key=lambda kv: -kv[1])]
+    return '\n'.join(lines) + ('\n' if lines else '')
+
+
+class _Active:
+    """进行中的请求：stop 为采样起点的帧（中间件自身），之上的框架调用不计入。"""
+    __slots__ = ('stop', 'stacks', 'samples')
+
+    def __init__(self, stop):
+        self.stop = stop
+        self.stacks = {}
+        self.samples = 0
+
+
+class RequestProfiler:
+    """
+    慢请求采样剖析：请求开始时登记线程，后台线程每 INTERVAL_MS 通过 sys._current_frames()
+    读取登记线程的调用栈并计数；请求结束时耗时超过 THRESHOLD_MS 才把结果并入按视图汇总与最近明细，
+    否则丢弃。没有进行中的请求时采样线程阻塞等待，不占 CPU。
+
+    采用线程采样而非信号（SIGPROF）：信号处理只能在主线程执行，多线程 worker 下无法定位到具体请求。
+    """
+
+    def __init__(self, threshold_ms=1000, interval_ms=10, max_depth=64, max_stacks=200, recent_size=20,
+                 directory=None, dead_worker_ttl_s=86400):
+        self.threshold = float(threshold_ms) / 1000.0
+        self.interval = max(1.0, float(interval_ms)) / 1000.0
+        self.max_depth = int(max_depth)
+        self.max_stacks = int(max_stacks)
+        self.recent_size = int(recent_size)
+        self.directory = directory
+        self.dead_worker_ttl = float(dead_worker_ttl_s)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._labels = {}
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._thread = None
+        self._active = {}
+        self._views = {}
+        self._recent = deque(maxlen=self.recent_size)
+        self._seq = 0
+        self._dirty = False
+
+    # ----- 采样线程 -----
+    def _ensure_started(self):
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                # fork 后子进程从零开始
+                self._reset()
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+                self._thread.start()
+
+    def _label(self, frame):
+        code = frame.f_code
+        label = self._labels.get(code)
+        if label is None:
+            module = frame.f_globals.get('__name__') or os.path.basename(code.co_filename)
+            label = self._labels[code] = f'{module}:{code.co_qualname}'.replace(';', ':').replace(' ', '_')
+        return label
+
+    def _stack(self, frame, stop):
+        labels = []
+        while frame is not None and frame is not stop:
+            labels.append(self._label(frame))
+            frame = frame.f_back
+        # 过深时保留靠近叶子的帧
+        del labels[self.max_depth:]
+        labels.reverse()
+        return ';'.join(labels)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                active = list(self._active.items())
+                if not active:
+                    self._wake.clear()
+            if not active:
+                self._wake.wait()
+                continue
+            frames = sys._current_frames()
+            sampled = []
+            for tid, entry in active:
+                frame = frames.get(tid)
+                if frame is None:
+                    continue
+                stack = self._stack(frame, entry.stop)
+                if stack:
+                    sampled.append((tid, entry, stack))
+            del frames
+            # 计数在锁内写入，且只写仍在采样中的请求：end() 在锁内摘除并读取 entry.stacks，之后不会再被修改
+            with self._lock:
+                for tid, entry, stack in sampled:
+                    if self._active.get(tid) is entry:
+                        entry.stacks[stack] = entry.stacks.get(stack, 0) + 1
+                        entry.samples += 1
+            time.sleep(self.interval)
+
+    # ----- 请求 -----
+    def begin(self, stop_frame):
+        """在请求线程中调用，开始采样当前线程；stop_frame 以上的帧不计入。"""
+        self._ensure_started()
+        entry = _Active(stop_frame)
+        with self._lock:
+            self._active[threading.get_ident()] = entry
+            self._wake.set()
+        return entry
+
+    def suspend(self):
+        """暂停当前线程的采样（流式响应：视图已返回、内容尚未开始生成）。"""
+        with self._lock:
+            self._active.pop(threading.get_ident(), None)
+
+    def resume(self, entry, stop_frame):
+        """在生成响应内容的线程中继续采样，stop_frame 为包装生成器自身的帧。"""
+        self._ensure_started()
+        entry.stop = stop_frame
+        with self._lock:
+            self._active[threading.get_ident()] = entry
+            self._wake.set()
+
+    def end(self, entry, view, path, method, elapsed):
+        """结束当前线程的采样；耗时超过阈值时保留结果，返回是否保留。"""
+        with self._lock:
+            self._active.pop(threading.get_ident(), None)
+            if elapsed < self.threshold or not entry.samples:
+                return False
+            stacks = _trim(entry.stacks, self.max_stacks)
+            cost_ms = int(elapsed * 1000)
+            now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            v = self._views.get(view)
+            if v is None:
+                v = self._views[view] = {'requests': 0, 'samples': 0, 'maxCostMs': 0, 'lastTime': '', 'stacks': {}}
+            v['requests'] += 1
+            v['samples'] += entry.samples
+            v['maxCostMs'] = max(v['maxCostMs'], cost_ms)
+            v['lastTime'] = now
+            for stack, count in stacks.items():
+                v['stacks'][stack] = v['stacks'].get(stack, 0) + count
+            v['stacks'] = _trim(v['stacks'], self.max_stacks)
+            self._seq += 1
+            self._recent.append({
+                'id': f'{self._pid}-{self._seq}',
+                'viewName': view,
+                'path': path,
+                'method': method,
+                'costMs': cost_ms,
+                'samples': entry.samples,
+                'time': now,
+                'stacks': stacks,
+            })
+            self._dirty = True
+        return True
+
+    # ----- 多 worker 汇总 -----
+    def snapshot(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                return {'pid': os.getpid(), 'views': {}, 'recent': []}
+            return {
+                'pid': self._pid,
+                'views': {name: {**v, 'stacks': dict(v['stacks'])} for name, v in self._views.items()},
+                'recent': list(self._recent),
+            }
+
+    def publish(self):
+        """有新的慢请求时写入本进程快照，由采样线程定期调用。"""
+        if not self._dirty:
+            return
+        self._dirty = False
+        data = self.snapshot()
+        workerfiles.publish(self.directory, data['pid'], data)
+
+    def merged(self):
+        snapshots = [self.snapshot()]
+        snapshots += [data for data, _ in workerfiles.read_all(self.directory, self.dead_worker_ttl, exclude_pid=os.getpid())]
+        views, recent = {}, []
+        for data in snapshots:
+            for name, v in data.get('views', {}).items():
+                agg = views.get(name)
+                if agg is None:
+                    agg = views[name] = {'requests': 0, 'samples': 0, 'maxCostMs': 0, 'lastTime': '', 'stacks': {}}
+                agg['requests'] += v['requests']
+                agg['samples'] += v['samples']
+                agg['maxCostMs'] = max(agg['maxCostMs'], v['maxCostMs'])
+                agg['lastTime'] = max(agg['lastTime'], v['lastTime'])
+                for stack, count in v['stacks'].items():
+                    agg['stacks'][stack] = agg['stacks'].get(stack, 0) + count
+            recent.extend(data.get('recent', []))
+        recent.sort(key=lambda r: r['time'], reverse=True)
+        return views, recent[:self.recent_size]
+
+    def summary(self):
+        """按视图汇总（不含调用栈）与最近的慢请求列表。"""
+        views, recent = self.merged()
+        rows = [
+            {'viewName': name, **{k: v[k] for k in ('requests', 'samples', 'maxCostMs', 'lastTime')}}
+            for name, v in views.items()
+        ]
+        rows.sort(key=lambda r: r['maxCostMs'], reverse=True)
+        return {
+            'views': rows,
+            'recent': [{k: v for k, v in r.items() if k != 'stacks'} for r in recent],
+        }
+
+    def view_stacks(self, view):
+        v = self.merged()[0].get(view)
+        return None if v is None else v['stacks']
+
+    def recent_stacks(self, profile_id):
+        for r in self.merged()[1]:
+            if r['id'] == profile_id:
+                return r['stacks']
+        return None
+
+
+_conf = get_profiler_config()
+request_profiler = RequestProfiler(
+    threshold_ms=_conf['THRESHOLD_MS'],
+    interval_ms=_conf['INTERVAL_MS'],
+    max_depth=_conf['MAX_DEPTH'],
+    max_stacks=_conf['MAX_STACKS'],
+    recent_size=_conf['RECENT_SIZE'],
+    directory=_conf['DIR'],
+    dead_worker_ttl_s=_conf['DEAD_WORKER_TTL_S'],
+)
@@ -0,0 +1,344 @@
+import json
+import logging
+import math
+import re
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest, Least
+
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_ROLLUP_CONFIG = {
+    'ENABLED': True,
+    'MINUTE_RETENTION_DAYS': 7,   # 分钟级统计保留天数；小时级随 OPER_LOG_PARTITION 保留期
+    'RETRIES': 5,                 # 写统计表遇到锁等待超时等数据库错误时的重试次数
+    'RETRY_BACKOFF_MS': 50,       # 重试间隔，按 2 的幂递增
+    'MAX_PENDING_KEYS': 10000,    # 重试仍失败的增量暂存到下一批一起写入，超过该键数的部分丢弃并计数
+}
+
+GROUP_FIELDS = {
+    'title': 'title',
+    'operUrl': 'oper_url',
+    'requestMethod': 'request_method',
+    'status': 'status',
+}
+
+_ID_SEGMENT = re.compile(r'/\d+(?=/|$)')
+
+_KEY_FIELDS = ('bucket', 'title', 'oper_url', 'request_method', 'status')
+
+
+def get_rollup_config():
+    conf = dict(DEFAULT_ROLLUP_CONFIG)
+    conf.update(getattr(settings, 'OPER_LOG_ROLLUP', None) or {})
+    return conf
+
+
+def normalize_url(url):
+    return _ID_SEGMENT.sub('/{id}', url or '')[:255]
+
+
+class LatencySketch:
+    """
+    可合并的耗时分布：按对数刻度分桶计数（相对误差约 5%），
+    两个 sketch 相加即得合并后的分布，可用于分钟 → 小时 → 任意区间的分位数计算。
+    """
+    GAMMA = 1.1
+    _LOG_GAMMA = math.log(GAMMA)
+
+    __slots__ = ('bins', 'zeros')
+
+    def __init__(self, bins=None, zeros=0):
+        self.bins = bins or {}
+        self.zeros = zeros
+
+    @classmethod
+    def index(cls, ms):
+        return int(math.ceil(math.log(ms) / cls._LOG_GAMMA))
+
+    @classmethod
+    def value(cls, idx):
+        # 取桶的几何中点作为代表值
+        return 2 * cls.GAMMA ** idx / (1 + cls.GAMMA)
+
+    def add(self, ms, n=1):
+        if ms <= 0:
+            self.zeros += n
+            return
+        idx = self.index(ms)
+        self.bins[idx] = self.bins.get(idx, 0) + n
+
+    def merge(self, other):
+        self.zeros += other.zeros
+        for idx, n in other.bins.items():
+            self.bins[idx] = self.bins.get(idx, 0) + n
+        return self
+
+    @property
+    def count(self):
+        return self.zeros + sum(self.bins.values())
+
+    def quantile(self, q):
+        total = self.count
+        if not total:
+            return 0
+        rank = q * (total - 1)
+        seen = self.zeros
+        if rank < seen:
+            return 0
+        for idx in sorted(self.bins):
+            seen += self.bins[idx]
+            if rank < seen:
+                return int(round(self.value(idx)))
+        return int(round(self.value(max(self.bins))))
+
+    def dumps(self):
+        data = {str(k): v for k, v in self.bins.items()}
+        if self.zeros:
+            data['z'] = self.zeros
+        return json.dumps(data, separators=(',', ':'))
+
+    @classmethod
+    def loads(cls, text):
+        if not text:
+            return cls()
+        data = json.loads(text)
+        zeros = data.pop('z', 0)
+        return cls({int(k): v for k, v in data.items()}, zeros)
+
+
+class _Agg:
+    __slots__ = ('count', 'error_count', 'cost_sum', 'cost_min', 'cost_max', 'sketch')
+
+    def __init__(self):
+        self.count = 0
+        self.error_count = 0
+        self.cost_sum = 0
+        self.cost_min = None
+        self.cost_max = 0
+        self.sketch = LatencySketch()
+
+    def add(self, cost, is_error):
+        self.count += 1
+        self.error_count += 1 if is_error else 0
+        self.cost_sum += cost
+        self.cost_min = cost if self.cost_min is None else min(self.cost_min, cost)
+        self.cost_max = max(self.cost_max, cost)
+        self.sketch.add(cost)
+
+    def merge(self, other):
+        self.count += other.count
+        self.error_count += other.error_count
+        self.cost_sum += other.cost_sum
+        self.cost_min = other.cost_min if self.cost_min is None else min(self.cost_min, other.cost_min)
+        self.cost_max = max(self.cost_max, other.cost_max)
+        self.sketch.merge(other.sketch)
+        return self
+
+    def merge_row(self, row):
+        self.count += row.count
+        self.error_count += row.error_count
+        self.cost_sum += row.cost_sum
+        self.cost_min = row.cost_min if self.cost_min is None else min(self.cost_min, row.cost_min)
+        self.cost_max = max(self.cost_max, row.cost_max)
+        self.sketch.merge(LatencySketch.loads(row.sketch))
+
+
+def _minute(dt):
+    return dt.replace(second=0, microsecond=0)
+
+
+def _hour(dt):
+    return dt.replace(minute=0, second=0, microsecond=0)
+
+
+def _stat_models():
+    from .models import OperLogMinuteStat, OperLogHourStat
+    return ((OperLogMinuteStat, _minute), (OperLogHourStat, _hour))
+
+
+class _Pending:
+    """写入失败、等待下一批合并重试的增量：{统计模型: {键: _Agg}}。"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._groups = {}
+        self.requeued = 0
+        self.dropped = 0
+
+    def take(self):
+        with self._lock:
+            groups, self._groups = self._groups, {}
+        return groups
+
+    def put(self, deltas, max_keys):
+        with self._lock:
+            size = sum(len(g) for g in self._groups.values())
+            for model, groups in deltas.items():
+                target = self._groups.setdefault(model, {})
+                for key, agg in groups.items():
+                    if key in target:
+                        target[key].merge(agg)
+                    elif size < max_keys:
+                        target[key] = agg
+                        size += 1
+                    else:
+                        self.dropped += agg.count
+                        continue
+                    self.requeued += agg.count
+
+    def stats(self):
+        with self._lock:
+            keys = sum(len(g) for g in self._groups.values())
+            records = sum(a.count for g in self._groups.values() for a in g.values())
+        return {'pendingKeys': keys, 'pendingRecords': records, 'requeued': self.requeued, 'dropped': self.dropped}
+
+
+_pending = _Pending()
+
+
+def rollup_stats():
+    return _pending.stats()
+
+
+def _aggregate(records, truncate):
+    groups = {}
+    for r in records:
+        if r.oper_time is None:
+            continue
+        key = (truncate(r.oper_time), r.title or '', normalize_url(r.oper_url), r.request_method or '', int(r.status or 0))
+        agg = groups.get(key)
+        if agg is None:
+            agg = groups[key] = _Agg()
+        agg.add(int(r.cost_time or 0), bool(r.status))
+    return groups
+
+
+def apply_batch(records):
+    """
+    日志写入器批次回调：把一批 OperLog 增量累加到分钟/小时统计表。
+    两张表在同一事务里更新，遇到数据库错误按 RETRIES 退避重试；仍失败时增量暂存，随下一批合并写入，并向写入器抛出异常计数。
+    """
+    conf = get_rollup_config()
+    if not records or not conf['ENABLED']:
+        return
+    deltas = {model: _aggregate(records, truncate) for model, truncate in _stat_models()}
+    for model, groups in _pending.take().items():
+        target = deltas.setdefault(model, {})
+        for key, agg in groups.items():
+            if key in target:
+                target[key].merge(agg)
+            else:
+                target[key] = agg
+    retries = max(0, int(conf['RETRIES']))
+    backoff = max(0, int(conf['RETRY_BACKOFF_MS'])) / 1000.0
+    for attempt in range(retries + 1):
+        try:
+            with transaction.atomic():
+                for model, groups in deltas.items():
+                    # 固定顺序加锁，避免不同 worker 交叉更新同一批键时死锁
+                    for key in sorted(groups):
+                        _upsert(model, key, groups[key])
+            return
+        except DatabaseError:
+            if attempt >= retries:
+                _pending.put(deltas, int(conf['MAX_PENDING_KEYS']))
+                raise
+            logger.info('统计表写入冲突，%s 秒后重试', backoff * 2 ** attempt, exc_info=True)
+            time.sleep(backoff * 2 ** attempt)
+
+
+def _increment(qs, agg):
+    return qs.update(
+        count=F('count') + agg.count,
+        error_count=F('error_count') + agg.error_count,
+        cost_sum=F('cost_sum') + agg.cost_sum,
+        cost_min=Least('cost_min', Value(agg.cost_min or 0)),
+        cost_max=Greatest('cost_max', Value(agg.cost_max)),
+    )
+
+
+def _upsert(model, key, agg):
+    """
+    单个时间桶的累加：先用一条 UPDATE 以 F() 自增计数，行不存在再插入。
+    第一条语句即为写，SQLite 上事务从这里起持有写锁（锁被占用时按 busy timeout 等待，而不是读后升级写锁失败），
+    PostgreSQL/MySQL 上锁住该行；之后在同一事务内合并耗时分布，不会与其他 worker 交错。
+    """
+    qs = model.objects.filter(**dict(zip(_KEY_FIELDS, key)))
+    if not _increment(qs, agg):
+        try:
+            with transaction.atomic():
+                model.objects.create(
+                    count=agg.count, error_count=agg.error_count, cost_sum=agg.cost_sum,
+                    cost_min=agg.cost_min or 0, cost_max=agg.cost_max, sketch=agg.sketch.dumps(),
+                    **dict(zip(_KEY_FIELDS, key)),
+                )
+            return
+        except IntegrityError:
+            # 其他 worker 刚插入同一时间桶
+            _increment(qs, agg)
+    sketch = qs.values_list('sketch', flat=True).first()
+    qs.update(sketch=LatencySketch.loads(sketch).merge(agg.sketch).dumps())
+
+
+def query_stats(begin, end, group_by=('title',), granularity=None, series=False, filters=None):
+    """
+    从统计表汇总：按 group_by 分组（可选再按时间桶分组），返回请求数、失败数、平均/最小/最大耗时及 p50/p95/p99。
+    granularity 为空时：时间范围超过 6 小时用小时表，否则用分钟表。
+    """
+    from .models import OperLogMinuteStat, OperLogHourStat
+
+    if granularity not in ('minute', 'hour'):
+        granularity = 'hour' if (end - begin) > timedelta(hours=6) else 'minute'
+    model = OperLogHourStat if granularity == 'hour' else OperLogMinuteStat
+    truncate = _hour if granularity == 'hour' else _minute
+    qs = model.objects.filter(bucket__gte=truncate(begin), bucket__lte=end)
+    for field, value in (filters or {}).items():
+        qs = qs.filter(**{field: value})
+
+    columns = [GROUP_FIELDS[g] for g in group_by if g in GROUP_FIELDS]
+    groups = {}
+    for row in qs.iterator(chunk_size=2000):
+        key = tuple(getattr(row, c) for c in columns)
+        if series:
+            key = (row.bucket,) + key
+        agg = groups.get(key)
+        if agg is None:
+            agg = groups[key] = _Agg()
+        agg.merge_row(row)
+
+    names = [g for g in group_by if g in GROUP_FIELDS]
+    rows = []
+    for key, agg in groups.items():
+        item = {}
+        if series:
+            item['bucket'] = key[0].strftime('%Y-%m-%d %H:%M:%S')
+            key = key[1:]
+        item.update(dict(zip(names, key)))
+        item.update({
+            'count': agg.count,
+            'errorCount': agg.error_count,
+            'avgCost': round(agg.cost_sum / agg.count, 2) if agg.count else 0,
+            'minCost': agg.cost_min or 0,
+            'maxCost': agg.cost_max,
+        })
+        # 分桶代表值可能略超出真实极值，按 min/max 截断
+        for name, q in (('p50', 0.5), ('p95', 0.95), ('p99', 0.99)):
+            item[name] = min(max(agg.sketch.quantile(q), item['minCost']), item['maxCost'])
+        rows.append(item)
+    rows.sort(key=lambda r: (r.get('bucket', ''), -r['count']))
+    return {'granularity': granularity, 'rows': rows}
+
+
+def purge_stats(minute_before, hour_before):
+    from .models import OperLogMinuteStat, OperLogHourStat
+    deleted = OperLogMinuteStat.objects.filter(bucket__lt=minute_before).delete()[0]
+    deleted += OperLogHourStat.objects.filter(bucket__lt=hour_before).delete()[0]
+    return deleted
@@ -0,0 +1,223 @@
+import gc
+import os
+import sys
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+
+from . import workerfiles
+
+
+DEFAULT_RUNTIME_CONFIG = {
+    'DIR': None,               # 各 worker 运行时快照目录，默认 <BASE_DIR>/logs/runtime
+    'TRACEMALLOC': False,      # 开启后记录内存分配热点（有一定开销，排查泄漏时临时开启）
+    'TRACEMALLOC_FRAMES': 1,
+    'TRACEMALLOC_TOP': 10,
+}
+
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+def get_runtime_config():
+    conf = dict(DEFAULT_RUNTIME_CONFIG)
+    conf.update(getattr(settings, 'RUNTIME_STATS', None) or {})
+    if not conf['DIR']:
+        conf['DIR'] = os.path.join(str(settings.BASE_DIR), 'logs', 'runtime')
+    return conf
+
+
+def _mb(b):
+    return round(float(b) / (1024 ** 2), 2)
+
+
+def _read_memory():
+    """(rss, vms) 字节。"""
+    try:
+        with open('/proc/self/statm', 'rb') as fh:
+            vms_pages, rss_pages = fh.read().split()[:2]
+        return int(rss_pages) * _PAGE_SIZE, int(vms_pages) * _PAGE_SIZE
+    except (OSError, ValueError):
+        pass
+    try:
+        import psutil  # type: ignore
+        info = psutil.Process().memory_info()
+        return info.rss, info.vms
+    except Exception:
+        pass
+    try:
+        import resource
+        # ru_maxrss：Linux 为 KB，macOS 为字节；只能得到峰值
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return (peak if sys.platform == 'darwin' else peak * 1024), 0
+    except Exception:
+        return 0, 0
+
+
+def _memory_limit():
+    """进程可用内存上限：cgroup 限制（容器内），否则物理内存。"""
+    for path in ('/sys/fs/cgroup/memory.max', '/sys/fs/cgroup/memory/memory.limit_in_bytes'):
+        try:
+            with open(path) as fh:
+                value = fh.read().strip()
+            if value.isdigit() and int(value) < (1 << 60):
+                return int(value)
+        except OSError:
+            continue
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+    except (AttributeError, ValueError, OSError):
+        return 0
+
+
+def _count_fds():
+    try:
+        return len(os.listdir('/proc/self/fd'))
+    except OSError:
+        pass
+    try:
+        import psutil  # type: ignore
+        proc = psutil.Process()
+        return proc.num_fds() if hasattr(proc, 'num_fds') else proc.num_handles()
+    except Exception:
+        return 0
+
+
+class RuntimeStats:
+    """
+    当前 Python 进程的运行时统计：内存（RSS/VMS）、GC 各代次数与停顿、线程数、文件描述符，
+    以及可选的 tracemalloc 分配热点。
+    GC 停顿通过 gc.callbacks 记录（每次回收两次 perf_counter，开销可忽略）。
+    各 worker 定期把快照写到 DIR/<pid>.json，任一 worker 都能汇总出全部 worker 的数据。
+    """
+
+    def __init__(self, directory=None, tracemalloc_enabled=False, tracemalloc_frames=1, tracemalloc_top=10):
+        self.directory = directory
+        self.tracemalloc_enabled = tracemalloc_enabled
+        self.tracemalloc_frames = max(1, int(tracemalloc_frames))
+        self.tracemalloc_top = int(tracemalloc_top)
+        self.started_at = time.time()
+        self._pid = os.getpid()
+        self._gc_start = None
+        self._installed = False
+        self._reset_gc()
+
+    def _reset_gc(self):
+        self.pause_total = [0.0, 0.0, 0.0]
+        self.pause_max = [0.0, 0.0, 0.0]
+        self.pause_count = [0, 0, 0]
+        self.recent_pauses = deque(maxlen=50)
+
+    def install(self):
+        if self._installed:
+            return
+        gc.callbacks.append(self._on_gc)
+        self._installed = True
+        if self.tracemalloc_enabled:
+            import tracemalloc
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(self.tracemalloc_frames)
+
+    def _check_fork(self):
+        pid = os.getpid()
+        if pid != self._pid:
+            # fork 出的 worker 从零开始统计
+            self._pid = pid
+            self.started_at = time.time()
+            self._reset_gc()
+
+    def _on_gc(self, phase, info):
+        if phase == 'start':
+            self._gc_start = time.perf_counter()
+            return
+        start = self._gc_start
+        if start is None:
+            return
+        self._gc_start = None
+        self._check_fork()
+        elapsed = (time.perf_counter() - start) * 1000.0
+        gen = info.get('generation', 0)
+        if 0 <= gen < 3:
+            self.pause_total[gen] += elapsed
+            self.pause_count[gen] += 1
+            if elapsed > self.pause_max[gen]:
+                self.pause_max[gen] = elapsed
+        self.recent_pauses.append(round(elapsed, 3))
+
+    def snapshot(self, include_top=False):
+        self._check_fork()
+        rss, vms = _read_memory()
+        gc_stats = gc.get_stats()
+        data = {
+            'pid': self._pid,
+            'startTime': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.started_at)),
+            'updateTime': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'rss': _mb(rss),
+            'vms': _mb(vms),
+            'threads': threading.active_count(),
+            'fds': _count_fds(),
+            'gc': {
+                'enabled': gc.isenabled(),
+                'counts': list(gc.get_count()),
+                'thresholds': list(gc.get_threshold()),
+                'collections': [s.get('collections', 0) for s in gc_stats],
+                'collected': [s.get('collected', 0) for s in gc_stats],
+                'uncollectable': [s.get('uncollectable', 0) for s in gc_stats],
+                'pauseCount': list(self.pause_count),
+                'pauseTotalMs': [round(x, 3) for x in self.pause_total],
+                'pauseMaxMs': [round(x, 3) for x in self.pause_max],
+                'recentPausesMs': list(self.recent_pauses)[-10:],
+            },
+        }
+        if include_top:
+            data['tracemalloc'] = self.top_allocations()
+        return data
+
+    def top_allocations(self):
+        if not self.tracemalloc_enabled:
+            return []
+        import tracemalloc
+        if not tracemalloc.is_tracing():
+            return []
+        stats = tracemalloc.take_snapshot().statistics('lineno')[:self.tracemalloc_top]
+        return [
+            {'location': str(s.traceback), 'sizeKb': round(s.size / 1024, 1), 'count': s.count}
+            for s in stats
+        ]
+
+    # ----- 多 worker 汇总 -----
+    def publish(self):
+        """写入本进程快照（原子替换），由采样线程定期调用。"""
+        data = self.snapshot()
+        workerfiles.publish(self.directory, data['pid'], data)
+
+    def workers(self, max_age_s=60):
+        """读取所有 worker 的最近快照；超过 max_age_s 未更新的视为已退出并清理。"""
+        items = [data for data, _ in workerfiles.read_all(self.directory, max_age_s)]
+        items.sort(key=lambda d: d.get('pid', 0))
+        return items
+
+    def jvm_section(self, include_top=False, worker_max_age_s=60):
+        """服务监控页面的 "jvm" 部分：沿用 total/used/free/usage（MB），used 为 RSS，total 为进程可用内存上限。"""
+        current = self.snapshot(include_top=include_top)
+        limit = _memory_limit()
+        used = current['rss']
+        total = _mb(limit) if limit else current['vms']
+        current.update({
+            'total': total,
+            'used': used,
+            'free': round(max(0.0, total - used), 2),
+            'usage': round(used * 100.0 / total, 2) if total else 0,
+            'workers': self.workers(worker_max_age_s) or [self.snapshot()],
+        })
+        return current
+
+
+_conf = get_runtime_config()
+runtime_stats = RuntimeStats(
+    directory=_conf['DIR'],
+    tracemalloc_enabled=_conf['TRACEMALLOC'],
+    tracemalloc_frames=_conf['TRACEMALLOC_FRAMES'],
+    tracemalloc_top=_conf['TRACEMALLOC_TOP'],
+)
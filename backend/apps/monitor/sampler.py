@@ -0,0 +1,322 @@
+import os
+import platform
+import shutil
+import socket
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+
+
+DEFAULT_SAMPLER_CONFIG = {
+    'INTERVAL_S': 5,        # 采样间隔
+    'HISTORY_SIZE': 120,    # 环形缓冲保留的采样点数（默认 10 分钟）
+    'IP_REFRESH_S': 300,    # 本机 IP 重新探测间隔
+}
+
+# /proc/mounts 中不统计的伪文件系统
+PSEUDO_FS = {
+    'proc', 'sysfs', 'devpts', 'devtmpfs', 'tmpfs', 'cgroup', 'cgroup2', 'mqueue', 'debugfs', 'tracefs',
+    'securityfs', 'pstore', 'bpf', 'autofs', 'configfs', 'fusectl', 'hugetlbfs', 'binfmt_misc', 'nsfs',
+    'rpc_pipefs', 'squashfs', 'ramfs', 'efivarfs', 'selinuxfs', 'fuse.lxcfs', 'fuse.gvfsd-fuse',
+}
+
+
+def get_sampler_config():
+    conf = dict(DEFAULT_SAMPLER_CONFIG)
+    conf.update(getattr(settings, 'SERVER_MONITOR', None) or {})
+    return conf
+
+
+def _gb(b):
+    try:
+        return round(float(b) / (1024 ** 3), 2)
+    except Exception:
+        return 0.0
+
+
+def _get_local_ip():
+    try:
+        s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        s.connect(('8.8.8.8', 80))
+        ip = s.getsockname()[0]
+        s.close()
+        return ip
+    except Exception:
+        try:
+            return socket.gethostbyname(socket.gethostname())
+        except Exception:
+            return '127.0.0.1'
+
+
+# ----- Linux：直接读取 /proc -----
+def _read_cpu_times():
+    """返回 (busy_user, busy_sys, total) 累计 jiffies；非 Linux 返回 None。"""
+    try:
+        with open('/proc/stat', 'rb') as fh:
+            parts = fh.readline().split()
+    except OSError:
+        return None
+    # cpu user nice system idle iowait irq softirq steal guest guest_nice
+    v = [int(x) for x in parts[1:9]] + [0] * (8 - len(parts[1:9]))
+    user, nice, system, idle, iowait, irq, softirq, steal = v
+    return user + nice, system + irq + softirq + steal, user + nice + system + idle + iowait + irq + softirq + steal
+
+
+def _read_meminfo():
+    try:
+        info = {}
+        with open('/proc/meminfo', 'rb') as fh:
+            for line in fh:
+                key, _, rest = line.partition(b':')
+                if key in (b'MemTotal', b'MemAvailable', b'MemFree', b'Buffers', b'Cached'):
+                    info[key.decode()] = int(rest.split()[0]) * 1024
+    except OSError:
+        return None
+    total = info.get('MemTotal', 0)
+    avail = info.get('MemAvailable')
+    if avail is None:
+        avail = info.get('MemFree', 0) + info.get('Buffers', 0) + info.get('Cached', 0)
+    return total, avail
+
+
+def _read_loadavg():
+    try:
+        with open('/proc/loadavg', 'rb') as fh:
+            return [float(x) for x in fh.read().split()[:3]]
+    except (OSError, ValueError):
+        try:
+            return list(os.getloadavg())
+        except (AttributeError, OSError):
+            return [0.0, 0.0, 0.0]
+
+
+def _list_mounts():
+    """[(挂载点, 文件系统类型, 设备)]，去除伪文件系统与同一设备的重复挂载。"""
+    mounts = []
+    try:
+        seen = set()
+        with open('/proc/mounts', 'rb') as fh:
+            for line in fh:
+                parts = line.decode('utf-8', errors='replace').split()
+                if len(parts) < 3:
+                    continue
+                device, mount_point, fs_type = parts[0], parts[1].replace('\\040', ' '), parts[2]
+                if fs_type in PSEUDO_FS or device in seen:
+                    continue
+                seen.add(device)
+                mounts.append((mount_point, fs_type, device))
+        return mounts
+    except OSError:
+        pass
+    try:
+        import psutil  # type: ignore
+        return [(p.mountpoint, p.fstype, p.device) for p in psutil.disk_partitions(all=False)]
+    except Exception:
+        return [(os.getcwd(), platform.system(), 'Fixed')]
+
+
+# ----- 非 Linux 回退 -----
+def _fallback_cpu():
+    try:
+        import psutil  # type: ignore
+        # interval=None：与上次调用比较，不阻塞
+        used = float(psutil.cpu_percent(interval=None))
+        return used, 0.0
+    except Exception:
+        return 0.0, 0.0
+
+
+def _fallback_mem():
+    try:
+        import psutil  # type: ignore
+        vm = psutil.virtual_memory()
+        return vm.total, vm.available
+    except Exception:
+        pass
+    try:
+        import ctypes
+
+        class MEMORYSTATUSEX(ctypes.Structure):
+            _fields_ = [
+                ('dwLength', ctypes.c_ulong),
+                ('dwMemoryLoad', ctypes.c_ulong),
+                ('ullTotalPhys', ctypes.c_ulonglong),
+                ('ullAvailPhys', ctypes.c_ulonglong),
+                ('ullTotalPageFile', ctypes.c_ulonglong),
+                ('ullAvailPageFile', ctypes.c_ulonglong),
+                ('ullTotalVirtual', ctypes.c_ulonglong),
+                ('ullAvailVirtual', ctypes.c_ulonglong),
+                ('sullAvailExtendedVirtual', ctypes.c_ulonglong),
+            ]
+        stat = MEMORYSTATUSEX()
+        stat.dwLength = ctypes.sizeof(MEMORYSTATUSEX)
+        ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(stat))
+        return int(stat.ullTotalPhys), int(stat.ullAvailPhys)
+    except Exception:
+        return 0, 0
+
+
+class SystemSampler:
+    """
+    后台线程按固定间隔采集系统指标（CPU、内存、负载、各挂载点磁盘），
+    最新一次结果供 ServerView 直接返回，历史写入定长环形缓冲用于趋势图。
+    每个进程一个采样线程，检测到 fork 后在子进程内重建。
+    """
+
+    def __init__(self, interval_s=5, history_size=120, ip_refresh_s=300):
+        self.interval = max(1.0, float(interval_s))
+        self.history = deque(maxlen=max(1, int(history_size)))
+        self.ip_refresh = float(ip_refresh_s)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._stop = threading.Event()
+        self._ready = threading.Event()
+        self._prev_cpu = None
+        self._latest = None
+        self._ip = None
+        self._ip_at = 0.0
+        self._tasks = []
+
+    # ----- 采集 -----
+    def _cpu(self):
+        cur = _read_cpu_times()
+        if cur is None:
+            return _fallback_cpu()
+        prev, self._prev_cpu = self._prev_cpu, cur
+        if prev is None:
+            # 首次采样：用开机以来的累计值
+            prev = (0, 0, 0)
+        total = cur[2] - prev[2]
+        if total <= 0:
+            return 0.0, 0.0
+        return (cur[0] - prev[0]) * 100.0 / total, (cur[1] - prev[1]) * 100.0 / total
+
+    def _disks(self):
+        items = []
+        for mount_point, fs_type, device in _list_mounts():
+            try:
+                total, used, free = shutil.disk_usage(mount_point)
+            except OSError:
+                continue
+            if not total:
+                continue
+            items.append({
+                'dirName': mount_point,
+                'sysTypeName': fs_type,
+                'typeName': device,
+                'total': f"{_gb(total)}G",
+                'free': f"{_gb(free)}G",
+                'used': f"{_gb(used)}G",
+                'usage': round(used * 100.0 / total, 2),
+            })
+        return items
+
+    def local_ip(self):
+        now = time.monotonic()
+        if self._ip is None or now - self._ip_at >= self.ip_refresh:
+            self._ip = _get_local_ip()
+            self._ip_at = now
+        return self._ip
+
+    def sample(self):
+        used, sys_p = self._cpu()
+        self.local_ip()
+        mem = _read_meminfo() or _fallback_mem()
+        mem_total, mem_avail = mem
+        mem_used = max(0, mem_total - mem_avail)
+        snapshot = {
+            'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'cpu': {
+                'cpuNum': os.cpu_count() or 0,
+                'used': round(used, 2),
+                'sys': round(sys_p, 2),
+                'free': round(max(0.0, 100.0 - used - sys_p), 2),
+            },
+            'mem': {
+                'total': _gb(mem_total),
+                'used': _gb(mem_used),
+                'free': _gb(mem_avail),
+                'usage': round(mem_used * 100.0 / mem_total, 2) if mem_total else 0.0,
+            },
+            'load': [round(x, 2) for x in _read_loadavg()],
+            'sysFiles': self._disks(),
+        }
+        with self._lock:
+            self._latest = snapshot
+            self._ready.set()
+            self.history.append({
+                'time': snapshot['time'],
+                'cpu': round(used + sys_p, 2),
+                'mem': snapshot['mem']['usage'],
+                'load': snapshot['load'][0],
+            })
+        return snapshot
+
+    def add_task(self, func):
+        """注册随每次采样执行的任务：func()，如发布本 worker 的运行时快照。"""
+        if func not in self._tasks:
+            self._tasks.append(func)
+
+    # ----- 线程 -----
+    def ensure_started(self):
+        pid = os.getpid()
+        if self._pid == pid and self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid == pid and self._thread is not None and self._thread.is_alive():
+                return
+            if self._pid is not None and self._pid != pid:
+                self.history.clear()
+                self._latest = None
+                self._ready.clear()
+                self._prev_cpu = None
+            self._pid = pid
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='system-sampler', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                self.sample()
+            except Exception:
+                pass
+            for func in list(self._tasks):
+                try:
+                    func()
+                except Exception:
+                    pass
+            self._stop.wait(max(0.0, self.interval - (time.monotonic() - started)))
+
+    def stop(self):
+        self._stop.set()
+
+    # ----- 读取 -----
+    def latest(self):
+        """最新一次采样；刚启动时等待采样线程的首个结果，超时则同步采集一次。"""
+        self.ensure_started()
+        if self._latest is None:
+            self._ready.wait(1.0)
+        snapshot = self._latest
+        if snapshot is None:
+            snapshot = self.sample()
+        return snapshot
+
+    def series(self, points=None):
+        with self._lock:
+            items = list(self.history)
+        if points:
+            items = items[-int(points):]
+        return items
+
+
+_conf = get_sampler_config()
+system_sampler = SystemSampler(
+    interval_s=_conf['INTERVAL_S'],
+    history_size=_conf['HISTORY_SIZE'],
+    ip_refresh_s=_conf['IP_REFRESH_S'],
+)
@@ -20,12 +20,15 @@ class OperLogSerializer(BaseModelSerializer):
     errorMsg = serializers.CharField(source='error_msg')
     operTime = serializers.DateTimeField(source='oper_time', format='%Y-%m-%d %H:%M:%S')
     costTime = serializers.IntegerField(source='cost_time')
+    sqlCount = serializers.IntegerField(source='sql_count', read_only=True)
+    sqlTime = serializers.IntegerField(source='sql_time', read_only=True)
+    sqlDetail = serializers.CharField(source='sql_detail', read_only=True)
 
     class Meta:
         model = OperLog
         fields = ['operId', 'title', 'businessType', 'method', 'requestMethod', 'operatorType', 
                   'operName', 'deptName', 'operUrl', 'operIp', 'operLocation', 'operParam', 
-                  'jsonResult', 'status', 'errorMsg', 'operTime', 'costTime']
+                  'jsonResult', 'status', 'errorMsg', 'operTime', 'costTime', 'sqlCount', 'sqlTime', 'sqlDetail']
 
 class OperLogQuerySerializer(PaginationQuerySerializer):
     title = serializers.CharField(required=False, allow_blank=True)
@@ -58,3 +61,13 @@ class LogininforQuerySerializer(PaginationQuerySerializer):
     status = serializers.CharField(required=False, allow_blank=True)
     beginTime = serializers.DateTimeField(required=False)
     endTime = serializers.DateTimeField(required=False)
+
+
+class OperLogStatsQuerySerializer(serializers.Serializer):
+    beginTime = serializers.CharField(required=False, allow_blank=True)
+    endTime = serializers.CharField(required=False, allow_blank=True)
+    granularity = serializers.ChoiceField(required=False, choices=['minute', 'hour'])
+    groupBy = serializers.CharField(required=False, allow_blank=True)
+    title = serializers.CharField(required=False, allow_blank=True)
+    requestMethod = serializers.CharField(required=False, allow_blank=True)
+    series = serializers.BooleanField(required=False, default=False)
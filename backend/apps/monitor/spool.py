@@ -0,0 +1,333 @@
+import json
+import logging
+import os
+import threading
+import time
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_SPOOL_CONFIG = {
+    # off：不落盘；fallback：数据库写入失败或队列满时落盘，恢复后后台补写；
+    # spool：Web 进程只落盘，由 manage.py ingest_logs --follow 独立入库
+    'MODE': 'fallback',
+    'DIR': None,                        # 默认 <BASE_DIR>/logs/spool
+    'SEGMENT_MAX_BYTES': 16 * 1024 * 1024,
+    'SEGMENT_MAX_AGE_S': 60,            # 活动分段最长存在时间，到期封存后才可被导入
+    'FSYNC_INTERVAL_MS': 200,           # fsync 合并：距上次 fsync 超过该时间
+    'FSYNC_BATCH': 200,                 # 或累计未 fsync 的记录数达到该值
+    'INGEST_BATCH_SIZE': 1000,
+    'INGEST_INTERVAL_S': 5,             # fallback 模式下写入器后台补写的最小间隔
+}
+
+OPEN_SUFFIX = '.jsonl.open'
+SEALED_SUFFIX = '.jsonl'
+
+
+def get_spool_config():
+    conf = dict(DEFAULT_SPOOL_CONFIG)
+    conf.update(getattr(settings, 'OPER_LOG_SPOOL', None) or {})
+    if not conf['DIR']:
+        conf['DIR'] = os.path.join(str(settings.BASE_DIR), 'logs', 'spool')
+    return conf
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return str(value)
+
+
+def record_to_dict(record):
+    """未保存的模型实例 -> 可 JSON 化的字段字典（不含自增主键）。"""
+    data = {}
+    for field in record._meta.concrete_fields:
+        if field.primary_key:
+            continue
+        data[field.attname] = getattr(record, field.attname)
+    return data
+
+
+def dict_to_record(model, data):
+    fields = {f.attname: f for f in model._meta.concrete_fields if not f.primary_key}
+    values = {}
+    for key, value in data.items():
+        field = fields.get(key)
+        if field is not None:
+            values[key] = field.to_python(value) if value is not None else None
+    return model(**values)
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        return True
+    return True
+
+
+class LogSpool:
+    """
+    追加写入的本地日志分段文件（JSONL）。
+
+    - 每个进程写自己的活动分段 <name>-<pid>-<时间戳>.jsonl.open，多 worker 互不交叉
+    - 分段超过 SEGMENT_MAX_BYTES 或 SEGMENT_MAX_AGE_S 后封存（改名为 .jsonl），只有封存的分段会被导入
+    - fsync 按时间/条数合并，批量落盘时一次 fsync
+    """
+
+    def __init__(self, directory, name, segment_max_bytes=16 * 1024 * 1024, segment_max_age_s=60,
+                 fsync_interval_ms=200, fsync_batch=200):
+        self.directory = directory
+        self.name = name
+        self.segment_max_bytes = int(segment_max_bytes)
+        self.segment_max_age = float(segment_max_age_s)
+        self.fsync_interval = max(0, int(fsync_interval_ms)) / 1000.0
+        self.fsync_batch = max(1, int(fsync_batch))
+
+        self._lock = threading.Lock()
+        self._fh = None
+        self._path = None
+        self._pid = None
+        self._opened_at = 0.0
+        self._size = 0
+        self._unsynced = 0
+        self._synced_at = 0.0
+
+        self.appended = 0
+        self.sealed = 0
+
+    # ----- 写入 -----
+    def append(self, records, sync=True):
+        """追加一批未保存的模型实例；sync=False 时只写入页缓存，由后续 tick/批次合并 fsync。"""
+        if not records:
+            return
+        lines = ''.join(
+            json.dumps(record_to_dict(r), ensure_ascii=False, default=_json_default) + '\n' for r in records
+        ).encode('utf-8')
+        with self._lock:
+            fh = self._current()
+            fh.write(lines)
+            fh.flush()
+            self._size += len(lines)
+            self._unsynced += len(records)
+            self.appended += len(records)
+            if sync:
+                self._sync_if_due(force=False)
+            if self._size >= self.segment_max_bytes:
+                self._seal()
+
+    def tick(self):
+        """写入器空闲时调用：到期 fsync、封存超龄分段。"""
+        with self._lock:
+            if self._fh is None:
+                return
+            self._sync_if_due(force=False)
+            if time.monotonic() - self._opened_at >= self.segment_max_age:
+                self._seal()
+
+    def close(self):
+        with self._lock:
+            self._seal()
+
+    def _current(self):
+        pid = os.getpid()
+        if self._fh is not None and self._pid != pid:
+            # fork 后的子进程不能继续写父进程的分段
+            self._fh = None
+        if self._fh is None:
+            os.makedirs(self.directory, exist_ok=True)
+            stamp = datetime.now().strftime('%Y%m%d%H%M%S%f')
+            self._path = os.path.join(self.directory, f'{self.name}-{pid}-{stamp}{OPEN_SUFFIX}')
+            self._fh = open(self._path, 'ab')
+            self._pid = pid
+            self._opened_at = time.monotonic()
+            self._synced_at = self._opened_at
+            self._size = 0
+            self._unsynced = 0
+        return self._fh
+
+    def _sync_if_due(self, force):
+        if not self._unsynced:
+            return
+        now = time.monotonic()
+        if force or self._unsynced >= self.fsync_batch or now - self._synced_at >= self.fsync_interval:
+            os.fsync(self._fh.fileno())
+            self._unsynced = 0
+            self._synced_at = now
+
+    def _seal(self):
+        if self._fh is None or self._pid != os.getpid():
+            return
+        self._sync_if_due(force=True)
+        self._fh.close()
+        self._fh = None
+        if self._size:
+            os.replace(self._path, self._path[:-len(OPEN_SUFFIX)] + SEALED_SUFFIX)
+            self.sealed += 1
+        else:
+            os.remove(self._path)
+
+    # ----- 导入 -----
+    def pending_segments(self):
+        """已封存、待导入的分段（按创建时间排序）。顺带封存已退出进程遗留的活动分段。"""
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        prefix = self.name + '-'
+        sealed = []
+        for fname in names:
+            if not fname.startswith(prefix):
+                continue
+            if fname.endswith(OPEN_SUFFIX):
+                try:
+                    pid = int(fname[len(prefix):].split('-', 1)[0])
+                except ValueError:
+                    continue
+                if pid != os.getpid() and not _pid_alive(pid):
+                    path = os.path.join(self.directory, fname)
+                    fname = fname[:-len(OPEN_SUFFIX)] + SEALED_SUFFIX
+                    os.replace(path, os.path.join(self.directory, fname))
+                else:
+                    continue
+            if fname.endswith(SEALED_SUFFIX):
+                sealed.append(fname)
+        sealed.sort(key=lambda f: f.rsplit('-', 1)[-1])
+        return sealed
+
+    def _checkpoint_path(self):
+        return os.path.join(self.directory, f'{self.name}.checkpoint.json')
+
+    def read_checkpoint(self):
+        try:
+            with open(self._checkpoint_path(), encoding='utf-8') as fh:
+                data = json.load(fh)
+            return data.get('segment'), int(data.get('offset') or 0)
+        except (FileNotFoundError, ValueError):
+            return None, 0
+
+    def write_checkpoint(self, segment, offset):
+        path = self._checkpoint_path()
+        tmp = path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as fh:
+            json.dump({'segment': segment, 'offset': offset}, fh)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp, path)
+
+    def ingest(self, model, batch_size=1000, on_batch=None, max_batches=None):
+        """
+        把封存分段导入数据库：每批 bulk_create 成功后记录 (分段, 字节偏移) 检查点，
+        中途失败/进程退出后从检查点继续；分段导入完成后删除。
+        保证至少一次：检查点写入前崩溃可能导致该批重复导入。
+        返回导入条数。
+        """
+        if not self.pending_segments():
+            return 0
+        lock = self._acquire_ingest_lock()
+        if lock is False:
+            return 0
+        total = 0
+        batches = 0
+        try:
+            cp_segment, cp_offset = self.read_checkpoint()
+            for fname in self.pending_segments():
+                path = os.path.join(self.directory, fname)
+                offset = cp_offset if fname == cp_segment else 0
+                with open(path, 'rb') as fh:
+                    fh.seek(offset)
+                    while True:
+                        if max_batches is not None and batches >= max_batches:
+                            return total
+                        batch = []
+                        while len(batch) < batch_size:
+                            line = fh.readline()
+                            if not line:
+                                break
+                            if not line.endswith(b'\n'):
+                                # 写入中断留下的半行，丢弃
+                                logger.warning('日志分段 %s 末尾存在不完整记录，已跳过', fname)
+                                break
+                            try:
+                                batch.append(dict_to_record(model, json.loads(line)))
+                            except Exception:
+                                logger.exception('日志分段 %s 存在无法解析的记录，已跳过', fname)
+                        if not batch:
+                            break
+                        model.objects.bulk_create(batch, batch_size=batch_size)
+                        self.write_checkpoint(fname, fh.tell())
+                        total += len(batch)
+                        batches += 1
+                        if on_batch is not None:
+                            on_batch(batch)
+                os.remove(path)
+                self.write_checkpoint(None, 0)
+                cp_segment, cp_offset = None, 0
+        finally:
+            self._release_ingest_lock(lock)
+        return total
+
+    def _acquire_ingest_lock(self):
+        # 多个导入者（各 worker 后台补写 + 命令行）互斥；拿不到锁直接跳过本轮
+        if fcntl is None:
+            return None
+        os.makedirs(self.directory, exist_ok=True)
+        fh = open(os.path.join(self.directory, f'{self.name}.lock'), 'a')
+        try:
+            fcntl.flock(fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            fh.close()
+            return False
+        return fh
+
+    @staticmethod
+    def _release_ingest_lock(lock):
+        if lock:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+            lock.close()
+
+    def stats(self):
+        pending = self.pending_segments()
+        return {
+            'appended': self.appended,
+            'sealed': self.sealed,
+            'pendingSegments': len(pending),
+        }
+
+
+_spools = {}
+_spools_lock = threading.Lock()
+
+
+def get_spool(name):
+    """按名称获取进程级单例（MODE 为 off 时写入器不会追加，但仍可导入遗留分段）。"""
+    conf = get_spool_config()
+    spool = _spools.get(name)
+    if spool is not None:
+        return spool
+    with _spools_lock:
+        spool = _spools.get(name)
+        if spool is None:
+            spool = LogSpool(
+                conf['DIR'], name,
+                segment_max_bytes=conf['SEGMENT_MAX_BYTES'],
+                segment_max_age_s=conf['SEGMENT_MAX_AGE_S'],
+                fsync_interval_ms=conf['FSYNC_INTERVAL_MS'],
+                fsync_batch=conf['FSYNC_BATCH'],
+            )
+            _spools[name] = spool
+    return spool
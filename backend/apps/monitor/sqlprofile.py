@@ -0,0 +1,237 @@
+import json
+import os
+import random
+import re
+import threading
+import time
+from functools import lru_cache
+
+from django.conf import settings
+
+from . import workerfiles
+
+
+DEFAULT_SQL_PROFILE_CONFIG = {
+    'ENABLED': False,            # 按需开启：每条 SQL 多一次指纹计算与计时
+    'SAMPLE_RATE': 1.0,          # 采样比例，0~1
+    'N_PLUS_ONE_MIN': 5,         # 同一指纹在单个请求内执行次数 >= 该值视为疑似 N+1
+    'MAX_GROUPS': 5,             # 每条操作日志记录的重复指纹组数上限
+    'MAX_FINGERPRINTS': 20,      # 每个视图保留的重复指纹数上限
+    'DIR': None,                 # 多进程汇总目录，默认 <BASE_DIR>/logs/sqlprofile
+    'DEAD_WORKER_TTL_S': 3600,   # 已退出 worker 的统计保留时长
+}
+
+_IN_LIST = re.compile(r'\bIN\s*\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)', re.IGNORECASE)
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'(?<![\w"`])-?\d+(?:\.\d+)?\b')
+_SPACES = re.compile(r'\s+')
+
+
+def get_sql_profile_config():
+    conf = dict(DEFAULT_SQL_PROFILE_CONFIG)
+    conf.update(getattr(settings, 'SQL_PROFILE', None) or {})
+    if not conf['DIR']:
+        conf['DIR'] = os.path.join(str(settings.BASE_DIR), 'logs', 'sqlprofile')
+    return conf
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(sql):
+    """
+    SQL 指纹：字面量替换为 ?，IN 列表折叠为 IN (...)，合并空白。
+    ORM 生成的 SQL 参数已是占位符，同一语句形状的指纹相同。
+    """
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _IN_LIST.sub('IN (...)', sql)
+    return _SPACES.sub(' ', sql).strip()
+
+
+class QueryProfile:
+    """connection.execute_wrapper 回调：记录单个请求的 SQL 次数、耗时与按指纹分组的执行次数。"""
+    __slots__ = ('count', 'seconds', 'groups')
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.groups = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.seconds += elapsed
+            self.count += 1
+            group = self.groups.get(sql)
+            if group is None:
+                self.groups[sql] = [1, elapsed]
+            else:
+                group[0] += 1
+                group[1] += elapsed
+
+    def duplicates(self, min_count):
+        """执行次数 >= min_count 的指纹组，按次数降序：[(指纹, 次数, 秒)]。"""
+        merged = {}
+        for sql, (count, seconds) in self.groups.items():
+            fp = fingerprint(sql)
+            item = merged.get(fp)
+            if item is None:
+                merged[fp] = [count, seconds]
+            else:
+                item[0] += count
+                item[1] += seconds
+        items = [(fp, c, s) for fp, (c, s) in merged.items() if c >= min_count]
+        items.sort(key=lambda x: (-x[1], -x[2]))
+        return items
+
+
+class SqlProfileStats:
+    """
+    按视图（view_name）汇总 SQL 画像：请求数、SQL 总次数与耗时、单请求最大次数、
+    疑似 N+1 的请求数及其重复指纹。各 worker 随系统采样写入 DIR/<pid>.json，查询时合并。
+    """
+
+    def __init__(self, directory=None, max_fingerprints=20, dead_worker_ttl_s=3600):
+        self.directory = directory
+        self.max_fingerprints = int(max_fingerprints)
+        self.dead_worker_ttl = float(dead_worker_ttl_s)
+        self._lock = threading.Lock()
+        self._views = {}
+        self._pid = os.getpid()
+
+    def record(self, view, profile, duplicates):
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._views = {}
+            v = self._views.get(view)
+            if v is None:
+                v = self._views[view] = {
+                    'requests': 0, 'queries': 0, 'seconds': 0.0, 'maxQueries': 0,
+                    'nPlusOneRequests': 0, 'fingerprints': {},
+                }
+            v['requests'] += 1
+            v['queries'] += profile.count
+            v['seconds'] += profile.seconds
+            v['maxQueries'] = max(v['maxQueries'], profile.count)
+            if duplicates:
+                v['nPlusOneRequests'] += 1
+                fps = v['fingerprints']
+                for fp, count, _ in duplicates:
+                    item = fps.get(fp)
+                    if item is None:
+                        fps[fp] = [1, count]
+                    else:
+                        item[0] += 1
+                        item[1] = max(item[1], count)
+                if len(fps) > self.max_fingerprints:
+                    # 只保留出现请求数最多的指纹
+                    keep = sorted(fps.items(), key=lambda kv: (-kv[1][0], -kv[1][1]))[:self.max_fingerprints]
+                    v['fingerprints'] = dict(keep)
+
+    def snapshot(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                return {'pid': os.getpid(), 'views': {}}
+            views = {
+                name: {**v, 'fingerprints': {fp: list(item) for fp, item in v['fingerprints'].items()}}
+                for name, v in self._views.items()
+            }
+        return {'pid': os.getpid(), 'views': views}
+
+    def publish(self):
+        data = self.snapshot()
+        if data['views']:
+            workerfiles.publish(self.directory, data['pid'], data)
+
+    def merged(self):
+        """合并全部 worker 的统计：本进程取实时值，其余取最近一次发布的快照。"""
+        snapshots = [self.snapshot()]
+        snapshots += [data for data, _ in workerfiles.read_all(self.directory, self.dead_worker_ttl, exclude_pid=os.getpid())]
+        views = {}
+        for data in snapshots:
+            for name, v in data.get('views', {}).items():
+                agg = views.get(name)
+                if agg is None:
+                    agg = views[name] = {
+                        'requests': 0, 'queries': 0, 'seconds': 0.0, 'maxQueries': 0,
+                        'nPlusOneRequests': 0, 'fingerprints': {},
+                    }
+                agg['requests'] += v['requests']
+                agg['queries'] += v['queries']
+                agg['seconds'] += v['seconds']
+                agg['maxQueries'] = max(agg['maxQueries'], v['maxQueries'])
+                agg['nPlusOneRequests'] += v['nPlusOneRequests']
+                for fp, (reqs, max_count) in v['fingerprints'].items():
+                    item = agg['fingerprints'].setdefault(fp, [0, 0])
+                    item[0] += reqs
+                    item[1] = max(item[1], max_count)
+        return views
+
+    def report(self, order_by='queries', limit=20):
+        """最差的视图列表。order_by：queries（平均 SQL 次数）/ time（平均 SQL 耗时）/ nPlusOne（疑似 N+1 请求数）。"""
+        rows = []
+        for name, v in self.merged().items():
+            requests = v['requests'] or 1
+            duplicates = sorted(v['fingerprints'].items(), key=lambda kv: (-kv[1][0], -kv[1][1]))[:5]
+            rows.append({
+                'viewName': name,
+                'requests': v['requests'],
+                'queries': v['queries'],
+                'avgQueries': round(v['queries'] / requests, 2),
+                'maxQueries': v['maxQueries'],
+                'timeMs': round(v['seconds'] * 1000, 2),
+                'avgTimeMs': round(v['seconds'] * 1000 / requests, 2),
+                'nPlusOneRequests': v['nPlusOneRequests'],
+                'duplicates': [{'sql': fp, 'requests': reqs, 'maxCount': c} for fp, (reqs, c) in duplicates],
+            })
+        key = {
+            'time': lambda r: (r['avgTimeMs'], r['avgQueries']),
+            'nPlusOne': lambda r: (r['nPlusOneRequests'], r['avgQueries']),
+        }.get(order_by, lambda r: (r['avgQueries'], r['avgTimeMs']))
+        rows.sort(key=key, reverse=True)
+        return rows[:max(1, int(limit))]
+
+    def reset(self):
+        with self._lock:
+            self._views = {}
+
+
+class SqlProfiler:
+    """OperLogMiddleware 使用的入口：判断是否采样，并把单次请求的结果汇总、整理为日志字段。"""
+
+    def __init__(self, conf):
+        self.enabled = bool(conf['ENABLED'])
+        self.sample_rate = float(conf['SAMPLE_RATE'])
+        self.n_plus_one_min = max(2, int(conf['N_PLUS_ONE_MIN']))
+        self.max_groups = int(conf['MAX_GROUPS'])
+
+    def start(self):
+        """需要剖析本次请求时返回新的 QueryProfile，否则返回 None。"""
+        if not self.enabled:
+            return None
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return None
+        return QueryProfile()
+
+    def finish(self, view, profile):
+        """汇总到按视图统计，返回写入操作日志的 (sql_count, sql_time_ms, sql_detail)。"""
+        duplicates = profile.duplicates(self.n_plus_one_min)
+        sql_profile_stats.record(view or 'unmatched', profile, duplicates)
+        detail = ''
+        if duplicates:
+            detail = json.dumps([
+                {'sql': fp[:500], 'count': count, 'timeMs': round(seconds * 1000, 2)}
+                for fp, count, seconds in duplicates[:self.max_groups]
+            ], ensure_ascii=False)
+        return profile.count, int(profile.seconds * 1000), detail
+
+
+_conf = get_sql_profile_config()
+sql_profile_stats = SqlProfileStats(
+    directory=_conf['DIR'],
+    max_fingerprints=_conf['MAX_FINGERPRINTS'],
+    dead_worker_ttl_s=_conf['DEAD_WORKER_TTL_S'],
+)
@@ -0,0 +1,105 @@
+import threading
+from datetime import datetime, timedelta
+from unittest import skipUnless
+
+from django.db import connection
+from django.db.models import Sum
+from django.test import TransactionTestCase, override_settings
+
+from .models import OperLog, OperLogHourStat, OperLogMinuteStat
+from .partitions import add_months, get_partition_manager, month_start
+from .rollup import apply_batch
+
+
+@override_settings(OPER_LOG_ROLLUP={'ENABLED': True, 'RETRIES': 20, 'RETRY_BACKOFF_MS': 5})
+class RollupConcurrencyTests(TransactionTestCase):
+    """两个线程同时把批次累加到统计表：分钟、小时统计的合计都应等于原始日志条数。"""
+
+    def _worker(self, batches, errors):
+        try:
+            for batch in batches:
+                apply_batch(batch)
+        except Exception as exc:
+            errors.append(exc)
+        finally:
+            connection.close()
+
+    def test_concurrent_apply_batch_keeps_totals(self):
+        start = datetime(2026, 1, 1, 10, 58)
+        rows = [
+            OperLog(
+                title='用户管理', oper_url=f'/api/system/user/{i % 3}', request_method='GET',
+                status=i % 5 == 0, oper_time=start + timedelta(seconds=i * 7), cost_time=i % 40,
+            )
+            for i in range(120)
+        ]
+        OperLog.objects.bulk_create(rows)
+        batches = [rows[i:i + 5] for i in range(0, len(rows), 5)]
+
+        errors = []
+        threads = [
+            threading.Thread(target=self._worker, args=(batches[n::2], errors))
+            for n in range(2)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(errors, [])
+        total = OperLog.objects.count()
+        self.assertEqual(OperLogMinuteStat.objects.aggregate(n=Sum('count'))['n'], total)
+        self.assertEqual(OperLogHourStat.objects.aggregate(n=Sum('count'))['n'], total)
+        self.assertEqual(
+            OperLogHourStat.objects.aggregate(n=Sum('error_count'))['n'],
+            OperLog.objects.filter(status=1).count(),
+        )
+
+
+class ChunkedPartitionTests(TransactionTestCase):
+    """默认（未开启 NATIVE）在任何数据库上都按主键分批删除。"""
+
+    def test_default_manager_is_chunked(self):
+        self.assertFalse(get_partition_manager().native)
+
+    @override_settings(OPER_LOG_PARTITION={'DELETE_CHUNK_SIZE': 3, 'DELETE_PAUSE_MS': 0})
+    def test_purge_and_truncate(self):
+        now = datetime.now()
+        old = add_months(month_start(now), -3)
+        OperLog.objects.bulk_create([OperLog(title='old', oper_time=old) for _ in range(7)])
+        OperLog.objects.bulk_create([OperLog(title='new', oper_time=now) for _ in range(2)])
+        manager = get_partition_manager()
+        self.assertEqual(manager.purge_before(month_start(now)), 7)
+        self.assertEqual(list(OperLog.objects.values_list('title', flat=True).distinct()), ['new'])
+        self.assertEqual(manager.truncate(), 2)
+        self.assertFalse(OperLog.objects.exists())
+
+
+@skipUnless(connection.vendor in ('postgresql', 'mysql'), '原生分区只在 PostgreSQL / MySQL 上可用')
+@override_settings(OPER_LOG_PARTITION={'NATIVE': True, 'PRECREATE_MONTHS': 1})
+class NativePartitionTests(TransactionTestCase):
+    """原生分区：转换已有表、按月建分区、整分区删除与清空。"""
+
+    def test_create_drop_truncate(self):
+        now = datetime.now()
+        old = add_months(month_start(now), -3)
+        OperLog.objects.create(title='old', oper_time=old + timedelta(days=1))
+        OperLog.objects.create(title='new', oper_time=now)
+
+        manager = get_partition_manager()
+        self.assertTrue(manager.native)
+        if not manager.is_partitioned():
+            with connection.schema_editor() as schema_editor:
+                manager.setup(schema_editor)
+        self.assertTrue(manager.is_partitioned())
+        manager.ensure()
+        names = {name for name, _ in manager.partitions()}
+        for month in (old, month_start(now), add_months(month_start(now), 1)):
+            self.assertIn(manager.partition_name(month), names)
+        self.assertEqual(OperLog.objects.count(), 2)
+
+        self.assertEqual(manager.drop_before(add_months(old, 1)), [manager.partition_name(old)])
+        self.assertEqual(list(OperLog.objects.values_list('title', flat=True)), ['new'])
+
+        manager.truncate()
+        self.assertFalse(OperLog.objects.exists())
@@ -1,15 +1,19 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
-from .views import ServerView, OnlineViewSet, OperLogViewSet, LogininforViewSet
+from .views import ServerView, MetricsView, SqlProfileView, ProfileViewSet, CacheViewSet, OnlineViewSet, OperLogViewSet, LogininforViewSet
 
 router = DefaultRouter(trailing_slash=False)
+router.register(r'cache', CacheViewSet, basename='monitor-cache')
 router.register(r'online', OnlineViewSet, basename='monitor-online')
+router.register(r'profile', ProfileViewSet, basename='monitor-profile')
 router.register(r'operlog', OperLogViewSet, basename='monitor-operlog')
 router.register(r'logininfor', LogininforViewSet, basename='monitor-logininfor')
 
 urlpatterns = [
     path('server', ServerView.as_view({'get': 'get'}), name='monitor-server'),
+    path('metrics', MetricsView.as_view(), name='monitor-metrics'),
+    path('sqlprofile', SqlProfileView.as_view({'get': 'get'}), name='monitor-sqlprofile'),
     path('', include(router.urls)),
 ]
 
@@ -1,4 +1,7 @@
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import BasePermission, IsAuthenticated
+from rest_framework.views import APIView
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+from django.http import HttpResponse
 from rest_framework.response import Response
 from rest_framework.viewsets import ViewSet
 from rest_framework.decorators import action
@@ -7,108 +10,35 @@ from django.db.models import Q
 from apps.system.views.core import BaseViewSet, BaseViewMixin
 from apps.system.permission import HasRolePermission
 from apps.system.common import camel_to_snake
+from apps.system.lockout import login_guard
+from apps.system.sessions import session_registry
+from apps.common.pagination import KeysetPagination
+from apps.common.export import streaming_export
+from apps.common.cache import all_namespaces, get_namespace, namespace_for_key
 from .models import OperLog, Logininfor
-from .serializers import OperLogSerializer, LogininforSerializer, LogininforQuerySerializer
-
+from .serializers import OperLogSerializer, LogininforSerializer, LogininforQuerySerializer, OperLogStatsQuerySerializer
+from .partitions import get_partition_manager
+from .rollup import GROUP_FIELDS, query_stats, rollup_stats
+from .writer import get_oper_log_writer
+from .sampler import system_sampler
+from .runtime import runtime_stats
+from .metrics import get_metrics_config, metrics
+from .sqlprofile import get_sql_profile_config, sql_profile_stats
+from .profiler import collapse, get_profiler_config, request_profiler
+
+import hmac
+import json
 import os
 import sys
 import time
 import platform
-import socket
-import shutil
 from datetime import datetime, timedelta
 
 
 PROCESS_START_TIME = time.time()
 
 
-def _format_bytes_gb(b):
-    try:
-        return round(float(b) / (1024 ** 3), 2)
-    except Exception:
-        return 0.0
-
-
-def _get_local_ip():
-    try:
-        s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        s.connect(('8.8.8.8', 80))
-        ip = s.getsockname()[0]
-        s.close()
-        return ip
-    except Exception:
-        try:
-            return socket.gethostbyname(socket.gethostname())
-        except Exception:
-            return '127.0.0.1'
-
-
-def _get_mem_info():
-    total = used = free = usage = 0.0
-    try:
-        import ctypes
-        class MEMORYSTATUSEX(ctypes.Structure):
-            _fields_ = [
-                ('dwLength', ctypes.c_ulong),
-                ('dwMemoryLoad', ctypes.c_ulong),
-                ('ullTotalPhys', ctypes.c_ulonglong),
-                ('ullAvailPhys', ctypes.c_ulonglong),
-                ('ullTotalPageFile', ctypes.c_ulonglong),
-                ('ullAvailPageFile', ctypes.c_ulonglong),
-                ('ullTotalVirtual', ctypes.c_ulonglong),
-                ('ullAvailVirtual', ctypes.c_ulonglong),
-                ('sullAvailExtendedVirtual', ctypes.c_ulonglong),
-            ]
-        stat = MEMORYSTATUSEX()
-        stat.dwLength = ctypes.sizeof(MEMORYSTATUSEX)
-        ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(stat))
-        total_b = int(stat.ullTotalPhys)
-        avail_b = int(stat.ullAvailPhys)
-        used_b = total_b - avail_b
-        total = _format_bytes_gb(total_b)
-        used = _format_bytes_gb(used_b)
-        free = _format_bytes_gb(avail_b)
-        usage = round((used / total) * 100, 2) if total else 0.0
-    except Exception:
-        try:
-            import psutil  # type: ignore
-            vm = psutil.virtual_memory()
-            total = _format_bytes_gb(vm.total)
-            used = _format_bytes_gb(vm.used)
-            free = _format_bytes_gb(vm.available)
-            usage = round((vm.used / vm.total) * 100, 2) if vm.total else 0.0
-        except Exception:
-            pass
-    return {
-        'total': total,
-        'used': used,
-        'free': free,
-        'usage': usage,
-    }
-
-
-def _get_cpu_info():
-    cpu_num = os.cpu_count() or 0
-    used = sys_p = 0.0
-    free = 100.0
-    try:
-        import psutil  # type: ignore
-        used = float(psutil.cpu_percent(interval=0.2))
-        sys_p = 0.0
-        free = max(0.0, 100.0 - used - sys_p)
-    except Exception:
-        used = 0.0
-        sys_p = 0.0
-        free = 100.0
-    return {
-        'cpuNum': cpu_num,
-        'used': round(used, 2),
-        'sys': round(sys_p, 2),
-        'free': round(free, 2),
-    }
-
-
-def _get_jvm_info():
+def _get_jvm_info(include_top=False):
     name = platform.python_implementation()
     version = platform.python_version()
     start_dt = datetime.fromtimestamp(PROCESS_START_TIME)
@@ -118,116 +48,341 @@ def _get_jvm_info():
     run_time = f"{int(hours)}小时{int(minutes)}分钟"
     home = sys.executable
     input_args = ' '.join(sys.argv)
-    return {
+    # 内存 / GC / 线程 / fd 及各 worker 汇总见 runtime.py
+    data = runtime_stats.jvm_section(include_top=include_top, worker_max_age_s=system_sampler.interval * 6)
+    data.update({
         'name': name,
         'version': version,
         'startTime': start_dt.strftime('%Y-%m-%d %H:%M:%S'),
         'runTime': run_time,
         'home': home,
         'inputArgs': input_args,
-        'total': 0,
-        'used': 0,
-        'free': 0,
-        'usage': 0,
-    }
+    })
+    return data
 
 
-def _get_sys_files():
-    items = []
+def _parse_time_param(value, end_of_day=False):
+    """解析时间查询参数，支持 'YYYY-MM-DD HH:MM:SS' 与 'YYYY-MM-DD'。"""
+    if not value:
+        return None
     try:
-        base = os.getcwd()
-        total, used, free = shutil.disk_usage(base)
-        usage = round((used / total) * 100, 2) if total else 0.0
-        items.append({
-            'dirName': base,
-            'sysTypeName': platform.system(),
-            'typeName': 'Fixed',
-            'total': f"{_format_bytes_gb(total)}G",
-            'free': f"{_format_bytes_gb(free)}G",
-            'used': f"{_format_bytes_gb(used)}G",
-            'usage': usage,
-        })
-    except Exception:
+        return datetime.strptime(value, '%Y-%m-%d %H:%M:%S')
+    except (TypeError, ValueError):
         pass
-    return items
+    try:
+        dt = datetime.strptime(value, '%Y-%m-%d')
+    except (TypeError, ValueError):
+        return None
+    return dt + timedelta(days=1) - timedelta(microseconds=1) if end_of_day else dt
 
 
 class ServerView(BaseViewMixin, ViewSet):
     permission_classes = [IsAuthenticated, HasRolePermission]
+    required_perms = {'get': 'monitor:server:list'}
 
     def get(self, request):
+        # 系统指标由后台采样线程定期采集，这里只读取缓存，不阻塞请求
+        snapshot = system_sampler.latest()
+        try:
+            points = int(request.query_params.get('points', 60))
+        except (TypeError, ValueError):
+            points = 60
         data = {
-            'cpu': _get_cpu_info(),
-            'mem': _get_mem_info(),
+            'cpu': snapshot['cpu'],
+            'mem': snapshot['mem'],
             'sys': {
                 'computerName': platform.node(),
                 'osName': f"{platform.system()} {platform.release()}",
-                'computerIp': _get_local_ip(),
+                'computerIp': system_sampler.local_ip(),
                 'osArch': platform.machine(),
                 'userDir': os.getcwd(),
+                'loadAvg': snapshot['load'],
             },
-            'jvm': _get_jvm_info(),
-            'sysFiles': _get_sys_files(),
+            # tracemalloc=1：附带内存分配热点（需开启 RUNTIME_STATS['TRACEMALLOC']）
+            'jvm': _get_jvm_info(include_top=request.query_params.get('tracemalloc') in ('1', 'true')),
+            'sysFiles': snapshot['sysFiles'],
+            'sampleTime': snapshot['time'],
+            # 趋势图：[{time, cpu, mem, load}]，points 指定点数
+            'history': system_sampler.series(points),
+        }
+        return self.data(data)
+
+
+class MetricsScrapePermission(BasePermission):
+    """Prometheus 抓取鉴权：配置了 MONITOR_METRICS['TOKEN'] 时校验 Bearer 令牌，否则只允许 ALLOWED_IPS 访问。"""
+
+    def has_permission(self, request, view):
+        conf = get_metrics_config()
+        token = conf['TOKEN']
+        if token:
+            auth = request.META.get('HTTP_AUTHORIZATION', '')
+            return auth.startswith('Bearer ') and hmac.compare_digest(auth[7:].strip(), token)
+        # 只认直连地址，不信任 X-Forwarded-For
+        return request.META.get('REMOTE_ADDR', '') in (conf['ALLOWED_IPS'] or ())
+
+
+class MetricsView(APIView):
+    """Prometheus 文本格式指标，汇总所有 worker（见 metrics.py）。"""
+    authentication_classes = []
+    permission_classes = [MetricsScrapePermission]
+
+    def get(self, request):
+        return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+class SqlProfileView(BaseViewMixin, ViewSet):
+    """
+    SQL 画像：按视图汇总的 SQL 次数、耗时与疑似 N+1，列出最差的视图（见 sqlprofile.py）。
+    需开启 SQL_PROFILE['ENABLED']；单次请求的明细见操作日志的 sqlCount / sqlTime / sqlDetail。
+    """
+    permission_classes = [IsAuthenticated, HasRolePermission]
+    required_perms = {'get': 'monitor:server:list'}
+
+    def get(self, request):
+        order_by = request.query_params.get('orderBy', 'queries')
+        if order_by not in ('queries', 'time', 'nPlusOne'):
+            return self.error('orderBy 仅支持 queries / time / nPlusOne')
+        try:
+            limit = min(max(int(request.query_params.get('limit', 20)), 1), 200)
+        except (TypeError, ValueError):
+            limit = 20
+        conf = get_sql_profile_config()
+        return self.data({
+            'enabled': bool(conf['ENABLED']),
+            'sampleRate': conf['SAMPLE_RATE'],
+            'nPlusOneMin': conf['N_PLUS_ONE_MIN'],
+            'rows': sql_profile_stats.report(order_by=order_by, limit=limit),
+        })
+
+
+class ProfileViewSet(BaseViewMixin, ViewSet):
+    """
+    慢请求采样（见 profiler.py）：按视图汇总的折叠栈与最近的慢请求明细。
+    折叠栈默认以文本返回，可直接交给 flamegraph.pl / speedscope；format=json 时返回按采样数排序的列表。
+    """
+    permission_classes = [IsAuthenticated, HasRolePermission]
+    required_perms = {'list': 'monitor:server:list', 'retrieve': 'monitor:server:list', 'recent': 'monitor:server:list'}
+    lookup_value_regex = '[^/]+'
+
+    def list(self, request):
+        conf = get_profiler_config()
+        return self.data({
+            'enabled': bool(conf['ENABLED']),
+            'thresholdMs': conf['THRESHOLD_MS'],
+            'intervalMs': conf['INTERVAL_MS'],
+            **request_profiler.summary(),
+        })
+
+    def _stacks_response(self, request, stacks, name):
+        if stacks is None:
+            return self.not_found()
+        if request.query_params.get('format') == 'json':
+            rows = [{'stack': k, 'samples': v} for k, v in sorted(stacks.items(), key=lambda kv: -kv[1])]
+            return self.data({'name': name, 'samples': sum(stacks.values()), 'stacks': rows})
+        return HttpResponse(collapse(stacks), content_type='text/plain; charset=utf-8')
+
+    def retrieve(self, request, pk=None):
+        """某个视图累计的折叠栈。"""
+        return self._stacks_response(request, request_profiler.view_stacks(pk), pk)
+
+    @action(detail=False, methods=['get'], url_path=r'recent/(?P<profile_id>[^/]+)')
+    def recent(self, request, profile_id=None):
+        """单个慢请求的折叠栈。"""
+        return self._stacks_response(request, request_profiler.recent_stacks(profile_id), profile_id)
+
+
+def _format_size(b):
+    for unit in ('B', 'K', 'M', 'G'):
+        if b < 1024 or unit == 'G':
+            return f"{round(b, 2)}{unit}"
+        b /= 1024.0
+
+
+class CacheViewSet(BaseViewMixin, ViewSet):
+    """
+    缓存监控：按命名空间（apps.common.cache）列出键、查看值、定点清理。
+    命中/未命中等计数取自指标汇总（全部 worker），键数与占用取自本进程可见的缓存后端。
+    """
+    permission_classes = [IsAuthenticated, HasRolePermission]
+    required_perms = {
+        'list': 'monitor:cache:list', 'get_names': 'monitor:cache:list', 'get_keys': 'monitor:cache:list',
+        'get_value': 'monitor:cache:list', 'clear_cache_name': 'monitor:cache:remove',
+        'clear_cache_key': 'monitor:cache:remove', 'clear_cache_all': 'monitor:cache:remove',
+    }
+
+    def list(self, request):
+        totals = {
+            field: metrics.totals(f'cache_{field}_total')
+            for field in ('hits', 'misses', 'sets', 'evictions', 'expired')
+        }
+        namespaces = []
+        for ns in all_namespaces():
+            st = ns.stats()
+            labels = (('cache', ns.name),)
+            for field, values in totals.items():
+                st[field] = values.get(labels, st[field])
+            lookups = st['hits'] + st['misses']
+            st['hitRate'] = round(st['hits'] * 100.0 / lookups, 2) if lookups else 0
+            namespaces.append(st)
+
+        backend = caches[DEFAULT_CACHE_ALIAS]
+        max_entries = getattr(backend, '_max_entries', None)
+        used = sum(ns['bytes'] for ns in namespaces)
+        uptime_days = int((time.time() - PROCESS_START_TIME) // 86400)
+        workers = runtime_stats.workers(system_sampler.interval * 6)
+        # 前端页面沿用 Redis 的字段名，这里填入 Django 缓存后端的对应信息
+        info = {
+            'redis_version': type(backend).__name__,
+            'redis_mode': 'standalone',
+            'tcp_port': '-',
+            'connected_clients': len(workers) or 1,
+            'uptime_in_days': uptime_days,
+            'used_memory_human': _format_size(used),
+            'used_cpu_user_children': 0,
+            'maxmemory_human': f"{max_entries} 条" if max_entries else '-',
+            'aof_enabled': '0',
+            'rdb_last_bgsave_status': '-',
+            'instantaneous_input_kbps': 0,
+            'instantaneous_output_kbps': 0,
+        }
+        data = {
+            'info': info,
+            'dbSize': sum(ns['keys'] for ns in namespaces),
+            # 饼图：各命名空间的访问次数
+            'commandStats': [{'name': ns['cacheName'], 'value': ns['hits'] + ns['misses']} for ns in namespaces],
+            'namespaces': namespaces,
         }
         return self.data(data)
 
+    @action(detail=False, methods=['get'], url_path='getNames')
+    def get_names(self, request):
+        return self.data([
+            {'cacheName': ns.prefix, 'cacheKey': '', 'cacheValue': '', 'remark': ns.remark}
+            for ns in all_namespaces()
+        ])
+
+    @action(detail=False, methods=['get'], url_path=r'getKeys/(?P<cache_name>[^/]+)')
+    def get_keys(self, request, cache_name=None):
+        ns = get_namespace(cache_name)
+        if ns is None:
+            return self.not_found('缓存名称不存在')
+        return self.data(ns.keys())
+
+    @action(detail=False, methods=['get'], url_path=r'getValue/(?P<cache_name>[^/]+)/(?P<cache_key>.+)')
+    def get_value(self, request, cache_name=None, cache_key=None):
+        ns = get_namespace(cache_name)
+        if ns is None or not ns.owns(cache_key):
+            return self.not_found('缓存键不存在')
+        value = ns.value(cache_key)
+        if value is not None and not isinstance(value, str):
+            value = json.dumps(value, ensure_ascii=False, default=str)
+        return self.data({'cacheName': ns.prefix, 'cacheKey': cache_key, 'cacheValue': value or ''})
+
+    @action(detail=False, methods=['delete'], url_path=r'clearCacheName/(?P<cache_name>[^/]+)')
+    def clear_cache_name(self, request, cache_name=None):
+        ns = get_namespace(cache_name)
+        if ns is None:
+            return self.not_found('缓存名称不存在')
+        ns.clear()
+        return self.ok()
+
+    @action(detail=False, methods=['delete'], url_path=r'clearCacheKey/(?P<cache_key>.+)')
+    def clear_cache_key(self, request, cache_key=None):
+        ns = namespace_for_key(cache_key)
+        if ns is None:
+            return self.not_found('缓存键不存在')
+        ns.delete_full_key(cache_key)
+        return self.ok()
+
+    @action(detail=False, methods=['delete'], url_path='clearCacheAll')
+    def clear_cache_all(self, request):
+        # 逐个清理已登记的命名空间，不调用 cache.clear()，组织目录版本号、验证码等内部键不受影响
+        for ns in all_namespaces():
+            ns.clear()
+        return self.ok()
+
 
 class OnlineViewSet(BaseViewMixin, ViewSet):
+    """在线用户：数据来自会话登记表（apps.system.sessions），强退后该令牌立即失效。"""
     permission_classes = [IsAuthenticated, HasRolePermission]
+    required_perms = {
+        'list_action': 'monitor:online:list',
+        'destroy': 'monitor:online:forceLogout', 'destroy_by_token': 'monitor:online:forceLogout',
+    }
 
     @action(detail=False, methods=['get'], url_path='list')
     def list_action(self, request):
         ipaddr = request.query_params.get('ipaddr', '')
         user_name = request.query_params.get('userName', '')
-        ua = request.META.get('HTTP_USER_AGENT', '')
-        token = request.META.get('HTTP_AUTHORIZATION', '').replace('Bearer ', '')
-        user = getattr(request, 'user', None)
-        dept_name = ''
-        try:
-            from apps.system.models import Dept
-            if user and getattr(user, 'dept_id', None):
-                d = Dept.objects.filter(dept_id=user.dept_id).first()
-                dept_name = d.dept_name if d else ''
-        except Exception:
-            pass
-        rows = []
-        if user and getattr(user, 'username', None):
-            if (not user_name) or (user.username.find(user_name) >= 0):
-                row = {
-                    'tokenId': token or '',
-                    'userName': user.username,
-                    'deptName': dept_name,
-                    'ipaddr': request.META.get('REMOTE_ADDR', ''),
-                    'loginLocation': '',
-                    'os': platform.system(),
-                    'browser': ua,
-                    'loginTime': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                }
-                if (not ipaddr) or (row['ipaddr'].find(ipaddr) >= 0):
-                    rows.append(row)
-        # return Response({'code': 200, 'msg': '操作成功', 'rows': rows, 'total': len(rows)})
+        rows = [
+            s for s in session_registry.sessions()
+            if (not user_name or user_name in s['userName']) and (not ipaddr or ipaddr in s['ipaddr'])
+        ]
         return self.raw_response({'code': 200, 'msg': '操作成功', 'rows': rows, 'total': len(rows)})
 
+    def destroy(self, request, pk=None):
+        # DELETE /monitor/online/<tokenId>
+        if not session_registry.revoke(pk):
+            return self.not_found('会话不存在或已过期')
+        return self.ok('操作成功')
+
     @action(methods=['DELETE'], detail=False, url_path='force-logout')
     def destroy_by_token(self, request, *args, **kwargs):
-        return self.ok('操作成功')
+        token_id = request.query_params.get('tokenId', '')
+        return self.destroy(request, pk=token_id)
+
+
+def _filter_params(request):
+    """列表按查询串过滤；导出时前端以表单提交同样的条件，合并请求体。"""
+    if request.method == 'POST' and hasattr(request.data, 'get'):
+        params = request.query_params.copy()
+        for key in request.data:
+            params.setlist(key, request.data.getlist(key) if hasattr(request.data, 'getlist') else [request.data[key]])
+        return params
+    return request.query_params
+
+
+# 导出列：(表头, 取值字段)
+OPER_LOG_EXPORT_COLUMNS = [
+    ('日志编号', 'oper_id'), ('系统模块', 'title'), ('操作类型', 'business_type'), ('操作人员', 'oper_name'),
+    ('操作地址', 'oper_ip'), ('操作状态', 'status'), ('操作时间', 'oper_time'), ('消耗时间', 'cost_time'),
+    ('请求地址', 'oper_url'), ('请求方式', 'request_method'), ('操作方法', 'method'), ('请求参数', 'oper_param'),
+    ('返回参数', 'json_result'), ('异常信息', 'error_msg'), ('登录地点', 'oper_location'), ('部门名称', 'dept_name'),
+]
+LOGININFOR_EXPORT_COLUMNS = [
+    ('访问编号', 'info_id'), ('用户名称', 'user_name'), ('登录地址', 'ipaddr'), ('登录地点', 'login_location'),
+    ('浏览器', 'browser'), ('操作系统', 'os'), ('登录状态', 'status'), ('提示', 'msg'), ('访问时间', 'login_time'),
+]
+EXPORT_CHUNK_SIZE = 2000
+
+
+def _export_response(request, qs, columns, filename, sheet_name):
+    # values_list + iterator 分块读取，不构造模型实例与序列化结果；format=csv 导出 CSV
+    fmt = 'csv' if _filter_params(request).get('format') == 'csv' else 'xlsx'
+    rows = qs.values_list(*[field for _, field in columns]).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    return streaming_export([label for label, _ in columns], rows, filename, fmt=fmt, sheet_name=sheet_name)
 
 
 class OperLogViewSet(BaseViewSet):
     permission_classes = [IsAuthenticated, HasRolePermission]
+    perm_prefix = 'monitor:operlog'
+    perm_actions = {**BaseViewSet.perm_actions, 'clean': 'remove', 'writer_stats': 'list', 'stats': 'list'}
     serializer_class = OperLogSerializer
     queryset = OperLog.objects.all().order_by('-oper_time')
+    # 传 cursor 参数时按 (oper_time, oper_id) 游标分页，对应联合索引
+    pagination_class = KeysetPagination
+    cursor_ordering = ('-oper_time', '-oper_id')
 
     def get_queryset(self):
         qs = super().get_queryset()
-        request = self.request
-        title = request.query_params.get('title', '')
-        oper_ip = request.query_params.get('operIp', '')
-        oper_name = request.query_params.get('operName', '')
-        business_type = request.query_params.get('businessType', '')
-        status_v = request.query_params.get('status', '')
-        begin = request.query_params.get('beginTime') or request.query_params.get('params[beginTime]')
-        end = request.query_params.get('endTime') or request.query_params.get('params[endTime]')
+        params = _filter_params(self.request)
+        title = params.get('title', '')
+        oper_ip = params.get('operIp', '')
+        oper_name = params.get('operName', '')
+        business_type = params.get('businessType', '')
+        status_v = params.get('status', '')
+        begin = params.get('beginTime') or params.get('params[beginTime]')
+        end = params.get('endTime') or params.get('params[endTime]')
 
         if title:
             qs = qs.filter(title__icontains=title)
@@ -245,23 +400,16 @@ class OperLogViewSet(BaseViewSet):
                 qs = qs.filter(status=int(status_v))
             except Exception:
                 pass
-        if begin:
-            try:
-                from datetime import datetime
-                dt = datetime.strptime(begin, '%Y-%m-%d %H:%M:%S')
-                qs = qs.filter(oper_time__gte=dt)
-            except Exception:
-                pass
-        if end:
-            try:
-                from datetime import datetime
-                dt = datetime.strptime(end, '%Y-%m-%d %H:%M:%S')
-                qs = qs.filter(oper_time__lte=dt)
-            except Exception:
-                pass
-
-        order_by_column = request.query_params.get('orderByColumn', '')
-        is_asc = request.query_params.get('isAsc', '')
+        # oper_time 为分区键：带上时间范围后 Postgres/MySQL 只扫描覆盖到的月分区
+        begin_dt = _parse_time_param(begin)
+        end_dt = _parse_time_param(end, end_of_day=True)
+        if begin_dt:
+            qs = qs.filter(oper_time__gte=begin_dt)
+        if end_dt:
+            qs = qs.filter(oper_time__lte=end_dt)
+
+        order_by_column = params.get('orderByColumn', '')
+        is_asc = params.get('isAsc', '')
         if order_by_column:
             col = camel_to_snake(order_by_column)
             if is_asc == 'descending':
@@ -290,58 +438,68 @@ class OperLogViewSet(BaseViewSet):
     @action(methods=['DELETE'], detail=False, url_path='clean')
     def clean(self, request, *args, **kwargs):
         try:
-            Model = self.get_queryset().model
-            Model.objects.all().delete()  # 直接删除所有数据，不考虑软删除
-            # if hasattr(Model, 'del_flag'):
-            #     Model.objects.update(del_flag='1')
-            # else:
-            #     Model.objects.all().delete()
+            # 直接删除所有数据，不考虑软删除；分区表 TRUNCATE，SQLite 分批删除避免长时间锁表
+            get_partition_manager().truncate()
             return self.ok('操作成功')
         except Exception:
             return self.error('清空失败')
 
+    @action(methods=['GET'], detail=False, url_path='writer')
+    def writer_stats(self, request, *args, **kwargs):
+        """操作日志写入队列状态：队列深度、丢弃数、写入失败数等；rollup 为统计表待重试/丢弃的增量"""
+        return self.data({**get_oper_log_writer().stats(), 'rollup': rollup_stats()})
+
+    @action(methods=['GET'], detail=False, url_path='stats')
+    def stats(self, request, *args, **kwargs):
+        """
+        接口统计：读取分钟/小时汇总表，不扫描原始日志。
+        groupBy 可选 title,operUrl,requestMethod,status（逗号分隔）；series=true 时按时间桶展开。
+        """
+        s = OperLogStatsQuerySerializer(data=request.query_params)
+        s.is_valid(raise_exception=True)
+        data = s.validated_data
+        end_dt = _parse_time_param(data.get('endTime'), end_of_day=True) or datetime.now()
+        begin_dt = _parse_time_param(data.get('beginTime')) or end_dt - timedelta(hours=1)
+        if begin_dt > end_dt:
+            return self.error('开始时间不能晚于结束时间')
+        group_by = [g.strip() for g in (data.get('groupBy') or 'title').split(',') if g.strip()]
+        unknown = [g for g in group_by if g not in GROUP_FIELDS]
+        if unknown:
+            return self.error(f"不支持的分组字段：{','.join(unknown)}")
+        filters = {}
+        if data.get('title'):
+            filters['title'] = data['title']
+        if data.get('requestMethod'):
+            filters['request_method'] = data['requestMethod'].upper()
+        result = query_stats(begin_dt, end_dt, group_by, data.get('granularity'), data.get('series'), filters)
+        result['beginTime'] = begin_dt.strftime('%Y-%m-%d %H:%M:%S')
+        result['endTime'] = end_dt.strftime('%Y-%m-%d %H:%M:%S')
+        return self.data(result)
+
     @action(methods=['POST'], detail=False, url_path='export')
     def export(self, request, *args, **kwargs):
-        qs = self.get_queryset()
-        serializer = self.get_serializer(qs, many=True)
-        rows = serializer.data
-        try:
-            from openpyxl import Workbook
-            wb = Workbook()
-            ws = wb.active
-            ws.title = '操作日志'
-            headers = [
-                '日志编号','系统模块','操作类型','操作人员','操作地址','操作状态','操作时间','消耗时间',
-                '请求地址','请求方式','操作方法','请求参数','返回参数','异常信息','登录地点','部门名称'
-            ]
-            ws.append(headers)
-            for r in rows:
-                ws.append([
-                    r.get('operId'), r.get('title'), r.get('businessType'), r.get('operName'), r.get('operIp'),
-                    r.get('status'), r.get('operTime'), r.get('costTime'), r.get('operUrl'), r.get('requestMethod'),
-                    r.get('method'), r.get('operParam'), r.get('jsonResult'), r.get('errorMsg'), r.get('operLocation'),
-                    r.get('deptName')
-                ])
-            return self.excel_response('operlog.xlsx', wb)
-        except Exception as e:
-            return self.error(f'导出失败：{e}')
+        return _export_response(request, self.get_queryset(), OPER_LOG_EXPORT_COLUMNS, 'operlog.xlsx', '操作日志')
 
 
 class LogininforViewSet(BaseViewSet):
     permission_classes = [IsAuthenticated, HasRolePermission]
+    perm_prefix = 'monitor:logininfor'
+    perm_actions = {**BaseViewSet.perm_actions, 'clean': 'remove', 'unlock': 'unlock'}
     serializer_class = LogininforSerializer
     queryset = Logininfor.objects.all().order_by('-login_time')
+    pagination_class = KeysetPagination
+    cursor_ordering = ('-login_time', '-info_id')
 
     def get_queryset(self):
         qs = super().get_queryset()
-        request = self.request
+        params = _filter_params(self.request)
 
-        # 从前端查询参数获取过滤条件
-        ipaddr = request.query_params.get('ipaddr', '')
-        user_name = request.query_params.get('userName', '')
-        status = request.query_params.get('status', '')
-        begin_time = request.query_params.get('beginTime')
-        end_time = request.query_params.get('endTime')
+        # 从前端查询参数获取过滤条件（导出时为表单参数）
+        ipaddr = params.get('ipaddr', '')
+        user_name = params.get('userName', '')
+        status = params.get('status', '')
+        begin_time = params.get('beginTime')
+        end_time = params.get('endTime')
 
         if ipaddr:
             qs = qs.filter(ipaddr__icontains=ipaddr)
@@ -389,28 +547,10 @@ class LogininforViewSet(BaseViewSet):
 
     @action(methods=['GET'], detail=False, url_path='unlock/(?P<userName>[^/]+)')
     def unlock(self, request, userName=None):
-        """解锁用户"""
-        # 这里可以实现解锁逻辑，比如清除用户的登录失败次数
-        # 目前返回成功，实际业务逻辑根据需求实现
+        """解锁用户：清除账号维度的登录失败计数与锁定"""
+        login_guard.unlock(userName)
         return self.ok(f'用户 {userName} 解锁成功')
 
     @action(methods=['POST'], detail=False, url_path='export')
     def export(self, request, *args, **kwargs):
-        qs = self.get_queryset()
-        serializer = self.get_serializer(qs, many=True)
-        rows = serializer.data
-        try:
-            from openpyxl import Workbook
-            wb = Workbook()
-            ws = wb.active
-            ws.title = '登录日志'
-            headers = ['访问编号', '用户名称', '登录地址', '登录地点', '浏览器', '操作系统', '登录状态', '提示', '访问时间']
-            ws.append(headers)
-            for r in rows:
-                ws.append([
-                    r.get('infoId'), r.get('userName'), r.get('ipaddr'), r.get('loginLocation'),
-                    r.get('browser'), r.get('os'), r.get('status'), r.get('msg'), r.get('loginTime')
-                ])
-            return self.excel_response('logininfor.xlsx', wb)
-        except Exception as e:
-            return self.error(f'导出失败：{e}')
+        return _export_response(request, self.get_queryset(), LOGININFOR_EXPORT_COLUMNS, 'logininfor.xlsx', '登录日志')
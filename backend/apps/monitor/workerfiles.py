@@ -0,0 +1,45 @@
+import json
+import os
+import time
+
+
+def publish(directory, pid, data):
+    """把本 worker 的快照原子写入 <directory>/<pid>.json。"""
+    if not directory:
+        return
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f'{pid}.json')
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as fh:
+        json.dump(data, fh)
+    os.replace(tmp, path)
+
+
+def read_all(directory, max_age_s, exclude_pid=None):
+    """
+    读取各 worker 最近发布的快照：[(data, age_s)]。
+    超过 max_age_s 未更新的文件视为已退出的 worker，删除后跳过。
+    """
+    items = []
+    if not directory:
+        return items
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return items
+    now = time.time()
+    skip = f'{exclude_pid}.json' if exclude_pid is not None else None
+    for name in names:
+        if not name.endswith('.json') or name == skip:
+            continue
+        path = os.path.join(directory, name)
+        try:
+            age = now - os.path.getmtime(path)
+            if age > max_age_s:
+                os.remove(path)
+                continue
+            with open(path, encoding='utf-8') as fh:
+                items.append((json.load(fh), age))
+        except (OSError, ValueError):
+            continue
+    return items
@@ -0,0 +1,402 @@
+import asyncio
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.apps import apps
+from django.conf import settings
+from django.db import close_old_connections, connection
+
+from .spool import get_spool, get_spool_config
+
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_WRITER_CONFIG = {
+    'ASYNC': True,               # False 时在请求线程内同步写入（便于调试/测试）
+    'QUEUE_SIZE': 10000,         # 队列容量
+    'BATCH_SIZE': 200,           # 单批最多写入条数
+    'FLUSH_INTERVAL_MS': 500,    # 最长攒批时间
+    'FULL_POLICY': 'drop',       # 队列满时：drop 丢弃（启用 spool 时落盘）；block 最多等待 BLOCK_TIMEOUT_MS 后再丢弃
+    'BLOCK_TIMEOUT_MS': 50,
+    'SHUTDOWN_TIMEOUT_MS': 5000, # 进程退出时等待刷盘的最长时间
+}
+
+
+def get_writer_config():
+    conf = dict(DEFAULT_WRITER_CONFIG)
+    conf.update(getattr(settings, 'OPER_LOG_WRITER', None) or {})
+    return conf
+
+
+class _Flush:
+    """队列中的刷盘标记，后台线程写完当前批次后置位 event。"""
+
+    def __init__(self):
+        self.event = threading.Event()
+
+
+_STOP = object()
+
+
+class BatchLogWriter:
+    """
+    日志批量写入器：请求线程只负责入队，后台线程按条数/时间攒批后 bulk_create。
+
+    - 队列有界，满时按 full_policy 丢弃（计数）或短暂阻塞；配置了本地 spool 时改为落盘
+    - 数据库写入失败的批次落盘到 spool（spool.py），数据库恢复后由后台线程补写
+    - 进程退出（atexit）时刷盘
+    - 检测到 fork（gunicorn 预加载）后在子进程内重建队列与线程
+    """
+
+    def __init__(self, model, name='', queue_size=10000, batch_size=200, flush_interval_ms=500,
+                 full_policy='drop', block_timeout_ms=50, shutdown_timeout_ms=5000, use_async=True,
+                 spool=None, spool_mode='off', ingest_interval_s=5, ingest_batch_size=1000):
+        # model 可以是模型类或 'app_label.ModelName'
+        self._model = model
+        self.name = name or str(model)
+        self.queue_size = int(queue_size)
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = max(1, int(flush_interval_ms)) / 1000.0
+        self.full_policy = full_policy
+        self.block_timeout = max(0, int(block_timeout_ms)) / 1000.0
+        self.shutdown_timeout = max(0, int(shutdown_timeout_ms)) / 1000.0
+        self.use_async = use_async
+        self.spool = spool
+        self.spool_mode = spool_mode if spool is not None else 'off'
+        self.ingest_interval = float(ingest_interval_s)
+        self.ingest_batch_size = int(ingest_batch_size)
+        self._ingested_at = 0.0
+
+        self._lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=self.queue_size)
+        self._thread = None
+        self._pid = None
+        self._listeners = []
+
+        self.submitted = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.listener_failed = 0
+        self.spooled = 0
+        self.ingested = 0
+        self.batches = 0
+        self.last_flush_time = None
+
+    @property
+    def model(self):
+        if isinstance(self._model, str):
+            self._model = apps.get_model(self._model)
+        return self._model
+
+    def add_listener(self, func):
+        """注册批次写入成功后的回调：func(records)。"""
+        if func not in self._listeners:
+            self._listeners.append(func)
+
+    def submit(self, record):
+        """提交一条未保存的模型实例；返回 False 表示被丢弃。"""
+        if not self.use_async:
+            self._write([record])
+            return True
+        self._ensure_worker()
+        try:
+            if self.full_policy == 'block' and self.block_timeout > 0:
+                self._queue.put(record, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(record)
+        except queue.Full:
+            return self._overflow(record)
+        with self._lock:
+            self.submitted += 1
+        return True
+
+    def _overflow(self, record):
+        # 队列满：有 spool 时追加到本地分段（只写页缓存，fsync 由后台线程合并），否则丢弃
+        if self.spool_mode != 'off':
+            try:
+                self.spool.append([record], sync=False)
+                with self._lock:
+                    self.spooled += 1
+                return True
+            except Exception:
+                logger.exception('日志落盘失败 (%s)', self.name)
+        with self._lock:
+            self.dropped += 1
+        return False
+
+    async def asubmit(self, record):
+        """
+        submit 的协程版本，供 ASGI 下的异步中间件使用：入队永不阻塞事件循环。
+        block 策略改为在事件循环内让出等待；同步写入模式放到线程中执行 ORM 写入。
+        """
+        if not self.use_async:
+            await sync_to_async(self._write)([record])
+            return True
+        self._ensure_worker()
+        deadline = time.monotonic() + (self.block_timeout if self.full_policy == 'block' else 0)
+        while True:
+            try:
+                self._queue.put_nowait(record)
+                break
+            except queue.Full:
+                if time.monotonic() >= deadline:
+                    return self._overflow(record)
+                await asyncio.sleep(0.005)
+        with self._lock:
+            self.submitted += 1
+        return True
+
+    def flush(self, timeout=None):
+        """阻塞直到当前已入队的记录全部写入（或超时）。"""
+        if not self.use_async or self._thread is None or not self._thread.is_alive():
+            return True
+        marker = _Flush()
+        try:
+            self._queue.put(marker, timeout=timeout)
+        except queue.Full:
+            return False
+        return marker.event.wait(timeout)
+
+    def shutdown(self, timeout=None):
+        thread = self._thread
+        if thread is None or not thread.is_alive() or self._pid != os.getpid():
+            return
+        timeout = self.shutdown_timeout if timeout is None else timeout
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            pass
+        thread.join(timeout)
+        if self.spool_mode != 'off':
+            self.spool.close()
+
+    def stats(self):
+        return {
+            'name': self.name,
+            'async': self.use_async,
+            'queueSize': self._queue.qsize(),
+            'queueCapacity': self.queue_size,
+            'submitted': self.submitted,
+            'written': self.written,
+            'dropped': self.dropped,
+            'failed': self.failed,
+            'listenerFailed': self.listener_failed,
+            'spoolMode': self.spool_mode,
+            'spooled': self.spooled,
+            'ingested': self.ingested,
+            'pendingSegments': len(self.spool.pending_segments()) if self.spool_mode != 'off' else 0,
+            'batches': self.batches,
+            'lastFlushTime': self.last_flush_time,
+        }
+
+    def _ensure_worker(self):
+        pid = os.getpid()
+        if self._pid == pid and self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid == pid and self._thread is not None and self._thread.is_alive():
+                return
+            if self._pid is not None and self._pid != pid:
+                # fork 后父进程的队列/锁状态不可信，子进程重新开始
+                self._queue = queue.Queue(maxsize=self.queue_size)
+            self._pid = pid
+            self._thread = threading.Thread(target=self._run, name=f'log-writer-{self.name}', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        q = self._queue
+        try:
+            while True:
+                batch = []
+                markers = []
+                stop = False
+                deadline = None
+                while len(batch) < self.batch_size:
+                    if deadline is None:
+                        # 空闲时阻塞等待第一条记录；启用 spool 时定期醒来做 fsync/封存/补写
+                        if self.spool_mode == 'off':
+                            item = q.get()
+                        else:
+                            try:
+                                item = q.get(timeout=1.0)
+                            except queue.Empty:
+                                self._tick()
+                                continue
+                        deadline = time.monotonic() + self.flush_interval
+                    else:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        try:
+                            item = q.get(timeout=remaining)
+                        except queue.Empty:
+                            break
+                    if item is _STOP:
+                        stop = True
+                        break
+                    if isinstance(item, _Flush):
+                        markers.append(item)
+                        break
+                    batch.append(item)
+                if stop:
+                    # 退出前把队列中剩余的记录写完
+                    while True:
+                        try:
+                            item = q.get_nowait()
+                        except queue.Empty:
+                            break
+                        if isinstance(item, _Flush):
+                            markers.append(item)
+                        elif item is not _STOP:
+                            batch.append(item)
+                if batch:
+                    for i in range(0, len(batch), self.batch_size):
+                        self._write(batch[i:i + self.batch_size])
+                if self.spool_mode != 'off':
+                    self._tick()
+                for m in markers:
+                    m.event.set()
+                if stop:
+                    return
+        finally:
+            try:
+                connection.close()
+            except Exception:
+                pass
+
+    def _write(self, batch):
+        if self.spool_mode == 'spool':
+            # 仅落盘，由 manage.py ingest_logs --follow 入库
+            self._spool_batch(batch)
+            return
+        try:
+            close_old_connections()
+            self.model.objects.bulk_create(batch, batch_size=self.batch_size)
+        except Exception:
+            if self.spool_mode == 'fallback' and self._spool_batch(batch):
+                logger.warning('日志批量写入失败，%s 条已落盘待补写 (%s)', len(batch), self.name, exc_info=True)
+                return
+            with self._lock:
+                self.failed += len(batch)
+            logger.exception('日志批量写入失败：%s 条 (%s)', len(batch), self.name)
+            return
+        with self._lock:
+            self.written += len(batch)
+            self.batches += 1
+            self.last_flush_time = time.strftime('%Y-%m-%d %H:%M:%S')
+        self._notify(batch)
+
+    def _spool_batch(self, batch):
+        try:
+            self.spool.append(batch)
+        except Exception:
+            with self._lock:
+                self.failed += len(batch)
+            logger.exception('日志落盘失败：%s 条 (%s)', len(batch), self.name)
+            return False
+        with self._lock:
+            self.spooled += len(batch)
+        return True
+
+    def _tick(self):
+        try:
+            self.spool.tick()
+        except Exception:
+            logger.exception('日志分段维护失败 (%s)', self.name)
+        if self.spool_mode == 'fallback' and time.monotonic() - self._ingested_at >= self.ingest_interval:
+            self._ingested_at = time.monotonic()
+            try:
+                close_old_connections()
+                # 每轮最多补写几批，避免长时间占用写入线程
+                self.ingest_spool(max_batches=10)
+            except Exception:
+                logger.warning('日志补写失败，稍后重试 (%s)', self.name, exc_info=True)
+
+    def ingest_spool(self, max_batches=None):
+        """把 spool 中已封存的分段导入数据库，并触发批次回调；返回导入条数。"""
+        count = self.spool.ingest(self.model, batch_size=self.ingest_batch_size,
+                                  on_batch=self._on_ingested, max_batches=max_batches)
+        return count
+
+    def _on_ingested(self, batch):
+        with self._lock:
+            self.ingested += len(batch)
+            self.written += len(batch)
+            self.batches += 1
+            self.last_flush_time = time.strftime('%Y-%m-%d %H:%M:%S')
+        self._notify(batch)
+
+    def _notify(self, batch):
+        for func in list(self._listeners):
+            try:
+                func(batch)
+            except Exception:
+                with self._lock:
+                    self.listener_failed += len(batch)
+                logger.exception('日志批次回调执行失败 (%s)', self.name)
+
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+
+def get_log_writer(model_label, name=None):
+    """按模型获取进程级单例写入器，配置取自 settings.OPER_LOG_WRITER。"""
+    writer = _writers.get(model_label)
+    if writer is not None:
+        return writer
+    with _writers_lock:
+        writer = _writers.get(model_label)
+        if writer is None:
+            conf = get_writer_config()
+            spool_conf = get_spool_config()
+            writer = BatchLogWriter(
+                model_label,
+                name=name or model_label,
+                queue_size=conf['QUEUE_SIZE'],
+                batch_size=conf['BATCH_SIZE'],
+                flush_interval_ms=conf['FLUSH_INTERVAL_MS'],
+                full_policy=conf['FULL_POLICY'],
+                block_timeout_ms=conf['BLOCK_TIMEOUT_MS'],
+                shutdown_timeout_ms=conf['SHUTDOWN_TIMEOUT_MS'],
+                use_async=conf['ASYNC'],
+                spool=get_spool(name or model_label),
+                spool_mode=spool_conf['MODE'],
+                ingest_interval_s=spool_conf['INGEST_INTERVAL_S'],
+                ingest_batch_size=spool_conf['INGEST_BATCH_SIZE'],
+            )
+            _writers[model_label] = writer
+    return writer
+
+
+def get_oper_log_writer():
+    return get_log_writer('monitor.OperLog', name='operlog')
+
+
+def get_login_log_writer():
+    return get_log_writer('monitor.Logininfor', name='logininfor')
+
+
+def all_writer_stats():
+    return [w.stats() for w in list(_writers.values())]
+
+
+def flush_all(timeout=None):
+    for w in list(_writers.values()):
+        w.flush(timeout)
+
+
+@atexit.register
+def _shutdown_writers():
+    for w in list(_writers.values()):
+        try:
+            w.shutdown()
+        except Exception:
+            pass
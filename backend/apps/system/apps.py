@@ -5,3 +5,16 @@ class SystemConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.system'
     verbose_name = '系统管理'
+
+    def ready(self):
+        from django.core.signals import request_started
+        from . import signals  # noqa: F401
+        from .captchapool import captcha_pool
+        if captcha_pool.enabled:
+            request_started.connect(_start_captcha_pool, dispatch_uid='system-start-captcha-pool')
+
+
+def _start_captcha_pool(sender, **kwargs):
+    # worker 处理首个请求时启动验证码池线程，登录页打开前即开始预生成（fork 后在子进程内重建）
+    from .captchapool import captcha_pool
+    captcha_pool.ensure_started()
@@ -0,0 +1,143 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import transaction
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .sessions import session_registry
+
+
+DEFAULT_AUTH_USER_CACHE_CONFIG = {
+    'TTL_S': 30,               # 条目最长存活时间（兜底）；跨 worker 失效经 sys_user_online 同步，最迟 ONLINE_SESSIONS['SYNC_INTERVAL_S']
+    'MAX_USERS': 1024,         # 进程内 LRU 容量
+}
+
+
+def get_auth_user_cache_config():
+    conf = dict(DEFAULT_AUTH_USER_CACHE_CONFIG)
+    conf.update(getattr(settings, 'AUTH_USER_CACHE', None) or {})
+    return conf
+
+
+class SessionJWTAuthentication(JWTAuthentication):
+    """在 simplejwt 校验签名与有效期之后，再检查令牌是否已退出或被强退（内存吊销集合，O(1)）。"""
+
+    def get_validated_token(self, raw_token):
+        token = super().get_validated_token(raw_token)
+        jti = token.get(api_settings.JTI_CLAIM)
+        if jti and session_registry.is_revoked(str(jti)):
+            raise InvalidToken('登录状态已失效，请重新登录')
+        return token
+
+
+class AuthUserCache:
+    """
+    已认证用户的进程内 LRU 缓存，键为 (用户 ID, 令牌版本)；令牌版本为令牌中的密码摘要声明
+    （CHECK_REVOKE_TOKEN 开启时），改密后签发的新令牌不会与旧令牌共用条目。
+
+    - 条目带本进程的失效版本号；用户保存/删除时递增（见 invalidate_auth_user），其他 worker 经 sys_user_online 中的
+      变更标记同步到后递增（sessions.SessionRegistry.notify_user_changed），不依赖共享缓存
+    - 版本号在读库之前取得，读库期间发生失效的用户对象不写入缓存
+    - TTL_S 兜底；返回缓存对象的浅拷贝，视图修改 request.user 不会影响其他请求
+    """
+
+    def __init__(self, ttl_s=30, max_users=1024):
+        self.ttl = float(ttl_s)
+        self.max_users = int(max_users)
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._version = 0
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self):
+        return self.ttl > 0 and self.max_users > 0
+
+    def version(self):
+        return self._version
+
+    def invalidate(self, user_id=None):
+        with self._lock:
+            self._version += 1
+            self._entries.clear()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != self._version or entry[1] <= time.monotonic():
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return copy.copy(entry[2])
+
+    def put(self, key, user, version):
+        """version 为读库之前 version() 的返回值；其间发生过失效则不缓存。"""
+        entry = (version, time.monotonic() + self.ttl, copy.copy(user))
+        with self._lock:
+            if version != self._version:
+                return
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'users': len(self._entries)}
+
+
+_conf = get_auth_user_cache_config()
+auth_user_cache = AuthUserCache(
+    ttl_s=_conf['TTL_S'],
+    max_users=_conf['MAX_USERS'],
+)
+# 其他 worker 写入的用户变更标记同步到本进程后失效
+session_registry.add_user_listener(auth_user_cache.invalidate)
+
+
+def invalidate_auth_user(user_id=None):
+    """
+    用户状态、密码、资料变更后调用：本进程立即失效一次，事务提交后再失效一次；
+    传入 user_id 时同时写入变更标记，通知其他 worker。
+    """
+    auth_user_cache.invalidate()
+    transaction.on_commit(auth_user_cache.invalidate)
+    if user_id is not None:
+        session_registry.notify_user_changed(user_id)
+
+
+class CachedSessionJWTAuthentication(SessionJWTAuthentication):
+    """
+    在 SessionJWTAuthentication 基础上，request.user 取自 auth_user_cache，命中时省去每个请求一次 sys_user 主键查询。
+    吊销检查（jti）仍逐请求执行，并先于此处同步 sys_user_online；停用、改密等由 invalidate_auth_user 失效。
+    """
+
+    def get_user(self, validated_token):
+        if not auth_user_cache.enabled:
+            return super().get_user(validated_token)
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            return super().get_user(validated_token)
+        key = (user_id, validated_token.get(api_settings.REVOKE_TOKEN_CLAIM))
+        user = auth_user_cache.get(key)
+        if user is None:
+            # 先取版本号再读库：读库与写入缓存之间发生的失效会让这次结果不被缓存
+            version = auth_user_cache.version()
+            user = super().get_user(validated_token)
+            auth_user_cache.put(key, user, version)
+            return user
+        # 与 simplejwt 一致的校验，缓存对象同样适用
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed('User is inactive', code='user_inactive')
+        if api_settings.CHECK_REVOKE_TOKEN and key[1] != get_md5_hash_password(user.password):
+            raise AuthenticationFailed("The user's password has been changed.", code='password_changed')
+        return user
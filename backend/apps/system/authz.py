@@ -0,0 +1,286 @@
+import threading
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from apps.common.cache import register_namespace
+
+
+AUTHZ_VERSION_KEY = 'authz:version'
+ADMIN_ROLE = 'admin'
+ALL_PERMISSION = '*:*:*'
+
+# 共享层：按用户缓存 (授权版本, 角色, 权限)；每个用户一条、认证路径上高频写入，不维护键索引，
+# 缓存监控中只显示计数，可整体清理
+authz_user_cache = register_namespace('authz_user', remark='用户角色与权限', timeout=3600, index=False)
+
+
+class UserAuthz(namedtuple('UserAuthz', ['roles', 'role_ids', 'perms'])):
+    """
+    roles     角色键元组（未删除的角色，与 UserRole 关联顺序一致）
+    role_ids  启用角色的主键元组（升序），用于按角色集合共享的结构
+    perms     权限标识 frozenset，超级管理员为 {'*:*:*'}
+    """
+    __slots__ = ()
+
+    @property
+    def is_admin(self):
+        return ADMIN_ROLE in self.roles
+
+
+EMPTY = UserAuthz((), (), frozenset())
+
+
+class _Node:
+    __slots__ = ('children', 'wildcard', 'terminal', 'grant_all')
+
+    def __init__(self):
+        self.children = {}
+        self.wildcard = None     # "*" 段：匹配任意单个段
+        self.terminal = False    # 权限在此结束
+        self.grant_all = False   # 权限以 "*" 结尾：此前缀下的所有权限
+
+    def copy(self):
+        node = _Node()
+        node.children = {k: v.copy() for k, v in self.children.items()}
+        node.wildcard = self.wildcard.copy() if self.wildcard is not None else None
+        node.terminal = self.terminal
+        node.grant_all = self.grant_all
+        return node
+
+    def merge(self, other):
+        self.terminal = self.terminal or other.terminal
+        self.grant_all = self.grant_all or other.grant_all
+        for seg, child in other.children.items():
+            if seg in self.children:
+                self.children[seg].merge(child)
+            else:
+                self.children[seg] = child.copy()
+        if other.wildcard is not None:
+            if self.wildcard is None:
+                self.wildcard = other.wildcard.copy()
+            else:
+                self.wildcard.merge(other.wildcard)
+
+
+class PermissionMatcher:
+    """
+    权限标识匹配器：把一组权限（如 system:user:list、system:*:query、monitor:*）编译为按 ":" 分段的前缀树。
+
+    - 中间的 "*" 匹配任意单个段；末尾的 "*" 匹配该前缀下的所有权限（*:*:* 即全部权限）
+    - 编译时把 "*" 子树合并进同层的具体段，匹配时每段只做一次字典查找，复杂度 O(段数)
+    """
+
+    __slots__ = ('_root', 'size')
+
+    def __init__(self, perms):
+        root = _Node()
+        for perm in perms:
+            segments = [s.strip() for s in perm.split(':')]
+            if not perm or not all(segments):
+                continue
+            node = root
+            for i, seg in enumerate(segments):
+                if node.grant_all:
+                    break
+                if seg == '*' and i == len(segments) - 1:
+                    node.grant_all = True
+                    break
+                if seg == '*':
+                    if node.wildcard is None:
+                        node.wildcard = _Node()
+                    node = node.wildcard
+                else:
+                    node = node.children.setdefault(seg, _Node())
+            else:
+                node.terminal = True
+        self._compile(root)
+        self._root = root
+        self.size = len(perms)
+
+    @classmethod
+    def _compile(cls, node):
+        if node.wildcard is not None:
+            for child in node.children.values():
+                child.merge(node.wildcard)
+            cls._compile(node.wildcard)
+        for child in node.children.values():
+            cls._compile(child)
+
+    def has(self, perm):
+        node = self._root
+        for seg in perm.split(':'):
+            if node.grant_all:
+                return True
+            nxt = node.children.get(seg)
+            if nxt is None:
+                nxt = node.wildcard
+                if nxt is None:
+                    return False
+            node = nxt
+        return node.terminal or node.grant_all
+
+
+ALLOW_ALL = PermissionMatcher([ALL_PERMISSION])
+DENY_ALL = PermissionMatcher([])
+
+
+class AuthzCache:
+    """
+    用户角色与权限缓存，两级：进程内字典 + 共享缓存（authz_user 命名空间）。
+
+    - 条目带全局授权版本号；UserRole / Role / RoleMenu / Menu 变更时递增版本（invalidate_authz），
+      旧版本条目在下次访问时重新加载
+    - 版本号写在共享缓存中，各 worker 按 CHECK_INTERVAL 轮询；另设 MAX_AGE 兜底，未配置共享缓存时也能收敛
+    - 稳态下一次鉴权只有字典查找，不访问数据库
+    """
+
+    def __init__(self, check_interval=1.0, max_age=300.0, max_users=10000):
+        self.check_interval = check_interval
+        self.max_age = max_age
+        self.max_users = int(max_users)
+        self._lock = threading.Lock()
+        self._local_version = 0
+        self._shared_version = 0
+        self._shared_checked_at = 0.0
+        self._entries = {}
+        self._matchers = {}
+
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    # ----- 版本 -----
+    def invalidate(self):
+        self._local_version += 1
+        try:
+            try:
+                self._shared_version = cache.incr(AUTHZ_VERSION_KEY)
+            except ValueError:
+                cache.set(AUTHZ_VERSION_KEY, 1, timeout=None)
+                self._shared_version = 1
+        except Exception:
+            pass
+
+    def version(self):
+        """当前授权版本 (本地, 共享)，供按版本缓存的派生结构（如路由树）比对。"""
+        return self._current_version()
+
+    def _current_version(self):
+        now = time.monotonic()
+        if now - self._shared_checked_at >= self.check_interval:
+            self._shared_checked_at = now
+            try:
+                self._shared_version = cache.get(AUTHZ_VERSION_KEY, 0)
+            except Exception:
+                pass
+        return self._local_version, self._shared_version
+
+    # ----- 查询 -----
+    def get(self, user_id):
+        if not user_id:
+            return EMPTY
+        version = self._current_version()
+        entry = self._entries.get(user_id)
+        if entry is not None and entry[0] == version and time.monotonic() - entry[1] < self.max_age:
+            self.hits += 1
+            return entry[2]
+
+        shared_version = version[1]
+        try:
+            cached = authz_user_cache.get(user_id)
+        except Exception:
+            cached = None
+        if cached is not None and cached[0] == shared_version:
+            authz = UserAuthz(tuple(cached[1]), tuple(cached[2]), frozenset(cached[3]))
+            self.shared_hits += 1
+        else:
+            self.misses += 1
+            authz = self._load(user_id)
+            try:
+                authz_user_cache.set(user_id, (shared_version, authz.roles, authz.role_ids, tuple(authz.perms)))
+            except Exception:
+                pass
+        with self._lock:
+            if user_id not in self._entries and len(self._entries) >= self.max_users:
+                # 超出上限时丢弃最早写入的条目
+                self._entries.pop(next(iter(self._entries)), None)
+            self._entries[user_id] = (version, time.monotonic(), authz)
+        return authz
+
+    def _load(self, user_id):
+        from .models import Menu, UserRole
+
+        roles, active_ids = [], set()
+        for role_id, role_key, status in (
+            UserRole.objects.filter(user_id=user_id, role__del_flag='0')
+            .order_by('id').values_list('role_id', 'role__role_key', 'role__status')
+        ):
+            roles.append(role_key)
+            if status == '0':
+                active_ids.add(role_id)
+        if ADMIN_ROLE in roles:
+            perms = frozenset([ALL_PERMISSION])
+        elif active_ids:
+            perms = set()
+            for value in (
+                Menu.objects.filter(rolemenu__role_id__in=active_ids, status='0', del_flag='0')
+                .exclude(perms='').values_list('perms', flat=True).distinct()
+            ):
+                perms.update(p.strip() for p in value.split(',') if p.strip())
+            perms = frozenset(perms)
+        else:
+            perms = frozenset()
+        return UserAuthz(tuple(roles), tuple(sorted(active_ids)), perms)
+
+    def role_keys(self, user_id):
+        return self.get(user_id).roles
+
+    def matcher(self, authz):
+        """
+        按角色集合共享的权限匹配器：同一组启用角色的用户权限相同，只编译一次；授权版本变化后重新编译。
+        """
+        if authz.is_admin:
+            return ALLOW_ALL
+        if not authz.perms:
+            return DENY_ALL
+        version = self._current_version()
+        entry = self._matchers.get(authz.role_ids)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+        matcher = PermissionMatcher(authz.perms)
+        with self._lock:
+            if authz.role_ids not in self._matchers and len(self._matchers) >= self.max_users:
+                self._matchers.pop(next(iter(self._matchers)), None)
+            self._matchers[authz.role_ids] = (version, matcher)
+        return matcher
+
+    def has_perm(self, user_id, perm):
+        return self.matcher(self.get(user_id)).has(perm)
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'sharedHits': self.shared_hits,
+            'misses': self.misses,
+            'users': len(self._entries),
+            'roleSets': len(self._matchers),
+            'version': list(self._current_version()),
+        }
+
+
+def invalidate_authz():
+    """角色、菜单及其关联变更后调用：立即失效一次，事务提交后再失效一次，避免提交前被其他线程以旧数据重新加载。"""
+    authz_cache.invalidate()
+    transaction.on_commit(authz_cache.invalidate)
+
+
+_conf = getattr(settings, 'AUTHZ_CACHE', None) or {}
+authz_cache = AuthzCache(
+    check_interval=_conf.get('CHECK_INTERVAL', 1.0),
+    max_age=_conf.get('MAX_AGE', 300.0),
+    max_users=_conf.get('MAX_USERS', 10000),
+)
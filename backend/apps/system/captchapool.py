@@ -0,0 +1,214 @@
+import base64
+import datetime
+import hashlib
+import logging
+import os
+import secrets
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections
+from django.utils import timezone
+
+
+DEFAULT_CAPTCHA_POOL_CONFIG = {
+    'ENABLED': True,
+    'SIZE': 100,               # 池容量
+    'LOW_WATER': 30,           # 低于该数量时唤醒后台线程补充
+    'BATCH_SIZE': 50,          # 每批 bulk_create 的行数
+    'MAX_AGE_S': 600,          # 池中条目的最长停留时间，超过后丢弃不再发放
+    'PURGE_INTERVAL_S': 300,   # 清理过期 captcha_captchastore 行的间隔
+    'PURGE_CHUNK': 1000,       # 每次 DELETE 的行数上限
+}
+
+logger = logging.getLogger(__name__)
+
+
+def get_captcha_pool_config():
+    conf = dict(DEFAULT_CAPTCHA_POOL_CONFIG)
+    conf.update(getattr(settings, 'CAPTCHA_POOL', None) or {})
+    return conf
+
+
+def _new_hashkey():
+    # bulk_create 不经过 CaptchaStore.save()，hashkey 需自行生成（与 save() 一样为 40 位 SHA-1）
+    return hashlib.sha1(secrets.token_bytes(32)).hexdigest()
+
+
+def render_captcha(hashkey):
+    """渲染验证码图片，返回 base64 编码的 PNG（与 django-simple-captcha 的 captcha_image 一致）。"""
+    from captcha.views import captcha_image
+
+    response = captcha_image(None, hashkey)
+    if response.status_code != 200:
+        return None
+    return base64.b64encode(response.content).decode()
+
+
+def purge_expired(chunk=1000):
+    """分批删除已过期的验证码行，每批按主键删除 chunk 行，避免一次长事务锁表；返回删除行数。"""
+    from captcha.models import CaptchaStore
+
+    total = 0
+    while True:
+        ids = list(
+            CaptchaStore.objects.filter(expiration__lte=timezone.now())
+            .order_by('id').values_list('id', flat=True)[:chunk]
+        )
+        if not ids:
+            break
+        total += CaptchaStore.objects.filter(id__in=ids).delete()[0]
+        if len(ids) < chunk:
+            break
+    return total
+
+
+class CaptchaPool:
+    """
+    预生成的验证码池：后台线程批量 bulk_create CaptchaStore 行并渲染图片，请求只从内存队列取出一条，
+    不在请求线程里渲染 PIL 图片。
+
+    - 每条只发放一次；池中条目停留超过 MAX_AGE_S 后丢弃。行的过期时间为 生成时间 + MAX_AGE_S + CAPTCHA_TIMEOUT，
+      保证发放出去的验证码至少还有 CAPTCHA_TIMEOUT 的有效期
+    - 剩余数量低于 LOW_WATER 时唤醒后台线程补充到 SIZE；池空时同步生成一条兜底
+    - 后台线程每 PURGE_INTERVAL_S 分批清理已过期的行
+    """
+
+    def __init__(self, enabled=True, size=100, low_water=30, batch_size=50, max_age_s=600,
+                 purge_interval_s=300, purge_chunk=1000):
+        self.enabled = bool(enabled)
+        self.size = max(1, int(size))
+        self.low_water = min(int(low_water), self.size)
+        self.batch_size = max(1, int(batch_size))
+        self.max_age = float(max_age_s)
+        self.purge_interval = float(purge_interval_s)
+        self.purge_chunk = max(1, int(purge_chunk))
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._items = deque()      # (hashkey, 图片 base64, 入池时间)
+        self._purged_at = 0.0
+
+        self.served = 0
+        self.fallbacks = 0
+        self.generated = 0
+        self.discarded = 0
+        self.purged = 0
+
+    # ----- 生成 -----
+    def _timeout(self):
+        from captcha.conf import settings as captcha_settings
+        return datetime.timedelta(minutes=int(captcha_settings.CAPTCHA_TIMEOUT))
+
+    def generate(self, count):
+        """批量生成：一次 bulk_create 写入 count 行，再逐条渲染图片；返回 [(hashkey, 图片 base64)]。"""
+        from captcha.conf import settings as captcha_settings
+        from captcha.models import CaptchaStore
+
+        challenge_funct = captcha_settings.get_challenge()
+        expiration = timezone.now() + self._timeout() + datetime.timedelta(seconds=self.max_age)
+        rows = []
+        for _ in range(count):
+            challenge, response = challenge_funct()
+            rows.append(CaptchaStore(
+                challenge=challenge, response=response.lower(), hashkey=_new_hashkey(), expiration=expiration,
+            ))
+        CaptchaStore.objects.bulk_create(rows)
+        result = []
+        for row in rows:
+            img = render_captcha(row.hashkey)
+            if img is not None:
+                result.append((row.hashkey, img))
+        self.generated += len(result)
+        return result
+
+    def refill(self):
+        """丢弃过期条目并补充到 SIZE。"""
+        self._drop_stale()
+        while len(self._items) < self.size:
+            items = self.generate(min(self.batch_size, self.size - len(self._items)))
+            if not items:
+                break
+            now = time.monotonic()
+            with self._lock:
+                self._items.extend((key, img, now) for key, img in items)
+
+    def _drop_stale(self):
+        deadline = time.monotonic() - self.max_age
+        with self._lock:
+            while self._items and self._items[0][2] <= deadline:
+                self._items.popleft()
+                self.discarded += 1
+
+    # ----- 发放 -----
+    def take(self):
+        """取出一条 (hashkey, 图片 base64)；池空时同步生成。"""
+        self.ensure_started()
+        self._drop_stale()
+        with self._lock:
+            item = self._items.popleft() if self._items else None
+            remaining = len(self._items)
+        if remaining < self.low_water:
+            self._wakeup.set()
+        if item is not None:
+            self.served += 1
+            return item[0], item[1]
+        self.fallbacks += 1
+        return self.generate(1)[0]
+
+    # ----- 后台线程 -----
+    def ensure_started(self):
+        pid = os.getpid()
+        if self._pid == pid and self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid == pid and self._thread is not None and self._thread.is_alive():
+                return
+            if self._pid is not None and self._pid != pid:
+                # fork 后父进程的池不带到子进程，避免同一验证码被多个 worker 发放
+                self._items.clear()
+            self._pid = pid
+            self._wakeup.set()
+            self._thread = threading.Thread(target=self._run, name='captcha-pool', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(min(self.max_age / 2, self.purge_interval))
+            self._wakeup.clear()
+            try:
+                self.refill()
+                if time.monotonic() - self._purged_at >= self.purge_interval:
+                    self._purged_at = time.monotonic()
+                    self.purged += purge_expired(self.purge_chunk)
+            except DatabaseError:
+                logger.warning('验证码池补充失败', exc_info=True)
+            except Exception:
+                logger.exception('验证码池补充失败')
+            finally:
+                close_old_connections()
+
+    def stats(self):
+        return {
+            'size': len(self._items),
+            'served': self.served,
+            'fallbacks': self.fallbacks,
+            'generated': self.generated,
+            'discarded': self.discarded,
+            'purged': self.purged,
+        }
+
+
+_conf = get_captcha_pool_config()
+captcha_pool = CaptchaPool(
+    enabled=_conf['ENABLED'],
+    size=_conf['SIZE'],
+    low_water=_conf['LOW_WATER'],
+    batch_size=_conf['BATCH_SIZE'],
+    max_age_s=_conf['MAX_AGE_S'],
+    purge_interval_s=_conf['PURGE_INTERVAL_S'],
+    purge_chunk=_conf['PURGE_CHUNK'],
+)
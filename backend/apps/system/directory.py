@@ -0,0 +1,115 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+SHARED_VERSION_KEY = 'org_directory:version'
+
+
+class OrgDirectory:
+    """
+    进程级组织目录：部门名称的内存映射（用户角色与权限见 authz.py）。
+
+    - 首次访问时整表加载为紧凑字典，之后查询为 O(1) 且不访问数据库
+    - Dept 变更时（signals.py）递增版本号，下次访问时重新加载
+    - 版本号同时写入共享缓存，其他 worker 按 CHECK_INTERVAL 轮询感知；
+      另设 MAX_AGE 兜底，未配置共享缓存时也能在有限时间内收敛
+    """
+
+    def __init__(self, check_interval=1.0, max_age=300.0):
+        self.check_interval = check_interval
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._local_version = 0
+        self._shared_version = 0
+        self._shared_checked_at = 0.0
+        self._loaded_version = None
+        self._loaded_at = 0.0
+        self._dept_names = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+
+    # ----- 失效 -----
+    def invalidate(self):
+        self._local_version += 1
+        try:
+            try:
+                self._shared_version = cache.incr(SHARED_VERSION_KEY)
+            except ValueError:
+                cache.set(SHARED_VERSION_KEY, 1, timeout=None)
+                self._shared_version = 1
+        except Exception:
+            pass
+
+    def _current_version(self):
+        now = time.monotonic()
+        if now - self._shared_checked_at >= self.check_interval:
+            self._shared_checked_at = now
+            try:
+                self._shared_version = cache.get(SHARED_VERSION_KEY, 0)
+            except Exception:
+                pass
+        return self._local_version, self._shared_version
+
+    def _ensure_loaded(self):
+        # 命中：直接使用当前映射；未命中：版本变化或过期，需要重新加载
+        version = self._current_version()
+        if version == self._loaded_version and time.monotonic() - self._loaded_at < self.max_age:
+            self.hits += 1
+            return
+        with self._lock:
+            self.misses += 1
+            version = self._current_version()
+            if version == self._loaded_version and time.monotonic() - self._loaded_at < self.max_age:
+                return
+            self._load(version)
+
+    def _load(self, version):
+        from .models import Dept
+
+        dept_names = dict(Dept.objects.values_list('dept_id', 'dept_name'))
+
+        # 整体替换引用，读路径无需加锁
+        self._dept_names = dept_names
+        self._loaded_version = version
+        self._loaded_at = time.monotonic()
+        self.reloads += 1
+
+    # ----- 查询 -----
+    def dept_name(self, dept_id, load=True):
+        """load=False 时只读当前映射、不触发数据库加载（供异步上下文使用，可能略旧）。"""
+        if not dept_id:
+            return ''
+        if load:
+            self._ensure_loaded()
+        return self._dept_names.get(dept_id, '')
+
+    def dept(self, dept_id):
+        """返回序列化用的 {'deptId', 'deptName'}，部门不存在时返回 None。"""
+        if not dept_id:
+            return None
+        self._ensure_loaded()
+        name = self._dept_names.get(dept_id)
+        if name is None:
+            return None
+        return {'deptId': dept_id, 'deptName': name}
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'reloads': self.reloads,
+            'depts': len(self._dept_names),
+            'version': list(self._loaded_version) if self._loaded_version else None,
+        }
+
+
+_conf = getattr(settings, 'ORG_DIRECTORY', None) or {}
+org_directory = OrgDirectory(
+    check_interval=_conf.get('CHECK_INTERVAL', 1.0),
+    max_age=_conf.get('MAX_AGE', 300.0),
+)
@@ -0,0 +1,290 @@
+import heapq
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+
+DEFAULT_LOCKOUT_CONFIG = {
+    'ENABLED': True,
+    'WINDOW_S': 600,            # 滑动窗口长度
+    'USER_MAX_FAILURES': 5,     # 同一账号窗口内失败次数上限
+    'IP_MAX_FAILURES': 20,      # 同一 IP 窗口内失败次数上限
+    'LOCK_S': 600,              # 达到上限后的锁定时长
+    'SYNC_INTERVAL_S': 2.0,     # 批量写入与增量同步的最小间隔（其他 worker 看到计数的最大延迟）
+    'SYNC_OVERLAP_S': 5.0,      # 增量同步回看窗口，覆盖并发提交的时间差
+    'MAX_KEYS': 100000,         # 内存中保留的计数键上限
+}
+
+LOCK_WINDOW = -1
+
+logger = logging.getLogger(__name__)
+
+
+def get_lockout_config():
+    conf = dict(DEFAULT_LOCKOUT_CONFIG)
+    conf.update(getattr(settings, 'LOGIN_LOCKOUT', None) or {})
+    return conf
+
+
+def user_key(username):
+    return f'user:{(username or "").strip()[:150]}'
+
+
+def ip_key(ip):
+    return f'ip:{ip or ""}'
+
+
+class _Counter:
+    """单个键的滑动窗口计数：当前窗口与上一窗口的次数 + 锁定截止时间。"""
+    __slots__ = ('window', 'cur', 'prev', 'lock_until')
+
+    def __init__(self, window):
+        self.window = window
+        self.cur = 0
+        self.prev = 0
+        self.lock_until = 0.0
+
+    def roll(self, window):
+        if window == self.window:
+            return
+        self.prev = self.cur if window == self.window + 1 else 0
+        self.cur = 0
+        self.window = window
+
+
+class LoginGuard:
+    """
+    登录失败限制：按账号、按 IP 两个维度的滑动窗口失败计数，超过上限后锁定 LOCK_S 秒。
+
+    - 滑动窗口用相邻两个固定窗口近似：估计值 = 上一窗口次数 × 未过去的比例 + 当前窗口次数，
+      每个键只保存两个计数与锁定时间
+    - 各 worker 在内存中计数，增量按 SYNC_INTERVAL_S 批量累加到 sys_login_failure 并增量同步其他 worker 的计数，
+      登录前的检查只查内存，被锁定的请求不会进入密码哈希
+    - 触发锁定时立即写库，其他 worker 下次同步即生效
+    """
+
+    def __init__(self, enabled=True, window_s=600, user_max_failures=5, ip_max_failures=20, lock_s=600,
+                 sync_interval_s=2.0, sync_overlap_s=5.0, max_keys=100000):
+        self.enabled = bool(enabled)
+        self.window_s = max(1, int(window_s))
+        self.user_max = int(user_max_failures)
+        self.ip_max = int(ip_max_failures)
+        self.lock_s = int(lock_s)
+        self.sync_interval = float(sync_interval_s)
+        self.sync_overlap = timedelta(seconds=float(sync_overlap_s))
+        self.max_keys = int(max_keys)
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._counters = {}
+        self._pending = {}        # (键, 窗口) -> 未写库的失败次数
+        self._pending_locks = {}  # 键 -> 未写库的锁定截止时间
+        self._cursor = None
+        self._synced_at = 0.0
+        self._purged_at = time.monotonic()
+
+    # ----- 计数 -----
+    def _window(self, now):
+        return int(now // self.window_s)
+
+    def _counter(self, key, now, create=False):
+        window = self._window(now)
+        c = self._counters.get(key)
+        if c is None:
+            if not create:
+                return None
+            c = self._counters[key] = _Counter(window)
+        c.roll(window)
+        return c
+
+    def _estimate(self, c, now):
+        elapsed = (now % self.window_s) / self.window_s
+        return c.prev * (1.0 - elapsed) + c.cur
+
+    def _limit(self, key):
+        return self.user_max if key.startswith('user:') else self.ip_max
+
+    # ----- 持久化与同步 -----
+    def _flush(self, now_dt):
+        from .models import LoginFailure
+
+        pending, locks = self._pending, self._pending_locks
+        if not pending and not locks:
+            return
+        self._pending, self._pending_locks = {}, {}
+        rows = [((key, window), {'fail_count': F('fail_count') + delta}, {'fail_count': delta})
+                for (key, window), delta in pending.items()]
+        rows += [((key, LOCK_WINDOW), {'lock_until': until}, {'lock_until': until})
+                 for key, until in ((k, datetime.fromtimestamp(ts)) for k, ts in locks.items())]
+        try:
+            with transaction.atomic():
+                for (key, window), update, create in rows:
+                    qs = LoginFailure.objects.filter(lock_key=key, window=window)
+                    if qs.update(update_time=now_dt, **update):
+                        continue
+                    try:
+                        with transaction.atomic():
+                            LoginFailure.objects.create(lock_key=key, window=window, update_time=now_dt, **create)
+                    except IntegrityError:
+                        # 其他 worker 已先插入
+                        qs.update(update_time=now_dt, **update)
+        except DatabaseError:
+            # 写库失败时放回增量，下次同步重试
+            for k, delta in pending.items():
+                self._pending[k] = self._pending.get(k, 0) + delta
+            for k, ts in locks.items():
+                self._pending_locks[k] = max(ts, self._pending_locks.get(k, 0.0))
+            raise
+
+    def _apply(self, row, now):
+        c = self._counter(row.lock_key, now, create=True)
+        if row.window == LOCK_WINDOW:
+            c.lock_until = row.lock_until.timestamp() if row.lock_until else 0.0
+        elif row.window == c.window:
+            c.cur = row.fail_count
+        elif row.window == c.window - 1:
+            c.prev = row.fail_count
+
+    def _prune(self, now):
+        window = self._window(now)
+        stale = [k for k, c in self._counters.items() if c.window < window - 1 and c.lock_until <= now]
+        for k in stale:
+            del self._counters[k]
+        excess = len(self._counters) - self.max_keys
+        if excess > 0:
+            # 超出上限时丢弃未锁定且计数最小的键；只选出需要丢弃的 excess 个，不对整张表排序
+            victims = heapq.nsmallest(
+                excess, self._counters.items(), key=lambda kv: (kv[1].lock_until > now, kv[1].window, kv[1].cur),
+            )
+            for k, _ in victims:
+                del self._counters[k]
+
+    def sync(self, force=False):
+        """写入本 worker 的增量，再读取其他 worker 的更新。"""
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._reset()
+        if not force and time.monotonic() - self._synced_at < self.sync_interval:
+            return
+        with self._lock:
+            if not force and time.monotonic() - self._synced_at < self.sync_interval:
+                return
+            try:
+                self._sync()
+            except DatabaseError:
+                # 计数持久化失败不影响登录，本 worker 的内存计数仍然生效
+                logger.warning('登录失败计数同步失败', exc_info=True)
+                self._synced_at = time.monotonic()
+
+    def _sync(self):
+        from .models import LoginFailure
+
+        now = time.time()
+        now_dt = timezone.now()
+        self._flush(now_dt)
+        window = self._window(now)
+        qs = LoginFailure.objects.filter(Q(window__gte=window - 1) | Q(window=LOCK_WINDOW))
+        if self._cursor is None:
+            qs = qs.filter(Q(window__gte=window - 1) | Q(lock_until__gt=now_dt))
+        else:
+            qs = qs.filter(update_time__gte=self._cursor - self.sync_overlap)
+        cursor = self._cursor
+        for row in qs.order_by('update_time'):
+            self._apply(row, now)
+            if cursor is None or row.update_time > cursor:
+                cursor = row.update_time
+        self._cursor = cursor or now_dt
+        self._synced_at = time.monotonic()
+        self._prune(now)
+        if time.monotonic() - self._purged_at >= self.window_s:
+            self._purged_at = time.monotonic()
+            # 过期窗口的计数直接删除；锁定行（含解锁后的归零记录）保留 LOCK_S，
+            # 保证同步较慢的 worker 也能读到解锁，之后其本地锁定也已自然过期
+            LoginFailure.objects.filter(
+                Q(window__gte=0, window__lt=window - 1)
+                | Q(Q(lock_until__isnull=True) | Q(lock_until__lte=now_dt), window=LOCK_WINDOW,
+                    update_time__lt=now_dt - timedelta(seconds=self.lock_s))
+            ).delete()
+
+    # ----- 对外接口 -----
+    def check(self, username, ip):
+        """登录前检查：被锁定时返回 (维度, 剩余秒数)，维度为 user / ip；未锁定返回 None。"""
+        self.sync()
+        now = time.time()
+        with self._lock:
+            for kind, key in (('user', user_key(username)), ('ip', ip_key(ip))):
+                c = self._counter(key, now)
+                if c is None:
+                    continue
+                if c.lock_until > now:
+                    return kind, int(c.lock_until - now) + 1
+                if self._estimate(c, now) >= self._limit(key):
+                    # 其他 worker 已累计到上限但锁定尚未同步过来
+                    return kind, self.lock_s
+        return None
+
+    def record_failure(self, username, ip):
+        """记录一次失败；本次失败触发锁定时返回锁定的维度列表。"""
+        now = time.time()
+        locked = []
+        with self._lock:
+            for kind, key in (('user', user_key(username)), ('ip', ip_key(ip))):
+                c = self._counter(key, now, create=True)
+                c.cur += 1
+                self._pending[(key, c.window)] = self._pending.get((key, c.window), 0) + 1
+                if c.lock_until <= now and self._estimate(c, now) >= self._limit(key):
+                    c.lock_until = now + self.lock_s
+                    self._pending_locks[key] = c.lock_until
+                    locked.append(kind)
+        # 触发锁定时立即写库，其余增量随下次同步批量写入
+        self.sync(force=bool(locked))
+        return locked
+
+    def failures(self, username):
+        c = self._counters.get(user_key(username))
+        return 0 if c is None else int(round(self._estimate(c, time.time())))
+
+    def clear(self, key):
+        """清除某个键的计数与锁定（其他 worker 同步到计数归零的记录后生效）。"""
+        from .models import LoginFailure
+
+        with self._lock:
+            self._counters.pop(key, None)
+            self._pending_locks.pop(key, None)
+            for pk in [pk for pk in self._pending if pk[0] == key]:
+                del self._pending[pk]
+            return LoginFailure.objects.filter(lock_key=key).update(
+                fail_count=0, lock_until=None, update_time=timezone.now(),
+            )
+
+    def reset_user(self, username):
+        """登录成功后清除账号维度的失败计数（只有存在计数时才写库）。"""
+        key = user_key(username)
+        if key in self._counters:
+            self.clear(key)
+
+    def unlock(self, username):
+        return self.clear(user_key(username))
+
+
+_conf = get_lockout_config()
+login_guard = LoginGuard(
+    enabled=_conf['ENABLED'],
+    window_s=_conf['WINDOW_S'],
+    user_max_failures=_conf['USER_MAX_FAILURES'],
+    ip_max_failures=_conf['IP_MAX_FAILURES'],
+    lock_s=_conf['LOCK_S'],
+    sync_interval_s=_conf['SYNC_INTERVAL_S'],
+    sync_overlap_s=_conf['SYNC_OVERLAP_S'],
+    max_keys=_conf['MAX_KEYS'],
+)
@@ -1,7 +1,23 @@
 from django.core.management.base import BaseCommand
 from django.utils import timezone
 
-from apps.system.models import Menu, Role, User, UserRole
+from apps.system.authz import invalidate_authz
+from apps.system.menuseed import seed_button_menus
+from apps.system.models import Menu, Role, RoleMenu, User, UserRole
+
+
+# 其余菜单页面：(父级路径, 路由, 名称, 排序, 组件, 权限标识, 图标)；父级路径为 None 的是目录
+EXTRA_MENUS = [
+    ('/system', 'role', '角色管理', 6, 'system/role/index', 'system:role:list', 'peoples'),
+    ('/system', 'post', '岗位管理', 7, 'system/post/index', 'system:post:list', 'post'),
+    ('/system', 'notice', '通知公告', 8, 'system/notice/index', 'system:notice:list', 'message'),
+    (None, '/monitor', '系统监控', 2, '', '', 'monitor'),
+    ('/monitor', 'online', '在线用户', 1, 'monitor/online/index', 'monitor:online:list', 'online'),
+    ('/monitor', 'server', '服务监控', 2, 'monitor/server/index', 'monitor:server:list', 'server'),
+    ('/monitor', 'cache', '缓存监控', 3, 'monitor/cache/index', 'monitor:cache:list', 'redis'),
+    ('/monitor', 'operlog', '操作日志', 4, 'monitor/operlog/index', 'monitor:operlog:list', 'form'),
+    ('/monitor', 'logininfor', '登录日志', 5, 'monitor/logininfor/index', 'monitor:logininfor:list', 'logininfor'),
+]
 
 
 class Command(BaseCommand):
@@ -185,6 +201,34 @@ class Command(BaseCommand):
             config_menu.update_time = now
             config_menu.save()
 
+        dirs = {'/system': root}
+        for parent_path, path, name, order, component, perms, icon in EXTRA_MENUS:
+            menu_type = 'C' if parent_path else 'M'
+            parent_id = dirs[parent_path].menu_id if parent_path else 0
+            menu, _ = Menu.objects.get_or_create(parent_id=parent_id, path=path, menu_type=menu_type, defaults={
+                'menu_name': name,
+                'order_num': order,
+                'component': component,
+                'is_frame': '1',
+                'is_cache': '0',
+                'visible': '0',
+                'status': '0',
+                'perms': perms,
+                'icon': icon,
+                'create_by': 'system',
+                'update_by': 'system',
+                'create_time': now,
+                'update_time': now,
+                'remark': name + ('目录' if menu_type == 'M' else '菜单'),
+                'del_flag': '0',
+            })
+            if menu_type == 'M':
+                dirs[path] = menu
+
+        # 各页面下的按钮权限（新增、修改、删除、导出等），接口按这些标识校验
+        if seed_button_menus(Menu, RoleMenu):
+            invalidate_authz()
+
         # 初始化角色
         role_admin_defaults = {
             'role_name': '管理员',
@@ -0,0 +1,87 @@
+from django.utils import timezone
+
+
+# 菜单页面（C，按 perms 定位）下的按钮（F）：与各视图 perm_prefix/perm_actions、required_perms 声明的接口权限一一对应
+BUTTON_MENUS = {
+    'system:user:list': [
+        ('用户查询', 'system:user:query'), ('用户新增', 'system:user:add'), ('用户修改', 'system:user:edit'),
+        ('用户删除', 'system:user:remove'), ('用户导出', 'system:user:export'), ('用户导入', 'system:user:import'),
+        ('重置密码', 'system:user:resetPwd'),
+    ],
+    'system:role:list': [
+        ('角色查询', 'system:role:query'), ('角色新增', 'system:role:add'), ('角色修改', 'system:role:edit'),
+        ('角色删除', 'system:role:remove'), ('角色导出', 'system:role:export'),
+    ],
+    'system:menu:list': [
+        ('菜单查询', 'system:menu:query'), ('菜单新增', 'system:menu:add'), ('菜单修改', 'system:menu:edit'),
+        ('菜单删除', 'system:menu:remove'),
+    ],
+    'system:dept:list': [
+        ('部门查询', 'system:dept:query'), ('部门新增', 'system:dept:add'), ('部门修改', 'system:dept:edit'),
+        ('部门删除', 'system:dept:remove'),
+    ],
+    'system:post:list': [
+        ('岗位查询', 'system:post:query'), ('岗位新增', 'system:post:add'), ('岗位修改', 'system:post:edit'),
+        ('岗位删除', 'system:post:remove'), ('岗位导出', 'system:post:export'),
+    ],
+    'system:dict:list': [
+        ('字典查询', 'system:dict:query'), ('字典新增', 'system:dict:add'), ('字典修改', 'system:dict:edit'),
+        ('字典删除', 'system:dict:remove'), ('字典导出', 'system:dict:export'),
+    ],
+    'system:config:list': [
+        ('参数查询', 'system:config:query'), ('参数新增', 'system:config:add'), ('参数修改', 'system:config:edit'),
+        ('参数删除', 'system:config:remove'), ('参数导出', 'system:config:export'),
+    ],
+    'system:notice:list': [
+        ('公告查询', 'system:notice:query'), ('公告新增', 'system:notice:add'), ('公告修改', 'system:notice:edit'),
+        ('公告删除', 'system:notice:remove'),
+    ],
+    'monitor:online:list': [
+        ('在线查询', 'monitor:online:query'), ('单条强退', 'monitor:online:forceLogout'),
+    ],
+    'monitor:operlog:list': [
+        ('操作查询', 'monitor:operlog:query'), ('操作删除', 'monitor:operlog:remove'),
+        ('日志导出', 'monitor:operlog:export'),
+    ],
+    'monitor:logininfor:list': [
+        ('登录查询', 'monitor:logininfor:query'), ('登录删除', 'monitor:logininfor:remove'),
+        ('日志导出', 'monitor:logininfor:export'), ('账户解锁', 'monitor:logininfor:unlock'),
+    ],
+    'monitor:cache:list': [
+        ('缓存清理', 'monitor:cache:remove'),
+    ],
+}
+
+
+def seed_button_menus(menu_model, role_menu_model, buttons=None, operator='system'):
+    """
+    在 perms 匹配的菜单页面下补齐按钮，已存在（同一父菜单下 perms 相同）的不重复创建；
+    新建的按钮同时授予已拥有该页面的角色，升级后原有角色的接口权限不变。
+    menu_model / role_menu_model 可传迁移中的历史模型。返回新建的按钮数。
+    """
+    buttons = BUTTON_MENUS if buttons is None else buttons
+    now = timezone.now()
+    audit = {'create_by': operator, 'update_by': operator, 'create_time': now, 'update_time': now, 'del_flag': '0'}
+    created = 0
+    for page in menu_model.objects.filter(menu_type='C', del_flag='0', perms__in=list(buttons)):
+        existing = set(
+            menu_model.objects.filter(parent_id=page.menu_id, menu_type='F', del_flag='0').values_list('perms', flat=True)
+        )
+        new_menus = [
+            menu_model(
+                parent_id=page.menu_id, menu_name=name, order_num=order, menu_type='F', perms=perm,
+                is_frame='1', is_cache='0', visible='0', status='0', **audit,
+            )
+            for order, (name, perm) in enumerate(buttons[page.perms], start=1) if perm not in existing
+        ]
+        if not new_menus:
+            continue
+        for menu in new_menus:
+            menu.save()
+        role_ids = list(role_menu_model.objects.filter(menu_id=page.menu_id).values_list('role_id', flat=True))
+        role_menu_model.objects.bulk_create(
+            [role_menu_model(role_id=role_id, menu_id=menu.menu_id, **audit) for role_id in role_ids for menu in new_menus],
+            ignore_conflicts=True,
+        )
+        created += len(new_menus)
+    return created
@@ -0,0 +1,108 @@
+import hashlib
+import threading
+
+from rest_framework.renderers import JSONRenderer
+
+from .authz import authz_cache
+
+
+def build_routers(menus):
+    """
+    菜单列表（已按 parent_id, order_num 排序）转前端路由树：先按 parent_id 分组再自顶向下展开，O(n)。
+    按钮（F）不生成路由；父菜单未授权的子菜单不会挂到树上。
+    """
+    children_of = {}
+    for m in menus:
+        children_of.setdefault(m.parent_id, []).append(m)
+
+    def to_router(m):
+        hidden = (m.visible == '1')
+        is_outer = (m.is_frame == '0')
+
+        meta = {
+            "title": m.menu_name,
+            "icon": m.icon or None,
+            "noCache": (m.is_cache == '1')
+        }
+        if m.query:
+            meta["query"] = m.query
+
+        if m.menu_type == 'M':
+            return {
+                "path": m.path or ("/" + str(m.menu_id)),
+                "component": "Layout" if m.parent_id == 0 else "ParentView",
+                "hidden": hidden,
+                "alwaysShow": True,
+                "name": m.route_name or None,
+                "meta": meta,
+                "children": [r for r in (to_router(c) for c in children_of.get(m.menu_id, ())) if r is not None],
+            }
+        elif m.menu_type == 'C':
+            if is_outer and (m.path.startswith('http://') or m.path.startswith('https://')):
+                return {
+                    "path": m.path,
+                    "component": "InnerLink",
+                    "hidden": hidden,
+                    "name": m.route_name or None,
+                    "meta": meta
+                }
+            return {
+                "path": m.path or ("/" + str(m.menu_id)),
+                "component": m.component or "Layout",
+                "hidden": hidden,
+                "name": m.route_name or None,
+                "meta": meta
+            }
+        return None
+
+    return [r for r in (to_router(m) for m in children_of.get(0, ())) if r is not None]
+
+
+class RouterCache:
+    """
+    按角色集合缓存的路由树。
+
+    - 键为 (是否超级管理员, 启用角色 ID)，同一角色组合的用户共享一份；条目带授权版本号，
+      Menu / RoleMenu 变更递增版本后（见 authz.invalidate_authz）下次访问重新构建
+    - 缓存的是渲染好的响应体与其 SHA-1 强 ETag，命中时不再序列化；If-None-Match 匹配时直接 304
+    """
+
+    def __init__(self, max_entries=1000):
+        self.max_entries = int(max_entries)
+        self._lock = threading.Lock()
+        self._entries = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, authz):
+        """返回 (etag, 响应体 bytes)。"""
+        key = (authz.is_admin, authz.role_ids)
+        version = authz_cache.version()
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == version:
+            self.hits += 1
+            return entry[1], entry[2]
+        self.misses += 1
+        body = JSONRenderer().render({"code": 200, "msg": "操作成功", "data": self._build(authz)})
+        etag = '"%s"' % hashlib.sha1(body).hexdigest()
+        with self._lock:
+            if key not in self._entries and len(self._entries) >= self.max_entries:
+                self._entries.pop(next(iter(self._entries)), None)
+            self._entries[key] = (version, etag, body)
+        return etag, body
+
+    def _build(self, authz):
+        from .models import Menu
+
+        qs = Menu.objects.filter(status='0', del_flag='0', menu_type__in=('M', 'C'))
+        if not authz.is_admin:
+            if not authz.role_ids:
+                return []
+            qs = qs.filter(rolemenu__role_id__in=authz.role_ids).distinct()
+        return build_routers(list(qs.order_by('parent_id', 'order_num')))
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'roleSets': len(self._entries)}
+
+
+router_cache = RouterCache()
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.8 on 2026-10-17 19:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('system', '0004_merge_0002_notice_post_userpost_0003_notice'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserOnline',
+            fields=[
+                ('token_id', models.CharField(max_length=64, primary_key=True, serialize=False, verbose_name='会话编号')),
+                ('user_id', models.BigIntegerField(verbose_name='用户ID')),
+                ('user_name', models.CharField(max_length=150, verbose_name='用户账号')),
+                ('dept_name', models.CharField(blank=True, default='', max_length=50, verbose_name='部门名称')),
+                ('ipaddr', models.CharField(blank=True, default='', max_length=128, verbose_name='登录IP地址')),
+                ('login_location', models.CharField(blank=True, default='', max_length=255, verbose_name='登录地点')),
+                ('browser', models.CharField(blank=True, default='', max_length=255, verbose_name='浏览器类型')),
+                ('os', models.CharField(blank=True, default='', max_length=50, verbose_name='操作系统')),
+                ('login_time', models.DateTimeField(verbose_name='登录时间')),
+                ('expire_time', models.DateTimeField(verbose_name='过期时间')),
+                ('revoked', models.BooleanField(default=False, verbose_name='已注销')),
+                ('update_time', models.DateTimeField(verbose_name='更新时间')),
+            ],
+            options={
+                'verbose_name': '在线用户',
+                'verbose_name_plural': '在线用户',
+                'db_table': 'sys_user_online',
+                'indexes': [models.Index(fields=['update_time'], name='sys_user_online_update_idx'), models.Index(fields=['expire_time'], name='sys_user_online_expire_idx')],
+            },
+        ),
+    ]
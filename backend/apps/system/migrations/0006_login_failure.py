@@ -0,0 +1,31 @@
+# Generated by Django 5.2.8 on 2026-10-17 19:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('system', '0005_user_online'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LoginFailure',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('lock_key', models.CharField(max_length=160, verbose_name='计数键')),
+                ('window', models.BigIntegerField(verbose_name='时间窗口')),
+                ('fail_count', models.IntegerField(default=0, verbose_name='失败次数')),
+                ('lock_until', models.DateTimeField(blank=True, null=True, verbose_name='锁定截止时间')),
+                ('update_time', models.DateTimeField(verbose_name='更新时间')),
+            ],
+            options={
+                'verbose_name': '登录失败计数',
+                'verbose_name_plural': '登录失败计数',
+                'db_table': 'sys_login_failure',
+                'indexes': [models.Index(fields=['update_time'], name='sys_login_failure_update_idx')],
+                'constraints': [models.UniqueConstraint(fields=('lock_key', 'window'), name='sys_login_failure_key_window_uniq')],
+            },
+        ),
+    ]
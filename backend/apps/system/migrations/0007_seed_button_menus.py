@@ -0,0 +1,19 @@
+from django.db import migrations
+
+from apps.system.menuseed import seed_button_menus
+
+
+def forwards(apps, schema_editor):
+    # 接口按 perm_prefix/perm_actions 校验后，已有库只有 *:*:list 页面权限；补齐按钮并授予已拥有页面的角色
+    seed_button_menus(apps.get_model('system', 'Menu'), apps.get_model('system', 'RoleMenu'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('system', '0006_login_failure'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, migrations.RunPython.noop),
+    ]
@@ -253,3 +253,60 @@ class Notice(BaseModel):
         verbose_name = '通知公告'
         verbose_name_plural = '通知公告'
         ordering = ['-create_time']
+
+
+class UserOnline(models.Model):
+    """
+    在线会话（按 JWT 的 jti 登记）。登录时写入，退出/强退时标记 revoked，过期后由 sessions.py 清理。
+    各 worker 按 update_time 增量同步到内存，认证时只查内存中的吊销集合。
+    """
+    token_id = models.CharField(max_length=64, primary_key=True, verbose_name='会话编号')
+    user_id = models.BigIntegerField(verbose_name='用户ID')
+    user_name = models.CharField(max_length=150, verbose_name='用户账号')
+    dept_name = models.CharField(max_length=50, blank=True, default='', verbose_name='部门名称')
+    ipaddr = models.CharField(max_length=128, blank=True, default='', verbose_name='登录IP地址')
+    login_location = models.CharField(max_length=255, blank=True, default='', verbose_name='登录地点')
+    browser = models.CharField(max_length=255, blank=True, default='', verbose_name='浏览器类型')
+    os = models.CharField(max_length=50, blank=True, default='', verbose_name='操作系统')
+    login_time = models.DateTimeField(verbose_name='登录时间')
+    expire_time = models.DateTimeField(verbose_name='过期时间')
+    revoked = models.BooleanField(default=False, verbose_name='已注销')
+    update_time = models.DateTimeField(verbose_name='更新时间')
+
+    class Meta:
+        db_table = 'sys_user_online'
+        verbose_name = '在线用户'
+        verbose_name_plural = '在线用户'
+        indexes = [
+            models.Index(fields=['update_time'], name='sys_user_online_update_idx'),
+            models.Index(fields=['expire_time'], name='sys_user_online_expire_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_name}({self.token_id})"
+
+
+class LoginFailure(models.Model):
+    """
+    登录失败计数（lockout.py）：按 键（user:<账号> / ip:<地址>）+ 时间窗口 各一行，
+    window 为 -1 的行记录锁定截止时间。各 worker 在内存中计数，批量累加到本表，再按 update_time 增量同步。
+    """
+    lock_key = models.CharField(max_length=160, verbose_name='计数键')
+    window = models.BigIntegerField(verbose_name='时间窗口')
+    fail_count = models.IntegerField(default=0, verbose_name='失败次数')
+    lock_until = models.DateTimeField(null=True, blank=True, verbose_name='锁定截止时间')
+    update_time = models.DateTimeField(verbose_name='更新时间')
+
+    class Meta:
+        db_table = 'sys_login_failure'
+        verbose_name = '登录失败计数'
+        verbose_name_plural = '登录失败计数'
+        constraints = [
+            models.UniqueConstraint(fields=['lock_key', 'window'], name='sys_login_failure_key_window_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['update_time'], name='sys_login_failure_update_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.lock_key}@{self.window}={self.fail_count}"
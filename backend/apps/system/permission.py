@@ -1,15 +1,41 @@
 from rest_framework.permissions import BasePermission
-from .models import UserRole
+from .authz import authz_cache
+
+
+def required_perm(view, request):
+    """
+    视图声明的权限标识，按 action 名（APIView 为小写请求方法）取：
+    - required_perms：{action: 完整权限}，如 {'get': 'monitor:server:list'}
+    - perm_prefix + perm_actions：{action: 后缀}，拼成 "前缀:后缀"，如 system:user + list
+    两处都未声明的 action 只要求登录。
+    """
+    action = getattr(view, 'action', None) or request.method.lower()
+    required = getattr(view, 'required_perms', None)
+    if required and action in required:
+        return required[action]
+    prefix = getattr(view, 'perm_prefix', None)
+    if prefix:
+        suffix = (getattr(view, 'perm_actions', None) or {}).get(action)
+        if suffix:
+            return f'{prefix}:{suffix}'
+    return None
 
 
 class HasRolePermission(BasePermission):
     def has_permission(self, request, view):
+        user_id = getattr(request.user, 'id', None)
         required = getattr(view, 'required_roles', None)
-        if not required:
-            return True
-        user = request.user
-        try:
-            roles = [ur.role.role_key for ur in UserRole.objects.filter(user=user).select_related('role')]
-        except Exception:
-            roles = []
-        return any(r in roles for r in required) or ('admin' in roles)
\ No newline at end of file
+        if required:
+            try:
+                roles = authz_cache.role_keys(user_id)
+            except Exception:
+                roles = ()
+            if not (any(r in roles for r in required) or ('admin' in roles)):
+                return False
+        perm = required_perm(view, request)
+        if perm:
+            try:
+                return authz_cache.has_perm(user_id, perm)
+            except Exception:
+                return False
+        return True
@@ -1,6 +1,8 @@
 from rest_framework import serializers
 from .models import User, Dept, Role, UserRole, Menu, DictType, DictData, Config, Post, UserPost, RoleMenu, Notice
 from .common import snake_to_camel
+from .authz import invalidate_authz
+from .directory import org_directory
 
 class CamelCaseModelSerializer(serializers.ModelSerializer):
     camelize = True
@@ -58,16 +60,7 @@ class UserSerializer(BaseModelSerializer):
         fields = ['userId', 'userName', 'nickName', 'phonenumber', 'email', 'sex', 'avatar', 'status','remark','dept','deptId', 'roleIds', 'postIds', 'password']
     
     def get_dept(self, obj):
-        if obj.dept_id:
-            try:
-                dept = Dept.objects.get(dept_id=obj.dept_id)
-                return {
-                    'deptId': dept.dept_id,
-                    'deptName': dept.dept_name
-                }
-            except Dept.DoesNotExist:
-                return None
-        return None
+        return org_directory.dept(obj.dept_id)
 
     def create(self, validated_data):
         role_ids = validated_data.pop('roleIds', [])
@@ -164,16 +157,7 @@ class UserProfileSerializer(BaseModelSerializer):
                  'dept_id', 'dept', 'roleIds', 'postIds', 'createTime']
     
     def get_dept(self, obj):
-        if obj.dept_id:
-            try:
-                dept = Dept.objects.get(dept_id=obj.dept_id)
-                return {
-                    'deptId': dept.dept_id,
-                    'deptName': dept.dept_name
-                }
-            except Dept.DoesNotExist:
-                return None
-        return None
+        return org_directory.dept(obj.dept_id)
     
     def get_roleIds(self, obj):
         return list(UserRole.objects.filter(user=obj).values_list('role_id', flat=True))
@@ -192,16 +176,7 @@ class UserInfoSerializer(serializers.Serializer):
     dept = serializers.SerializerMethodField()
 
     def get_dept(self, obj):
-        if obj.dept_id:
-            try:
-                dept = Dept.objects.get(dept_id=obj.dept_id)
-                return {
-                    'deptId': dept.dept_id,
-                    'deptName': dept.dept_name
-                }
-            except Dept.DoesNotExist:
-                return None
-        return None
+        return org_directory.dept(obj.dept_id)
 
 
 class ResetPwdSerializer(serializers.Serializer):
@@ -273,6 +248,8 @@ class RoleSerializer(BaseModelSerializer):
         
         if menu_ids:
             RoleMenu.objects.bulk_create([RoleMenu(role=role, menu_id=mid) for mid in menu_ids])
+            # bulk_create 不触发 post_save，需手动失效授权缓存
+            invalidate_authz()
             
         return role
 
@@ -285,6 +262,7 @@ class RoleSerializer(BaseModelSerializer):
         if menu_ids is not None:
             RoleMenu.objects.filter(role=role).delete()
             RoleMenu.objects.bulk_create([RoleMenu(role=role, menu_id=mid) for mid in menu_ids])
+            invalidate_authz()
             
         return role
 
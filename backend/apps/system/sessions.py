@@ -0,0 +1,262 @@
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from apps.common.clientip import get_client_ip
+from apps.common.iplocation import ip_locator
+from apps.common.useragent import parse_user_agent
+
+
+DEFAULT_SESSION_CONFIG = {
+    'SYNC_INTERVAL_S': 1.0,    # 各 worker 增量同步 sys_user_online 的最小间隔（强退在其他 worker 生效的最大延迟）
+    'SYNC_OVERLAP_S': 5.0,     # 增量同步回看窗口，覆盖并发提交的时间差
+    'WHEEL_TICK_S': 60,        # 时间轮刻度
+    'PURGE_INTERVAL_S': 300,   # 删除已过期会话行的间隔
+}
+
+
+# 用户变更标记行的 token_id 前缀（见 SessionRegistry.notify_user_changed）
+USER_CHANGED_PREFIX = 'user-changed:'
+
+
+def get_session_config():
+    conf = dict(DEFAULT_SESSION_CONFIG)
+    conf.update(getattr(settings, 'ONLINE_SESSIONS', None) or {})
+    return conf
+
+
+class TimerWheel:
+    """
+    哈希时间轮：按到期时间落入 (到期刻度 % 槽数) 的槽，推进时只检查经过的槽，
+    到期判断交给调用方（超过一圈的条目留在槽内等下一圈）。
+    """
+
+    def __init__(self, tick_s=60, slots=512):
+        self.tick = max(1, int(tick_s))
+        self.slots = [set() for _ in range(max(1, int(slots)))]
+        self.cursor = int(time.time() // self.tick)
+
+    def _slot(self, expires_at):
+        return self.slots[int(expires_at // self.tick) % len(self.slots)]
+
+    def add(self, key, expires_at):
+        self._slot(expires_at).add(key)
+
+    def discard(self, key, expires_at):
+        self._slot(expires_at).discard(key)
+
+    def advance(self, now, is_expired):
+        """推进到 now，返回到期的键。当前刻度的槽下次继续检查。"""
+        now_tick = int(now // self.tick)
+        expired = []
+        steps = min(now_tick - self.cursor, len(self.slots) - 1)
+        for t in range(now_tick - steps, now_tick + 1):
+            slot = self.slots[t % len(self.slots)]
+            for key in [k for k in slot if is_expired(k, now)]:
+                slot.discard(key)
+                expired.append(key)
+        self.cursor = now_tick
+        return expired
+
+
+class SessionRegistry:
+    """
+    JWT 在线会话登记表。
+
+    - sys_user_online 为各 worker 共享的持久存储，只在登录、退出、强退时写入
+    - 每个 worker 在内存中保存 jti -> 会话 与吊销集合，按 SYNC_INTERVAL_S 以 update_time 增量同步，
+      认证时 is_revoked 为一次字典查找，不访问数据库
+    - 会话与吊销记录都按令牌过期时间挂在时间轮上，到期后从内存移除
+    - 用户停用、改密等变更也写一条标记行（USER_CHANGED_PREFIX），各 worker 同步到后通知 add_user_listener 登记的回调，
+      认证用户缓存借此跨 worker 失效，不依赖共享缓存
+    """
+
+    def __init__(self, sync_interval_s=1.0, sync_overlap_s=5.0, wheel_tick_s=60, purge_interval_s=300):
+        self.sync_interval = float(sync_interval_s)
+        self.sync_overlap = timedelta(seconds=float(sync_overlap_s))
+        self.wheel_tick = int(wheel_tick_s)
+        self.purge_interval = float(purge_interval_s)
+        self._lock = threading.Lock()
+        self._user_listeners = []
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._sessions = {}
+        self._revoked = {}
+        # 槽数覆盖一个访问令牌有效期，超出的条目多转几圈即可
+        lifetime = settings.SIMPLE_JWT.get('ACCESS_TOKEN_LIFETIME', timedelta(hours=8)).total_seconds()
+        self._wheel = TimerWheel(self.wheel_tick, lifetime // self.wheel_tick + 2)
+        self._cursor = None
+        self._synced_at = 0.0
+        self._purged_at = time.monotonic()
+
+    # ----- 内存状态 -----
+    def _expires(self, key, now):
+        item = self._sessions.get(key)
+        if item is not None:
+            return item['expires'] <= now
+        exp = self._revoked.get(key)
+        return exp is None or exp <= now
+
+    def _apply(self, row):
+        """应用一行；用户变更标记行返回其用户 ID，其余返回 None。"""
+        if row.token_id.startswith(USER_CHANGED_PREFIX):
+            return row.user_id
+        expires = row.expire_time.timestamp()
+        if expires <= time.time():
+            self._sessions.pop(row.token_id, None)
+            self._revoked.pop(row.token_id, None)
+            return
+        if row.revoked:
+            self._sessions.pop(row.token_id, None)
+            self._revoked[row.token_id] = expires
+        else:
+            self._sessions[row.token_id] = {
+                'tokenId': row.token_id,
+                'userId': row.user_id,
+                'userName': row.user_name,
+                'deptName': row.dept_name,
+                'ipaddr': row.ipaddr,
+                'loginLocation': row.login_location,
+                'browser': row.browser,
+                'os': row.os,
+                'loginTime': row.login_time.strftime('%Y-%m-%d %H:%M:%S'),
+                'expireTime': row.expire_time.strftime('%Y-%m-%d %H:%M:%S'),
+                'expires': expires,
+            }
+        self._wheel.add(row.token_id, expires)
+
+    def _expire(self):
+        for key in self._wheel.advance(time.time(), self._expires):
+            self._sessions.pop(key, None)
+            self._revoked.pop(key, None)
+
+    def sync(self, force=False):
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._reset()
+        if not force and time.monotonic() - self._synced_at < self.sync_interval:
+            return
+        from .models import UserOnline
+
+        with self._lock:
+            if not force and time.monotonic() - self._synced_at < self.sync_interval:
+                return
+            now = timezone.now()
+            if self._cursor is None:
+                qs = UserOnline.objects.filter(expire_time__gt=now)
+            else:
+                qs = UserOnline.objects.filter(update_time__gte=self._cursor - self.sync_overlap)
+            cursor = self._cursor
+            changed = set()
+            for row in qs.order_by('update_time'):
+                user_id = self._apply(row)
+                if user_id is not None:
+                    changed.add(user_id)
+                if cursor is None or row.update_time > cursor:
+                    cursor = row.update_time
+            self._cursor = cursor or now
+            self._synced_at = time.monotonic()
+            self._expire()
+            if time.monotonic() - self._purged_at >= self.purge_interval:
+                self._purged_at = time.monotonic()
+                UserOnline.objects.filter(expire_time__lte=now).delete()
+        for user_id in changed:
+            for func in list(self._user_listeners):
+                func(user_id)
+
+    # ----- 对外接口 -----
+    def register(self, token, user, request, dept_name=''):
+        """登录成功后登记访问令牌（token 为 simplejwt 的 AccessToken）。"""
+        from .models import UserOnline
+
+        now = timezone.now()
+        ip = get_client_ip(request)
+        browser, os_name = parse_user_agent(request.META.get('HTTP_USER_AGENT', ''))
+        row = UserOnline.objects.create(
+            token_id=str(token['jti']),
+            user_id=user.pk,
+            user_name=user.username,
+            dept_name=dept_name or '',
+            ipaddr=ip,
+            login_location=ip_locator.lookup(ip),
+            browser=browser,
+            os=os_name,
+            login_time=now,
+            expire_time=datetime.fromtimestamp(token['exp']),
+            update_time=now,
+        )
+        with self._lock:
+            self._apply(row)
+        return row
+
+    def revoke(self, token_id, expires_at=None):
+        """
+        吊销会话（退出/强退）：标记 revoked，其他 worker 下次同步后拒绝该令牌。
+        未登记的令牌（如登记功能上线前签发）需传入 expires_at 才能吊销。返回是否生效。
+        """
+        from .models import UserOnline
+
+        now = timezone.now()
+        updated = UserOnline.objects.filter(token_id=token_id).update(revoked=True, update_time=now)
+        if not updated and expires_at is None:
+            return False
+        if not updated:
+            UserOnline.objects.create(
+                token_id=token_id, user_id=0, user_name='', login_time=now,
+                expire_time=datetime.fromtimestamp(expires_at), revoked=True, update_time=now,
+            )
+        with self._lock:
+            session = self._sessions.pop(token_id, None)
+            expires = expires_at or (session and session['expires']) or time.time() + self._wheel.tick * len(self._wheel.slots)
+            self._revoked[token_id] = expires
+            self._wheel.add(token_id, expires)
+        return True
+
+    def add_user_listener(self, func):
+        """登记用户变更回调 func(user_id)，同步到其他 worker 写入的变更标记时调用。"""
+        if func not in self._user_listeners:
+            self._user_listeners.append(func)
+
+    def notify_user_changed(self, user_id):
+        """
+        用户停用、改密、删除等变更后调用：写入一条已吊销的标记行，随调用方事务提交，
+        其他 worker 最迟 SYNC_INTERVAL_S 后同步到并通知回调。标记行的有效期只需覆盖认证用户缓存的 TTL。
+        """
+        from .models import UserOnline
+
+        now = timezone.now()
+        UserOnline.objects.create(
+            token_id=f'{USER_CHANGED_PREFIX}{user_id}:{uuid.uuid4().hex}', user_id=user_id, user_name='',
+            login_time=now, expire_time=now + timedelta(minutes=10), revoked=True, update_time=now,
+        )
+
+    def is_revoked(self, token_id):
+        self.sync()
+        exp = self._revoked.get(token_id)
+        return exp is not None and exp > time.time()
+
+    def sessions(self):
+        self.sync()
+        now = time.time()
+        items = [dict(s) for s in list(self._sessions.values()) if s['expires'] > now]
+        for item in items:
+            item.pop('expires', None)
+        items.sort(key=lambda s: s['loginTime'], reverse=True)
+        return items
+
+
+_conf = get_session_config()
+session_registry = SessionRegistry(
+    sync_interval_s=_conf['SYNC_INTERVAL_S'],
+    sync_overlap_s=_conf['SYNC_OVERLAP_S'],
+    wheel_tick_s=_conf['WHEEL_TICK_S'],
+    purge_interval_s=_conf['PURGE_INTERVAL_S'],
+)
@@ -0,0 +1,36 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .authentication import invalidate_auth_user
+from .authz import invalidate_authz
+from .directory import org_directory
+from .models import Dept, Menu, Role, RoleMenu, User, UserRole
+
+
+@receiver(post_save, sender=Dept)
+@receiver(post_delete, sender=Dept)
+def invalidate_org_directory(sender, **kwargs):
+    # 立即失效一次；事务提交后再失效一次，避免提交前被其他线程以旧数据重新加载
+    org_directory.invalidate()
+    transaction.on_commit(org_directory.invalidate)
+
+
+@receiver(post_save, sender=Role)
+@receiver(post_delete, sender=Role)
+@receiver(post_save, sender=UserRole)
+@receiver(post_delete, sender=UserRole)
+@receiver(post_save, sender=RoleMenu)
+@receiver(post_delete, sender=RoleMenu)
+@receiver(post_save, sender=Menu)
+@receiver(post_delete, sender=Menu)
+def invalidate_authorization(sender, **kwargs):
+    # bulk_create 不触发信号，批量写入的调用方需自行调用 invalidate_authz()
+    invalidate_authz()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_authenticated_user(sender, **kwargs):
+    # 改状态、重置/修改密码、修改资料等都会保存 User，认证用户缓存随之失效（含其他 worker）
+    invalidate_auth_user(kwargs['instance'].pk)
@@ -1,7 +1,6 @@
 from django.utils.timezone import make_aware
 from datetime import datetime
 
-from django.core.cache import cache
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.decorators import action
 from rest_framework.response import Response
@@ -9,6 +8,7 @@ from rest_framework import status
 
 from .core import BaseViewSet
 from ..permission import HasRolePermission
+from apps.common.cache import config_cache
 from apps.common.mixins import ExportExcelMixin
 from collections import OrderedDict
 from ..models import Config
@@ -21,6 +21,8 @@ from ..serializers import (
 
 class ConfigViewSet(BaseViewSet, ExportExcelMixin):
     permission_classes = [IsAuthenticated, HasRolePermission]
+    perm_prefix = 'system:config'
+    perm_actions = {**BaseViewSet.perm_actions, 'list_action': 'list', 'refresh_cache': 'remove'}
     queryset = Config.objects.filter(del_flag='0').order_by('-create_time')
     serializer_class = ConfigSerializer
     update_body_serializer_class = ConfigUpdateSerializer
@@ -88,7 +90,7 @@ class ConfigViewSet(BaseViewSet, ExportExcelMixin):
         cfg.save()
         # 简单缓存：按键名缓存值
         try:
-            cache.set(f"config:{cfg.config_key}", cfg.config_value, timeout=3600)
+            config_cache.set(cfg.config_key, cfg.config_value)
         except Exception:
             pass
         return self.ok()
@@ -113,7 +115,7 @@ class ConfigViewSet(BaseViewSet, ExportExcelMixin):
             instance.update_by = user.username
         instance.save()
         try:
-            cache.set(f"config:{instance.config_key}", instance.config_value, timeout=3600)
+            config_cache.set(instance.config_key, instance.config_value)
         except Exception:
             pass
         return self.ok()
@@ -123,7 +125,7 @@ class ConfigViewSet(BaseViewSet, ExportExcelMixin):
         instance.del_flag = '1'
         instance.save(update_fields=['del_flag'])
         try:
-            cache.delete(f"config:{instance.config_key}")
+            config_cache.delete(instance.config_key)
         except Exception:
             pass
         return self.ok()
@@ -135,11 +137,11 @@ class ConfigViewSet(BaseViewSet, ExportExcelMixin):
         # 返回值放在 msg 字段以兼容前端用法
         value = None
         try:
-            value = cache.get(f"config:{configKey}")
+            value = config_cache.get(configKey)
             if value is None:
                 obj = Config.objects.filter(config_key=configKey, del_flag='0').first()
                 value = obj.config_value if obj else ''
-                cache.set(f"config:{configKey}", value, timeout=3600)
+                config_cache.set(configKey, value)
         except Exception:
             obj = Config.objects.filter(config_key=configKey, del_flag='0').first()
             value = obj.config_value if obj else ''
@@ -147,8 +149,9 @@ class ConfigViewSet(BaseViewSet, ExportExcelMixin):
 
     @action(detail=False, methods=['delete'], url_path='refreshCache')
     def refresh_cache(self, request):
+        # 只清理参数配置命名空间，其他缓存（字典、组织目录版本号、验证码等）不受影响
         try:
-            cache.clear()
+            config_cache.clear()
         except Exception:
             pass
         return Response({"code": 200, "msg": "操作成功"})
\ No newline at end of file
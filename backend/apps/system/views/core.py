@@ -4,21 +4,43 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.decorators import action
 from rest_framework import status, viewsets
+from rest_framework.exceptions import AuthenticationFailed
 from rest_framework_simplejwt.views import TokenObtainPairView
+from rest_framework_simplejwt.tokens import AccessToken
 from captcha.models import CaptchaStore
 from captcha.views import captcha_image
 import base64
+import logging
 from django.db.models import Q
 from django.core.cache import cache
+from django.http import HttpResponse
 
 from ..models import UserRole, Menu, DictType, DictData
 from ..serializers import DictTypeSerializer, DictDataSerializer, UserProfileSerializer, UserInfoSerializer
+from ..authz import authz_cache
+from ..captchapool import captcha_pool
 from ..common import audit_log
+from ..directory import org_directory
+from ..lockout import login_guard
+from ..menutree import router_cache
+from ..sessions import session_registry
 
+from apps.common.clientip import get_client_ip
 from apps.common.mixins import BaseViewMixin
+from apps.monitor.loginlog import record_login_event
+
+
+logger = logging.getLogger(__name__)
 
 class BaseViewSet(BaseViewMixin,viewsets.ModelViewSet):
     required_roles = None
+    # 接口权限：perm_prefix 如 system:user，按 action 拼接 perm_actions 中的后缀校验（见 permission.py）
+    perm_prefix = None
+    perm_actions = {
+        'list': 'list', 'model_list': 'list', 'retrieve': 'query', 'export': 'export',
+        'create': 'add', 'update': 'edit', 'partial_update': 'edit', 'update_by_body': 'edit',
+        'destroy': 'remove',
+    }
     # 兼容前端 PUT /xxx（集合更新）通用支持
     update_body_serializer_class = None  # 子类设置：用于校验请求体
     update_body_id_field = 'id'          # 子类设置：请求体中的主键字段名，如 menuId/deptId/roleId/configId
@@ -156,9 +178,13 @@ class BaseViewSet(BaseViewMixin,viewsets.ModelViewSet):
 
 class CaptchaView(TokenObtainPairView):
     def get(self, request, *args, **kwargs):
-        hashkey = CaptchaStore.generate_key()
-        img_response = captcha_image(request._request, hashkey)
-        img_base64 = base64.b64encode(img_response.content).decode()
+        if captcha_pool.enabled:
+            # 从预生成的验证码池取出，请求线程不渲染图片（见 captchapool.py）
+            hashkey, img_base64 = captcha_pool.take()
+        else:
+            hashkey = CaptchaStore.generate_key()
+            img_response = captcha_image(request._request, hashkey)
+            img_base64 = base64.b64encode(img_response.content).decode()
         resp = Response({
             'img': img_base64,
             'uuid': hashkey,
@@ -170,15 +196,47 @@ class CaptchaView(TokenObtainPairView):
         return resp
 
 
+def _lockout_message(kind, remaining_s):
+    minutes = max(1, (remaining_s + 59) // 60)
+    if kind == 'user':
+        return f'密码输入错误{login_guard.user_max}次，帐户锁定{minutes}分钟'
+    return f'登录失败次数过多，请{minutes}分钟后再试'
+
+
 class LoginView(TokenObtainPairView):
     @audit_log
     def post(self, request, *args, **kwargs):
+        username = request.data.get('username') or ''
+        # 锁定按可信的客户端地址计数：X-Forwarded-For 只在配置了可信代理时采信，客户端无法伪造轮换
+        ip = get_client_ip(request)
+        # 失败次数超限时直接拒绝，不进入密码哈希
+        locked = login_guard.check(username, ip) if login_guard.enabled else None
+        if locked:
+            msg = _lockout_message(*locked)
+            record_login_event(request, username, False, msg)
+            return Response({'msg': msg}, status=status.HTTP_400_BAD_REQUEST)
         serializer = self.get_serializer(data=request.data)
         try:
             serializer.is_valid(raise_exception=True)
+        except AuthenticationFailed as e:
+            if login_guard.enabled and username:
+                login_guard.record_failure(username, ip)
+            record_login_event(request, username, False, str(e))
+            return Response({'msg': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
+            record_login_event(request, username, False, str(e))
             return Response({'msg': str(e)}, status=status.HTTP_400_BAD_REQUEST)
-        return Response({'token': serializer.validated_data.get('access')})
+        if login_guard.enabled:
+            login_guard.reset_user(username)
+        record_login_event(request, username, True, '登录成功')
+        access = serializer.validated_data.get('access')
+        # 登记在线会话（在线用户列表、强退）；登记失败不影响登录
+        try:
+            user = serializer.user
+            session_registry.register(AccessToken(access), user, request, org_directory.dept_name(user.dept_id))
+        except Exception:
+            logger.exception('在线会话登记失败')
+        return Response({'token': access})
 
 
 class GetInfoView(generics.GenericAPIView):
@@ -196,15 +254,9 @@ class GetInfoView(generics.GenericAPIView):
             'sex': getattr(user, 'sex', '2'),
         }
 
-        try:
-            user_roles = UserRole.objects.filter(user=user).select_related('role')
-            roles = [ur.role.role_key for ur in user_roles]
-        except Exception:
-            roles = []
-        if "admin" in roles:
-            permissions = ["*:*:*"]
-        else:
-            permissions = []
+        authz = authz_cache.get(user.id)
+        roles = list(authz.roles)
+        permissions = sorted(authz.perms)
 
         resp = {
             'code': 200,
@@ -223,6 +275,11 @@ class LogoutView(generics.GenericAPIView):
 
     @audit_log
     def post(self, request):
+        # 吊销当前令牌，退出后即使令牌未过期也无法继续使用
+        token = request.auth
+        if token is not None and token.get('jti'):
+            session_registry.revoke(str(token['jti']), token.get('exp'))
+        record_login_event(request, getattr(request.user, 'username', ''), True, '退出成功')
         return Response({'code': 200, 'msg': '操作成功'})
 
 
@@ -230,65 +287,17 @@ class GetRoutersView(generics.GenericAPIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        # cached = cache.get('routers')
-        # if cached is not None:
-        #     return Response({"code": 200, "msg": "操作成功", "data": cached})
-        menus = list(Menu.objects.filter(status='0', del_flag='0').order_by('parent_id', 'order_num'))
-
-        def build_tree(items, pid=0):
-            nodes = []
-            for m in items:
-                if m.parent_id == pid:
-                    children = build_tree(items, m.menu_id)
-                    nodes.append({"menu": m, "children": children})
-            return nodes
-
-        def to_router(node):
-            m = node["menu"]
-            children = node["children"]
-            hidden = (m.visible == '1')
-            is_outer = (m.is_frame == '0')
-
-            meta = {
-                "title": m.menu_name,
-                "icon": m.icon or None,
-                "noCache": (m.is_cache == '1')
-            }
-            if m.query:
-                meta["query"] = m.query
-
-            if m.menu_type == 'M':
-                route = {
-                    "path": m.path or ("/" + str(m.menu_id)),
-                    "component": "Layout" if m.parent_id == 0 else "ParentView",
-                    "hidden": hidden,
-                    "alwaysShow": True,
-                    "name": m.route_name or None,
-                    "meta": meta
-                }
-                route["children"] = [r for r in [to_router(c) for c in children] if r is not None]
-                return route
-            elif m.menu_type == 'C':
-                if is_outer and (m.path.startswith('http://') or m.path.startswith('https://')):
-                    return {
-                        "path": m.path,
-                        "component": "InnerLink",
-                        "hidden": hidden,
-                        "name": m.route_name or None,
-                        "meta": meta
-                    }
-                return {
-                    "path": m.path or ("/" + str(m.menu_id)),
-                    "component": m.component or "Layout",
-                    "hidden": hidden,
-                    "name": m.route_name or None,
-                    "meta": meta
-                }
-            else:
-                return None
+        # 路由树按角色集合缓存（见 menutree.py），ETag 未变化时直接 304
+        etag, body = router_cache.get(authz_cache.get(request.user.id))
+        if etag in _parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+            response = HttpResponse(status=304)
+        else:
+            response = HttpResponse(body, content_type='application/json')
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
 
-        tree = build_tree(menus, 0)
-        routers = [r for r in [to_router(n) for n in tree] if r is not None]
-        # cache.set('routers', routers, timeout=3600)
-        return Response({"code": 200, "msg": "操作成功", "data": routers})
+def _parse_etags(value):
+    return {tag.strip() for tag in value.split(',') if tag.strip()} if value else ()
 
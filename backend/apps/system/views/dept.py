@@ -17,6 +17,8 @@ from ..serializers import (
 
 class DeptViewSet(BaseViewSet, ExportExcelMixin):
     permission_classes = [IsAuthenticated, HasRolePermission]
+    perm_prefix = 'system:dept'
+    perm_actions = {**BaseViewSet.perm_actions, 'list_exclude_child': 'list'}
     queryset = Dept.objects.filter(del_flag='0').order_by('parent_id', 'order_num')
     serializer_class = DeptSerializer
     update_body_serializer_class = DeptUpdateSerializer
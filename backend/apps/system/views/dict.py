@@ -2,7 +2,6 @@ from rest_framework import status
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from django.core.cache import cache
 
 from ..models import DictType, DictData
 from ..serializers import (
@@ -11,6 +10,7 @@ from ..serializers import (
     DictTypeUpdateSerializer, DictDataUpdateSerializer
 )
 from ..permission import HasRolePermission
+from apps.common.cache import dict_data_cache, dict_option_cache
 from apps.common.mixins import ExportExcelMixin
 from collections import OrderedDict
 from .core import BaseViewSet
@@ -18,6 +18,8 @@ from .core import BaseViewSet
 
 class DictTypeViewSet(BaseViewSet, ExportExcelMixin):
     permission_classes = [IsAuthenticated, HasRolePermission]
+    perm_prefix = 'system:dict'
+    perm_actions = {**BaseViewSet.perm_actions, 'refreshCache': 'remove'}
     queryset = DictType.objects.filter(del_flag='0').order_by('-create_time')
     serializer_class = DictTypeSerializer
     update_body_serializer_class = DictTypeUpdateSerializer
@@ -45,10 +47,9 @@ class DictTypeViewSet(BaseViewSet, ExportExcelMixin):
         serializer.save()
         # 更新该类型缓存
         dict_type = serializer.instance.dict_type
-        cache_key = f'dict_data_by_type:{dict_type}'
         qs = DictData.objects.filter(dict_type=dict_type, status='0', del_flag='0').order_by('dict_sort', 'dict_label')
         data = self.get_serializer(qs, many=True).data
-        cache.set(cache_key, data, timeout=3600)
+        dict_data_cache.set(dict_type, data)
         return Response({'code': 200, 'msg': '操作成功'})
 
     def update(self, request, *args, **kwargs):
@@ -61,10 +62,9 @@ class DictTypeViewSet(BaseViewSet, ExportExcelMixin):
         # 如果类型发生变化，同时更新旧类型与新类型缓存
         new_type = serializer.instance.dict_type
         for t in {old_type, new_type}:
-            cache_key = f'dict_data_by_type:{t}'
             qs = DictData.objects.filter(dict_type=t, status='0', del_flag='0').order_by('dict_sort', 'dict_label')
             data = DictDataSerializer(qs, many=True).data
-            cache.set(cache_key, data, timeout=3600)
+            dict_data_cache.set(t, data)
         return Response({'code': 200, 'msg': '操作成功'})
 
     def destroy(self, request, *args, **kwargs):
@@ -73,30 +73,33 @@ class DictTypeViewSet(BaseViewSet, ExportExcelMixin):
         instance.save(update_fields=['del_flag'])
         # 刷新对应类型缓存
         dict_type = instance.dict_type
-        cache_key = f'dict_data_by_type:{dict_type}'
         qs = DictData.objects.filter(dict_type=dict_type, status='0', del_flag='0').order_by('dict_sort', 'dict_label')
         data = self.get_serializer(qs, many=True).data
-        cache.set(cache_key, data, timeout=3600)
+        dict_data_cache.set(dict_type, data)
         return Response({'code': 200, 'msg': '操作成功'})
 
     @action(detail=False, methods=['delete'], url_path='refreshCache')
     def refreshCache(self, request):
-        cache.delete('dict_optionselect')
+        # 清理字典相关命名空间，下次访问时按需重新加载
+        dict_option_cache.clear()
+        dict_data_cache.clear()
         return Response({'code': 200, 'msg': '操作成功'})
 
     @action(detail=False, methods=['get'], url_path='optionselect')
     def optionselect(self, request):
-        cached = cache.get('dict_optionselect')
+        cached = dict_option_cache.get('all')
         if cached is not None:
             return Response({'code': 200, 'msg': '操作成功', 'data': cached})
         qs = DictType.objects.filter(status='0', del_flag='0').order_by('dict_name')
         data = [{'dictId': d.dict_id, 'dictName': d.dict_name, 'dictType': d.dict_type} for d in qs]
-        cache.set('dict_optionselect', data, timeout=300)
+        dict_option_cache.set('all', data)
         return Response({'code': 200, 'msg': '操作成功', 'data': data})
 
 
 class DictDataViewSet(BaseViewSet, ExportExcelMixin):
     permission_classes = [IsAuthenticated, HasRolePermission]
+    perm_prefix = 'system:dict'
+    perm_actions = {**BaseViewSet.perm_actions, 'list_action': 'list'}
     queryset = DictData.objects.filter(del_flag='0').order_by('-create_time')
     serializer_class = DictDataSerializer
     update_body_serializer_class = DictDataUpdateSerializer
@@ -170,12 +173,11 @@ class DictDataViewSet(BaseViewSet, ExportExcelMixin):
 
     @action(detail=False, methods=['get'], url_path=r'type/(?P<dict_type>[^/]+)')
     def by_type(self, request, dict_type=None):
-        cache_key = f'dict_data_by_type:{dict_type}'
-        cached = cache.get(cache_key)
+        cached = dict_data_cache.get(dict_type)
         if cached is not None:
             return Response({'code': 200, 'msg': '获取缓存数据', 'data': cached})
         qs = DictData.objects.filter(dict_type=dict_type, status='0', del_flag='0').order_by('dict_sort', 'dict_label')
         serializer = self.get_serializer(qs, many=True)
-        cache.set(cache_key, serializer.data, timeout=3600)
+        dict_data_cache.set(dict_type, serializer.data)
         return Response({'code': 200, 'msg': '操作成功', 'data': serializer.data})
         
\ No newline at end of file
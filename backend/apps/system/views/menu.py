@@ -13,6 +13,7 @@ from ..serializers import MenuSerializer, MenuQuerySerializer, MenuUpdateSeriali
 
 class MenuViewSet(BaseViewSet):
     permission_classes = [IsAuthenticated, HasRolePermission]
+    perm_prefix = 'system:menu'
     queryset = Menu.objects.filter(del_flag='0').order_by('parent_id', 'order_num')
     serializer_class = MenuSerializer
     update_body_serializer_class = MenuUpdateSerializer
@@ -11,6 +11,7 @@ from ..serializers import NoticeSerializer, NoticeQuerySerializer, NoticeUpdateS
 
 class NoticeViewSet(BaseViewSet, ExportExcelMixin):
     permission_classes = [IsAuthenticated, HasRolePermission]
+    perm_prefix = 'system:notice'
     queryset = Notice.objects.all()
     serializer_class = NoticeSerializer
     update_body_serializer_class = NoticeUpdateSerializer
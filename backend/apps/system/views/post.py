@@ -13,6 +13,7 @@ from ..serializers import PostSerializer, PaginationQuerySerializer, PostQuerySe
 
 class PostViewSet(BaseViewSet, ExportExcelMixin):
     permission_classes = [IsAuthenticated, HasRolePermission]
+    perm_prefix = 'system:post'
     queryset = Post.objects.all()
     serializer_class = PostSerializer
     update_body_serializer_class = PostUpdateSerializer
@@ -5,6 +5,7 @@ from rest_framework import status
 
 from .core import BaseViewSet
 from ..permission import HasRolePermission
+from ..authz import invalidate_authz
 from apps.common.mixins import ExportExcelMixin
 from collections import OrderedDict
 from ..models import Role, RoleMenu, Menu, User, UserRole
@@ -21,6 +22,12 @@ from ..serializers import (
 
 class RoleViewSet(BaseViewSet, ExportExcelMixin):
     permission_classes = [IsAuthenticated, HasRolePermission]
+    perm_prefix = 'system:role'
+    perm_actions = {
+        **BaseViewSet.perm_actions, 'change_status': 'edit', 'data_scope': 'edit', 'dept_tree_select': 'query',
+        'allocated_user_list': 'list', 'unallocated_user_list': 'list',
+        'auth_user_cancel': 'edit', 'auth_user_cancel_all': 'edit', 'auth_user_select_all': 'edit',
+    }
     queryset = Role.objects.filter(del_flag='0').order_by('create_time')
     serializer_class = RoleSerializer
     update_body_serializer_class = RoleUpdateSerializer
@@ -204,4 +211,6 @@ class RoleViewSet(BaseViewSet, ExportExcelMixin):
         creates = [UserRole(role=role, user_id=uid) for uid in ids if uid not in existing]
         if creates:
             UserRole.objects.bulk_create(creates, ignore_conflicts=True)
+            # bulk_create 不触发 post_save，需手动失效授权缓存
+            invalidate_authz()
         return Response({"code": 200, "msg": "操作成功"})
@@ -10,6 +10,7 @@ from rest_framework.permissions import IsAuthenticated
 from collections import OrderedDict
 
 from .core import BaseViewSet
+from ..authz import invalidate_authz
 from ..permission import HasRolePermission
 from ..common import audit_log
 from ..models import User, Dept, Role, UserRole, Post, UserPost
@@ -26,6 +27,11 @@ from urllib.parse import quote
 
 class UserViewSet(BaseViewSet, ExportExcelMixin):
     permission_classes = [IsAuthenticated, HasRolePermission]
+    perm_prefix = 'system:user'
+    perm_actions = {
+        **BaseViewSet.perm_actions, 'resetPwd': 'resetPwd', 'changeStatus': 'edit', 'deptTree': 'list',
+        'getAuthRole': 'query', 'updateAuthRole': 'edit', 'importTemplate': 'import',
+    }
     queryset = User.objects.all()
     serializer_class = UserSerializer
     update_body_serializer_class = UserUpdateSerializer
@@ -269,6 +275,8 @@ class UserViewSet(BaseViewSet, ExportExcelMixin):
                     UserRole.objects.create(user=user, role=role)
                 except Role.DoesNotExist:
                     continue
+            # 整体替换用户角色后显式失效授权缓存，不依赖逐行信号
+            invalidate_authz()
             return self.ok('授权成功')
         except User.DoesNotExist:
             return self.not_found('用户不存在')
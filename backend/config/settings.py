@@ -36,6 +36,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'apps.monitor.middleware.RequestMetricsMiddleware',
+    'apps.monitor.middleware.SlowRequestProfilerMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -69,7 +71,7 @@ WSGI_APPLICATION = 'config.wsgi.application'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'apps.system.authentication.CachedSessionJWTAuthentication',
     ),
     'EXCEPTION_HANDLER': 'apps.common.exceptions.custom_exception_handler',
     'DEFAULT_PAGINATION_CLASS': 'apps.common.pagination.StandardPagination',
@@ -84,6 +86,171 @@ SIMPLE_JWT = {
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
 }
 
+# 在线会话登记（apps.system.sessions）：登录令牌按 jti 写入 sys_user_online，退出/强退后令牌立即失效，
+# 其他 worker 最迟 SYNC_INTERVAL_S 秒后生效
+ONLINE_SESSIONS = {
+    'SYNC_INTERVAL_S': 1.0,
+    'SYNC_OVERLAP_S': 5.0,
+    'WHEEL_TICK_S': 60,
+    'PURGE_INTERVAL_S': 300,
+}
+
+# 认证用户缓存（apps.system.authentication.CachedSessionJWTAuthentication）：request.user 取自进程内 LRU，
+# 用户保存/删除后失效，其他 worker 经 sys_user_online 的变更标记最迟 ONLINE_SESSIONS['SYNC_INTERVAL_S'] 秒后生效；TTL_S 为 0 时关闭
+AUTH_USER_CACHE = {
+    'TTL_S': 30,
+    'MAX_USERS': 1024,
+}
+
+# 登录验证码池（apps.system.captchapool）：后台线程批量预生成验证码，低于 LOW_WATER 时补充到 SIZE，
+# 并每 PURGE_INTERVAL_S 分批清理已过期的 captcha_captchastore 行
+CAPTCHA_POOL = {
+    'ENABLED': True,
+    'SIZE': 100,
+    'LOW_WATER': 30,
+    'PURGE_INTERVAL_S': 300,
+}
+
+# 客户端 IP（apps.common.clientip）：默认只认直连地址 REMOTE_ADDR；部署在反向代理之后时配置可信代理，
+# 才会采信 X-Forwarded-For（登录失败锁定、登录日志、在线会话与操作日志共用）
+CLIENT_IP = {
+    'TRUSTED_PROXIES': [],
+    'TRUSTED_PROXY_COUNT': 0,
+}
+
+# 登录失败限制（apps.system.lockout）：按账号、按 IP 的滑动窗口失败计数，超限后锁定 LOCK_S 秒，
+# 锁定期间的登录请求在密码校验前直接拒绝；登录日志的「解锁」清除账号维度的计数
+LOGIN_LOCKOUT = {
+    'ENABLED': True,
+    'WINDOW_S': 600,
+    'USER_MAX_FAILURES': 5,
+    'IP_MAX_FAILURES': 20,
+    'LOCK_S': 600,
+    'SYNC_INTERVAL_S': 2.0,
+}
+
+# 离线 IP 归属地（apps.common.iplocation）：FILE 每行 "起始IP,结束IP,归属地"，用于登录日志、操作日志与在线用户的登录地点；
+# 未配置时只区分内网地址
+IP_LOCATION = {
+    'FILE': '',
+}
+
+# 操作日志异步批量写入（apps.monitor.writer）
+OPER_LOG_WRITER = {
+    'ASYNC': True,
+    'QUEUE_SIZE': 10000,
+    'BATCH_SIZE': 200,
+    'FLUSH_INTERVAL_MS': 500,
+    'FULL_POLICY': 'drop',  # drop：队列满直接丢弃并计数（启用 OPER_LOG_SPOOL 时落盘）；block：最多等待 BLOCK_TIMEOUT_MS
+    'BLOCK_TIMEOUT_MS': 50,
+    'SHUTDOWN_TIMEOUT_MS': 5000,
+}
+
+# 操作/登录日志本地落盘（apps.monitor.spool）：写库失败或队列满时追加到 JSONL 分段，
+# 由写入器后台补写或 python manage.py ingest_logs 导入
+OPER_LOG_SPOOL = {
+    'MODE': 'fallback',  # off / fallback / spool（Web 进程只落盘，配合 ingest_logs --follow）
+    'DIR': BASE_DIR / 'logs' / 'spool',
+    'SEGMENT_MAX_BYTES': 16 * 1024 * 1024,
+    'SEGMENT_MAX_AGE_S': 60,
+    'FSYNC_INTERVAL_MS': 200,
+    'FSYNC_BATCH': 200,
+    'INGEST_BATCH_SIZE': 1000,
+    'INGEST_INTERVAL_S': 5,
+}
+
+# 操作日志参数/结果截取（apps.monitor.capture）
+OPER_LOG_CAPTURE = {
+    'PARAM_MAX_BYTES': 4000,
+    'RESULT_MAX_BYTES': 4000,
+}
+
+# 操作日志记录策略（apps.monitor.policy），规则按声明顺序匹配，首条命中生效
+# mode: always 始终记录 / never 不记录 / sample 按 rate 抽样（失败始终记录）/ on_error 仅失败或耗时 >= slow_ms 时记录
+# 每条规则指定 view_name（路由名，可为列表）或 path（正则，从路径开头匹配）之一
+OPER_LOG_POLICY = {
+    'DEFAULT': {'mode': 'always'},
+    'RULES': [
+        {'view_name': ['get-info', 'get-routers', 'dict-data-by-type'], 'mode': 'on_error', 'slow_ms': 1000},
+        {'view_name': ['monitor-server', 'monitor-operlog-writer-stats', 'monitor-metrics', 'monitor-sqlprofile',
+                       'monitor-profile-list', 'monitor-profile-detail', 'monitor-profile-recent'], 'mode': 'never'},
+        # 登录页验证码（/api/captchaImage/）；/api/captcha/ 为 django-simple-captcha 自带的图片路由
+        {'view_name': ['captcha-image'], 'mode': 'never'},
+        {'path': r'/api/captcha/', 'mode': 'never'},
+    ],
+}
+
+# 操作日志按月分区与保留期（apps.monitor.partitions），由 manage.py oper_log_retention 定时维护；
+# NATIVE 为 True 时在 PostgreSQL / MySQL 上使用原生分区（首次执行 oper_log_retention 时转换已有表），默认按主键分批删除
+OPER_LOG_PARTITION = {
+    'NATIVE': False,
+    'RETENTION_MONTHS': 6,
+    'PRECREATE_MONTHS': 2,
+    'DELETE_CHUNK_SIZE': 5000,
+    'DELETE_PAUSE_MS': 20,
+}
+
+# 操作日志中间件：ASYNC 为 True 时在 ASGI 下以异步模式运行（中间件链与视图均为原生异步时才有收益）
+OPER_LOG_MIDDLEWARE = {
+    'ASYNC': False,
+}
+
+# 操作日志分钟/小时统计（apps.monitor.rollup），由日志写入器批次回调增量维护
+OPER_LOG_ROLLUP = {
+    'ENABLED': True,
+    'MINUTE_RETENTION_DAYS': 7,
+}
+
+# 服务监控后台采样（apps.monitor.sampler）
+SERVER_MONITOR = {
+    'INTERVAL_S': 5,
+    'HISTORY_SIZE': 120,
+    'IP_REFRESH_S': 300,
+}
+
+# 服务监控 Python 运行时统计（apps.monitor.runtime）：各 worker 快照写入 DIR 汇总；
+# TRACEMALLOC 开启后可用 /api/monitor/server?tracemalloc=1 查看内存分配热点（有性能开销）
+RUNTIME_STATS = {
+    'DIR': BASE_DIR / 'logs' / 'runtime',
+    'TRACEMALLOC': False,
+    'TRACEMALLOC_FRAMES': 1,
+    'TRACEMALLOC_TOP': 10,
+}
+
+# Prometheus 指标（apps.monitor.metrics）：/api/monitor/metrics，各 worker 指标写入 DIR 汇总；
+# 设置 TOKEN 后抓取需携带 Authorization: Bearer <TOKEN>，否则仅允许 ALLOWED_IPS 直连访问
+MONITOR_METRICS = {
+    'ENABLED': True,
+    'DIR': BASE_DIR / 'logs' / 'metrics',
+    'TOKEN': '',
+    'ALLOWED_IPS': ['127.0.0.1', '::1'],
+    'DEAD_WORKER_TTL_S': 3600,
+}
+
+# SQL 画像（apps.monitor.sqlprofile）：按需开启，按采样记录每个请求的 SQL 次数、耗时与重复指纹（疑似 N+1），
+# 写入操作日志并按视图汇总到 /api/monitor/sqlprofile
+SQL_PROFILE = {
+    'ENABLED': False,
+    'SAMPLE_RATE': 1.0,
+    'N_PLUS_ONE_MIN': 5,
+    'MAX_GROUPS': 5,
+    'MAX_FINGERPRINTS': 20,
+    'DIR': BASE_DIR / 'logs' / 'sqlprofile',
+}
+
+# 慢请求采样剖析（apps.monitor.profiler）：按需开启，请求进行中每 INTERVAL_MS 抓取一次调用栈，
+# 耗时超过 THRESHOLD_MS 的请求按视图保存为折叠栈，在 /api/monitor/profile 查看
+# 只支持同步中间件链，OPER_LOG_MIDDLEWARE['ASYNC'] 开启时不启用
+REQUEST_PROFILER = {
+    'ENABLED': False,
+    'THRESHOLD_MS': 1000,
+    'INTERVAL_MS': 10,
+    'MAX_DEPTH': 64,
+    'MAX_STACKS': 200,
+    'RECENT_SIZE': 20,
+    'DIR': BASE_DIR / 'logs' / 'profiles',
+}
+
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 